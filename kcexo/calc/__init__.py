@@ -2,9 +2,25 @@
 """A package with all the transit and orbit calculation functions"""
 
 from kcexo.calc.util import equal_times
-from kcexo.calc.orbits import planet_orbit, planet_star_projected_distance, transit_duration, transit_t12
+from kcexo.calc.orbits import solve_kepler, planet_orbit, planet_orbits, planet_star_projected_distance, transit_duration, transit_t12, transit_contact_times
+from kcexo.calc.ephemeris import transit_epochs, transit_times
+from kcexo.calc.barycentric import light_travel_times, transit_light_travel_times
+from kcexo.calc.meridian import meridian_transit_times, meridian_crossing_flags
+from kcexo.calc.twilight import TwilightTable
+from kcexo.calc.altaz import fast_altaz, altitude_azimuth
+from kcexo.calc.light_curve import LimbDarkeningTable, transit_light_curve, planet_light_curves
+from kcexo.calc.uncertainty import sample_transit_durations, transit_timing_windows
+from kcexo.calc.exposure import exposure_snr, exposure_grid, calc_exposure, exposure_for_snr, saturation_exposure, snr_for_precision
 
 __all__ = [
-    'planet_orbit', 'planet_star_projected_distance', 'transit_duration', 'transit_t12',
+    'solve_kepler', 'planet_orbit', 'planet_orbits', 'planet_star_projected_distance', 'transit_duration', 'transit_t12', 'transit_contact_times',
+    'transit_epochs', 'transit_times',
+    'light_travel_times', 'transit_light_travel_times',
+    'meridian_transit_times', 'meridian_crossing_flags',
+    'TwilightTable',
+    'fast_altaz', 'altitude_azimuth',
+    'LimbDarkeningTable', 'transit_light_curve', 'planet_light_curves',
+    'sample_transit_durations', 'transit_timing_windows',
+    'exposure_snr', 'exposure_grid', 'calc_exposure', 'exposure_for_snr', 'saturation_exposure', 'snr_for_precision',
     'equal_times'
 ]
@@ -0,0 +1,230 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore altaz astroplan Meeus Saemundsson erfa
+"""Altitude and azimuth of many stars at many times, either exactly (`astropy`) or quickly to planning accuracy.
+
+The 'fast' tier is the textbook calculation: the J2000 coordinates are precessed to the date (IAU 1976), the hour
+angle comes from the mean sidereal time (IAU 1982) and the altitude and azimuth from spherical trigonometry, with an
+optional refraction correction (Saemundsson). Nutation, aberration, UT1-UTC and polar motion are ignored which keeps it
+within a few hundredths of a degree of `astropy` above a few degrees altitude.
+"""
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+from astroplan import Observer
+
+
+PRECISIONS: Tuple[str, ...] = ('exact', 'fast')  #: supported precision tiers
+
+
+def _precess_from_j2000(ra: np.ndarray, dec: np.ndarray, jd: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Precess J2000 equatorial coordinates (radians) to the mean equator and equinox of date (Meeus, eq. 21.2-21.4)."""
+    t = (jd - 2451545.0) / 36525.0
+    arcsec = np.pi / (180.0 * 3600.0)
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * arcsec
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * arcsec
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * arcsec
+    cos_dec = np.cos(dec)
+    a = cos_dec * np.sin(ra + zeta)
+    b = np.cos(theta) * cos_dec * np.cos(ra + zeta) - np.sin(theta) * np.sin(dec)
+    c = np.sin(theta) * cos_dec * np.cos(ra + zeta) + np.cos(theta) * np.sin(dec)
+    return np.arctan2(a, b) + z, np.arcsin(np.clip(c, -1.0, 1.0))
+
+
+def mean_sidereal_time(jd: np.ndarray, lon: float) -> np.ndarray:
+    """Local mean sidereal time in radians at the (UTC) JDs for the longitude `lon` in degrees (Meeus, eq. 12.4)."""
+    d = jd - 2451545.0
+    t = d / 36525.0
+    gmst = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000.0
+    return np.deg2rad(np.mod(gmst + lon, 360.0))
+
+
+def refraction(alt: np.ndarray, pressure: float, temperature: float) -> np.ndarray:
+    """Atmospheric refraction in degrees for the true altitudes `alt` in degrees (Saemundsson).
+
+    Args:
+        alt (np.ndarray): True (geometric) altitudes in degrees.
+        pressure (float): Pressure in hPa, 0 means no atmosphere and no refraction.
+        temperature (float): Temperature in Celsius.
+
+    Returns:
+        np.ndarray: Refraction, to be added to the true altitude, 0 below -1 degree.
+    """
+    h = np.maximum(alt, -1.0)
+    r = 1.02 / np.tan(np.deg2rad(h + 10.3 / (h + 5.11))) / 60.0
+    r *= (pressure / 1010.0) * (283.0 / (273.0 + temperature))
+    return np.where(alt > -1.0, r, 0.0)
+
+
+def fast_altaz(ra: np.ndarray,
+               dec: np.ndarray,
+               jd: np.ndarray,
+               lat: float,
+               lon: float,
+               pressure: float = 0.0,
+               temperature: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Approximate altitude and azimuth of stars from their ICRS (J2000) coordinates.
+
+    Args:
+        ra (np.ndarray): Right ascensions in degrees.
+        dec (np.ndarray): Declinations in degrees, the same shape as `ra`.
+        jd (np.ndarray): UTC JDs, broadcastable with `ra` and `dec`.
+        lat (float): Observer's (geodetic) latitude in degrees.
+        lon (float): Observer's longitude in degrees, east positive.
+        pressure (float, optional): Pressure in hPa for the refraction. Defaults to 0 meaning no refraction.
+        temperature (float, optional): Temperature in Celsius for the refraction. Defaults to 0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Altitudes and azimuths (north through east) in degrees with the broadcast shape.
+    """
+    jd = np.asarray(jd, dtype=float)
+    ra_d, dec_d = _precess_from_j2000(np.deg2rad(ra), np.deg2rad(dec), jd)
+    ha = mean_sidereal_time(jd, lon) - ra_d
+    phi = np.deg2rad(lat)
+    sin_alt = np.sin(phi) * np.sin(dec_d) + np.cos(phi) * np.cos(dec_d) * np.cos(ha)
+    alt = np.rad2deg(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    az = np.rad2deg(np.arctan2(-np.cos(dec_d) * np.sin(ha),
+                               np.sin(dec_d) * np.cos(phi) - np.cos(dec_d) * np.sin(phi) * np.cos(ha)))
+    if pressure > 0.0:
+        alt = alt + refraction(alt, pressure, temperature)
+    return alt, np.mod(az, 360.0)
+
+
+def altitude_azimuth(coords: SkyCoord,
+                     times: Time,
+                     observer: Observer,
+                     precision: str = 'exact') -> Tuple[np.ndarray, np.ndarray]:
+    """Altitude and azimuth of stars seen by an observer, `coords` and `times` are broadcast against each other.
+
+    Args:
+        coords (SkyCoord): Stars.
+        times (Time): Times.
+        observer (Observer): Observer, its pressure and temperature are used for the refraction.
+        precision (str, optional): 'exact' uses the full `astropy` AltAz transform, 'fast' uses `fast_altaz`.
+            Defaults to 'exact'.
+
+    Raises:
+        ValueError: If `precision` is not one of `PRECISIONS`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Altitudes and azimuths in degrees.
+    """
+    if precision == 'exact':
+        altaz = coords.transform_to(observer.altaz(times))
+        return altaz.alt.to(u.deg).value, altaz.az.to(u.deg).value
+    if precision == 'fast':
+        icrs = coords.icrs
+        # an observer without pressure (or temperature) has no refraction, the same as in astropy
+        pressure = observer.pressure.to(u.hPa).value if observer.pressure is not None else 0.0
+        temperature = observer.temperature.to(u.deg_C, equivalencies=u.temperature()).value if observer.temperature is not None else 0.0
+        return fast_altaz(icrs.ra.to(u.deg).value,
+                          icrs.dec.to(u.deg).value,
+                          times.utc.jd,
+                          observer.location.lat.to(u.deg).value,
+                          observer.location.lon.to(u.deg).value,
+                          pressure,
+                          temperature)
+    raise ValueError(f'"precision" must be one of {PRECISIONS}, not "{precision}"')
+
+
+class AltAzTrackCache():
+    """Least recently used cache of the altitude and azimuth tracks of stars during transit windows.
+
+    A track covers the window of one transit, from pre-ingress to post-egress: `num_points` evenly spaced times plus
+    the ingress, mid and egress times, sorted. The visibility filter only needs the five contact times while the plots
+    need the whole track, so both are served from the same track. All the missing tracks of a request are calculated
+    in a single `altitude_azimuth` call and only the `max_tracks` most recently used tracks are kept.
+    """
+
+    def __init__(self, observer: Observer, precision: str = 'exact', max_tracks: int = 8192) -> None:
+        """Initialise an empty cache.
+
+        Args:
+            observer (Observer): Observer the tracks are for.
+            precision (str, optional): Precision tier, see `altitude_azimuth`. Defaults to 'exact'.
+            max_tracks (int, optional): Maximum number of tracks kept. Defaults to 8192 (about 6 MB).
+        """
+        self.observer: Observer = observer
+        self.precision: str = precision
+        self.max_tracks: int = max_tracks
+        # key -> (jds, altitudes, azimuths, indices of the contact times)
+        self.tracks: OrderedDict[tuple, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def clear(self) -> None:
+        """Forget all the tracks."""
+        self.tracks.clear()
+
+    def get_tracks(self,
+                   coords: SkyCoord,
+                   contacts: Time,
+                   num_points: int = 20) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Tracks of many transits.
+
+        Args:
+            coords (SkyCoord): `(N,)` host star of every transit.
+            contacts (Time): `(N, 5)` contact times of the transits, in the `Transit.as_list` order.
+            num_points (int, optional): Number of evenly spaced times in the transit window. Defaults to 20.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: `(N, num_points + 3)` UTC JDs, altitudes and azimuths
+                in degrees and `(N, 5)` indices of the contact times in the tracks.
+        """
+        icrs = coords.icrs
+        ra = np.broadcast_to(icrs.ra.to(u.deg).value, (len(contacts),))
+        dec = np.broadcast_to(icrs.dec.to(u.deg).value, (len(contacts),))
+        jds = contacts.utc.jd
+        keys = [(round(r, 9), round(d, 9), num_points) + tuple(np.round(jd, 7)) for r, d, jd in zip(ra, dec, jds)]
+        missing = [n for n, key in enumerate(keys) if key not in self.tracks]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        res: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None] = [None] * len(keys)
+        if missing:
+            c = jds[missing]
+            grid = np.linspace(c[:, 0], c[:, 4], num_points, axis=1)
+            track_jds = np.sort(np.concatenate([grid, c[:, 1:4]], axis=1), axis=1)
+            contact_idx = np.argmax(track_jds[:, :, np.newaxis] == c[:, np.newaxis, :], axis=1)
+            alt, az = altitude_azimuth(SkyCoord(ra=ra[missing, np.newaxis] * u.deg, dec=dec[missing, np.newaxis] * u.deg),
+                                       Time(track_jds, format='jd', scale='utc'), self.observer, self.precision)
+            for k, n in enumerate(missing):
+                res[n] = (track_jds[k], alt[k], az[k], contact_idx[k])
+        for n, key in enumerate(keys):
+            if res[n] is None:
+                self.tracks.move_to_end(key)
+                res[n] = self.tracks[key]
+            else:
+                self.tracks[key] = res[n]
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.popitem(last=False)
+        if not res:
+            empty = np.empty((0, num_points + 3))
+            return empty, empty, empty, np.empty((0, 5), dtype=int)
+        return tuple(np.stack([r[k] for r in res]) for k in range(4))
+
+    def contact_altaz(self, coords: SkyCoord, contacts: Time, num_points: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """Altitudes and azimuths in degrees, `(N, 5)`, of the stars at the contact times, see `get_tracks`."""
+        _, alt, az, idx = self.get_tracks(coords, contacts, num_points)
+        return np.take_along_axis(alt, idx, axis=1), np.take_along_axis(az, idx, axis=1)
+
+    def track(self, coord: SkyCoord, contacts: List[Time] | Time, num_points: int = 20) -> Tuple[Time, np.ndarray, np.ndarray]:
+        """Track of a single transit.
+
+        Args:
+            coord (SkyCoord): Host star.
+            contacts (List[Time] | Time): The five contact times, in the `Transit.as_list` order.
+            num_points (int, optional): Number of evenly spaced times in the transit window. Defaults to 20.
+
+        Returns:
+            Tuple[Time, np.ndarray, np.ndarray]: UTC times, altitudes and azimuths in degrees.
+        """
+        contacts = Time(contacts).reshape(1, 5)
+        jds, alt, az, _ = self.get_tracks(coord.reshape(1) if not coord.isscalar else coord, contacts, num_points)
+        return Time(jds[0], format='jd', scale='utc'), alt[0], az[0]
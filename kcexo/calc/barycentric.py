@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+"""Barycentric light travel time corrections for many times and stars in a single call."""
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation
+
+
+MAX_LIGHT_TRAVEL_TIME_RATE: float = 1.05e-4  #: upper limit on how fast the correction changes, (Earth's orbital + rotational speed) / c
+
+
+def light_travel_times(times: Time,
+                       coords: SkyCoord,
+                       location: EarthLocation) -> u.Quantity["time"]:
+    """Barycentric light travel times for an array of times and an array of stars (or a single star).
+
+    This is `Time.light_travel_time` but with `times` and `coords` broadcast against each other so the Earth's
+    position is looked up only once for all of them.
+
+    Args:
+        times (Time): Times, any shape.
+        coords (SkyCoord): Stars, a scalar or broadcastable to `times`.
+        location (EarthLocation): Observer's location.
+
+    Returns:
+        u.Quantity['time']: Corrections in seconds with the broadcast shape, to be *subtracted* from barycentric
+            times to get the times at the observer.
+    """
+    return times.light_travel_time(coords, kind='barycentric', location=location).to(u.s)
+
+
+def transit_light_travel_times(times: Time,
+                               coords: SkyCoord,
+                               location: EarthLocation,
+                               mid_index: int = 2,
+                               tolerance: u.Quantity["time"] | None = 1 * u.s) -> u.Quantity["time"]:
+    """Barycentric light travel times for the contact times of many transits.
+
+    The correction changes by at most `MAX_LIGHT_TRAVEL_TIME_RATE` seconds per second so when all the times of
+    a transit are close enough to its mid time for the change to stay within `tolerance`, the correction at
+    the mid time is used for all of them. Only the (long) transits where that is not the case get a correction
+    for every time.
+
+    Args:
+        times (Time): `(K, M)` times, `M` contact times for `K` transits.
+        coords (SkyCoord): Host star of every transit, `(K,)`, or a single star for all of them.
+        location (EarthLocation): Observer's location.
+        mid_index (int, optional): Which of the `M` times is the mid time. Defaults to 2 (pre-ingress, ingress, mid, egress, post-egress).
+        tolerance (u.Quantity['time'] | None, optional): Acceptable error from using the mid time correction.
+            Defaults to 1 second. None means that every time gets its own correction.
+
+    Returns:
+        u.Quantity['time']: `(K, M)` corrections in seconds.
+    """
+    if tolerance is None:
+        return light_travel_times(times, coords if coords.isscalar else coords[:, np.newaxis], location)
+    mids = times[:, mid_index]
+    ltt = light_travel_times(mids, coords, location).to(u.s).value
+    res = np.repeat(ltt[:, np.newaxis], times.shape[1], axis=1)
+    span = np.max(np.abs((times - mids[:, np.newaxis]).to(u.s).value), axis=1)
+    exact = np.nonzero(span * MAX_LIGHT_TRAVEL_TIME_RATE > tolerance.to(u.s).value)[0]
+    if len(exact) > 0:
+        c = coords if coords.isscalar else coords[exact][:, np.newaxis]
+        res[exact] = light_travel_times(times[exact], c, location).to(u.s).value
+    return res * u.s
@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+"""Transit times for many planets at once straight from the linear ephemeris `T0 + n P`."""
+from typing import Tuple
+
+import numpy as np
+
+
+EPHEMERIS_SCALE: str = 'tdb'  #: time scale used for the JDs of the array based calculations
+
+transit_times_dtype = np.dtype([
+    ('planet', 'i8'),
+    ('epoch', 'i8'),
+    ('pre_ingress', 'f8'),
+    ('ingress', 'f8'),
+    ('mid', 'f8'),
+    ('egress', 'f8'),
+    ('post_egress', 'f8')
+])  #: fields of the structured array returned by `transit_times`, all the times are JDs
+
+
+def transit_epochs(t0_jd: np.ndarray,
+                   period_d: np.ndarray,
+                   start_jd: float,
+                   end_jd: float) -> Tuple[np.ndarray, np.ndarray]:
+    """All the transit epochs with the mid time after `start_jd` and not after `end_jd` for every planet.
+
+    Args:
+        t0_jd (np.ndarray): `(N,)` reference mid-transit times as JDs.
+        period_d (np.ndarray): `(N,)` periods in days.
+        start_jd (float): Start of the window as JD (in the same time scale as `t0_jd`).
+        end_jd (float): End of the window as JD (in the same time scale as `t0_jd`).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Planet index and epoch (number of periods from `t0_jd`) of every transit,
+            ordered by the planet and then by the epoch.
+    """
+    t0_jd = np.atleast_1d(np.asarray(t0_jd, dtype=float))
+    period_d = np.atleast_1d(np.asarray(period_d, dtype=float))
+    first = np.floor((start_jd - t0_jd) / period_d).astype(np.int64) + 1
+    last = np.floor((end_jd - t0_jd) / period_d).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0)
+    planet = np.repeat(np.arange(len(t0_jd)), counts)
+    # epoch = first epoch of the planet + position within the planet's run
+    starts = np.cumsum(counts) - counts
+    epoch = first[planet] + np.arange(counts.sum()) - starts[planet]
+    return planet, epoch
+
+
+def transit_times(t0_jd: np.ndarray,
+                  period_d: np.ndarray,
+                  duration_d: np.ndarray,
+                  before_d: float,
+                  after_d: float,
+                  start_jd: float,
+                  end_jd: float) -> np.ndarray:
+    """Pre-ingress, ingress, mid, egress and post-egress times of every transit of every planet in a window.
+
+    Only the transits that end (including the post-egress time) by `end_jd` are returned.
+
+    Args:
+        t0_jd (np.ndarray): `(N,)` reference mid-transit times as JDs.
+        period_d (np.ndarray): `(N,)` periods in days.
+        duration_d (np.ndarray): `(N,)` transit durations (T14) in days.
+        before_d (float): Time before the ingress, in days, that the observation should start.
+        after_d (float): Time after the egress, in days, that the observation should continue.
+        start_jd (float): Start of the window as JD (in the same time scale as `t0_jd`).
+        end_jd (float): End of the window as JD (in the same time scale as `t0_jd`).
+
+    Returns:
+        np.ndarray: Structured array with `transit_times_dtype` fields.
+    """
+    period_d = np.atleast_1d(np.asarray(period_d, dtype=float))
+    half = 0.5 * np.broadcast_to(np.atleast_1d(np.asarray(duration_d, dtype=float)), period_d.shape)
+    planet, epoch = transit_epochs(t0_jd, period_d, start_jd, end_jd)
+    mid = np.atleast_1d(np.asarray(t0_jd, dtype=float))[planet] + epoch * period_d[planet]
+    res = np.empty(len(planet), dtype=transit_times_dtype)
+    res['planet'] = planet
+    res['epoch'] = epoch
+    res['mid'] = mid
+    res['ingress'] = mid - half[planet]
+    res['egress'] = mid + half[planet]
+    res['pre_ingress'] = res['ingress'] - before_d
+    res['post_egress'] = res['egress'] + after_d
+    return res[res['post_egress'] <= end_jd]
@@ -1,6 +1,14 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore readnoise pixsize skymag exptime nphoton
+import logging
+import math
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
 import numpy as np
 
+FRACTION_INSIDE_MAX_RADIUS: int = 30  #: largest aperture radius, in pixels, that `fraction_inside` integrates the PSF over
+
 filter_extinction = {
     'U': 0.6,
     'B': 0.4,
@@ -17,21 +25,26 @@ filter_mag_zeropoint = {
     'I': 6.75e+05
 }
 
-def calc_exposure(filter: str,
-                  mag_start: float,
-                  mag_end: float,
-                  dmag: float,
-                  tel_diam: float,
-                  qe: float,
-                  readnoise: float,
-                  pixsize: float,
-                  skymag: float,
-                  airmass: float,
-                  exptime: float,
-                  fwhm: float,
-                  aper_rad: float):
-    if mag_start > mag_end or dmag <= 0.0:
-        raise ValueError("invalid magnitude start/end or delta values")
+exposure_dtype = np.dtype([
+    ('filter', 'U8'),
+    ('mag', 'f8'),
+    ('airmass', 'f8'),
+    ('exptime', 'f8'),
+    ('star_electrons', 'f8'),
+    ('sky_electrons', 'f8'),
+    ('read_electrons', 'f8'),
+    ('snr', 'f8')
+])  #: fields of the structured arrays returned by `exposure_snr` and `exposure_grid`
+
+
+def _check_parameters(tel_diam: float,
+                      qe: float,
+                      readnoise: float,
+                      pixsize: float,
+                      skymag: float,
+                      exptime: np.ndarray,
+                      aper_rad: float) -> None:
+    """Raise `ValueError` if any of the instrument or observing parameters is not valid."""
     if tel_diam <= 0.0:
         raise ValueError("invalid telescope diameter, must be greater than 0")
     if qe <= 0.0 or qe > 1.0:
@@ -39,119 +52,301 @@ def calc_exposure(filter: str,
     if pixsize <= 0.0:
         raise ValueError("invalid pixel size, must be greater than 0")
     if readnoise <= 0.0:
-        raise ValueError("invainvalid readnoise, must be >= 0")
+        raise ValueError("invalid readnoise, must be >= 0")
     if skymag < 0.0 or skymag > 100.0:
         raise ValueError("invalid skymag, must be between 0.0 and 100.0 (whatever 100 would be...)")
-    if exptime <= 0.0:
+    if np.any(np.asarray(exptime) <= 0.0):
         raise ValueError("invalid exposure time, must be greater than 0")
     if aper_rad <= 0.0:
-        raise ValueError("id aperture radius, must be greater than 0")
+        raise ValueError("invalid aperture radius, must be greater than 0")
+
+
+def _photon_rates(filters: List[str],
+                  mag: np.ndarray,
+                  airmass: np.ndarray,
+                  skymag: float,
+                  tel_diam: float,
+                  qe: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Total star electrons per second (after extinction) and sky electrons per second per square arcsec.
     
-    extinct_coeff: float = filter_extinction.get(filter, 0.2)
-    nphoton: float = filter_mag_zeropoint.get(filter, 4.32e+06)
+    The rates have a leading filter axis followed by the broadcast shape of `mag` and `airmass`.
+    """
+    mag, airmass = np.broadcast_arrays(np.asarray(mag, dtype=float), np.asarray(airmass, dtype=float))
+    f_shape = (len(filters),) + (1,) * mag.ndim
+    extinct_coeff = np.array([filter_extinction.get(f, 0.2) for f in filters]).reshape(f_shape)
+    nphoton = np.array([filter_mag_zeropoint.get(f, 4.32e+06) for f in filters]).reshape(f_shape)
     
-     # how many pixels are inside the aperture?
-    npix = (np.pi * aper_rad * aper_rad) / (pixsize * pixsize)
+    # photons per second collected by the telescope and turned in to electrons, per unit of flux
+    collect = np.pi * tel_diam * tel_diam * 0.25 * qe * nphoton
     
-    # what fraction of star's light falls within aperture?
-    fraction = fraction_inside(fwhm, aper_rad, pixsize)
+    # star electrons, decreased due to extinction, and sky electrons per square arcsec
+    star_rate = 10.0 ** (-0.4 * (mag + airmass * extinct_coeff)) * collect
+    sky_rate = 10.0 ** (-0.4 * skymag) * collect
+    return star_rate, sky_rate
+
+
+def _electron_rates(filters: List[str],
+                    mag: np.ndarray,
+                    airmass: np.ndarray,
+                    tel_diam: float,
+                    qe: float,
+                    readnoise: float,
+                    pixsize: float,
+                    skymag: float,
+                    fwhm: float,
+                    aper_rad: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Star and sky electrons per second inside the aperture and the read electrons in the aperture."""
+    star_rate, sky_rate = _photon_rates(filters, mag, airmass, skymag, tel_diam, qe)
     
-    res = []
-    for mag in np.linarrangespace(mag_start, mag_end, dmag):
-        
-        # calculate # of electrons collected on the CCD from star, total
-        x = (10.0**(-0.4*mag)) * nphoton
-        x *= exptime
-        x *= np.pi * tel_diam * tel_diam * 0.25
-        x *= qe
-        star_electrons = x
-        
-        # decrease the # of electrons from star, due to extinction 
-        x = airmass * extinct_coeff
-        star_electrons *= 10**(-0.4*x)
-        
-        # now calculate # of electrons collected on CCD from sky, per pixel
-        x = (10.0**(-0.4 * skymag)) * nphoton
-        x *= exptime
-        x *= np.pi * tel_diam * tel_diam * 0.25
-        x *= qe
-        x *= pixsize * pixsize
-        sky_electrons_per_pix = x
-        
-        # this is the total number of electrons from star inside aperture
-        star_electrons *= fraction
-
-        # this is the total number of electrons from sky inside aperture
-        sky_electrons = sky_electrons_per_pix * npix
-
-        # this is the total number of electrons from readout in aperture 
-        read_electrons = readnoise * readnoise * npix
-        
-        # now we can calculate signal-to-noise
-        signal = star_electrons
-        noise = np.sqrt(read_electrons + sky_electrons + star_electrons)
-        signal_to_noise = signal / noise
-        
-        res.append((mag, star_electrons, sky_electrons, read_electrons, signal_to_noise))
+    # how many pixels are inside the aperture and what fraction of star's light falls within aperture?
+    npix = (np.pi * aper_rad * aper_rad) / (pixsize * pixsize)
+    fraction = fraction_inside(fwhm, aper_rad, pixsize)
     
-    return res
+    read_electrons = readnoise * readnoise * npix
+    return star_rate * fraction, sky_rate * pixsize * pixsize * npix, read_electrons
 
 
-def fraction_inside(fwhm, radius, pixsize) -> float:
+def exposure_snr(filter_name: str | Sequence[str],
+                 mag: np.ndarray,
+                 airmass: np.ndarray,
+                 exptime: np.ndarray,
+                 tel_diam: float,
+                 qe: float,
+                 readnoise: float,
+                 pixsize: float,
+                 skymag: float,
+                 fwhm: float,
+                 aper_rad: float) -> np.ndarray:
+    """Star, sky and read electrons in the aperture and the resulting SNR for broadcast arrays of magnitudes,
+    airmasses and exposure times.
+
+    `mag`, `airmass` and `exptime` are broadcast against each other (so eg one magnitude and airmass per star 
+    and a single exposure time works) and, if a list of filters is given, a leading filter axis is added.
+
+    Args:
+        filter_name (str | Sequence[str]): Filter or a list of filters.
+        mag (np.ndarray): Star magnitudes.
+        airmass (np.ndarray): Airmasses.
+        exptime (np.ndarray): Exposure times in seconds.
+        tel_diam (float): Telescope diameter in cm.
+        qe (float): Quantum efficiency, between 0 and 1.
+        readnoise (float): Read noise in electrons.
+        pixsize (float): Pixel size in arcsec.
+        skymag (float): Sky brightness in magnitudes per square arcsec.
+        fwhm (float): Seeing FWHM in arcsec.
+        aper_rad (float): Photometry aperture radius in arcsec.
+
+    Returns:
+        np.ndarray: Structured array with `exposure_dtype` fields and the broadcast shape of the inputs
+            (with the filter axis first when a list of filters is given).
+    """
+    _check_parameters(tel_diam, qe, readnoise, pixsize, skymag, exptime, aper_rad)
+    single = isinstance(filter_name, str)
+    filters = [filter_name] if single else list(filter_name)
+    mag, airmass, exptime = np.broadcast_arrays(np.asarray(mag, dtype=float), np.asarray(airmass, dtype=float), np.asarray(exptime, dtype=float))
+    f_shape = (len(filters),) + (1,) * mag.ndim
+    star_rate, sky_rate, read_electrons = _electron_rates(filters, mag, airmass, tel_diam, qe, readnoise, pixsize, skymag, fwhm, aper_rad)
+    star_electrons = star_rate * exptime
+    sky_electrons = sky_rate * exptime
     
-    # how many pieces do we sub-divide pixels into?
-    piece = 20
+    res = np.empty((len(filters),) + mag.shape, dtype=exposure_dtype)
+    res['filter'] = np.array(filters).reshape(f_shape)
+    res['mag'] = mag
+    res['airmass'] = airmass
+    res['exptime'] = exptime
+    res['star_electrons'] = star_electrons
+    res['sky_electrons'] = sky_electrons
+    res['read_electrons'] = read_electrons
+    res['snr'] = star_electrons / np.sqrt(read_electrons + sky_electrons + star_electrons)
+    return res[0] if single else res
+
+
+def exposure_grid(filters: str | Sequence[str],
+                  mags: np.ndarray,
+                  airmasses: np.ndarray,
+                  exptimes: np.ndarray,
+                  tel_diam: float,
+                  qe: float,
+                  readnoise: float,
+                  pixsize: float,
+                  skymag: float,
+                  fwhm: float,
+                  aper_rad: float) -> np.ndarray:
+    """Full `filter × magnitude × airmass × exposure time` grid, see `exposure_snr` for the parameters.
+
+    Returns:
+        np.ndarray: Structured array of shape `(len(filters), len(mags), len(airmasses), len(exptimes))`
+            (without the filter axis if a single filter name is given).
+    """
+    m, a, e = np.ix_(np.atleast_1d(mags), np.atleast_1d(airmasses), np.atleast_1d(exptimes))
+    return exposure_snr(filters, m, a, e, tel_diam, qe, readnoise, pixsize, skymag, fwhm, aper_rad)
+
 
+def exposure_for_snr(snr: np.ndarray,
+                     filter_name: str,
+                     mag: np.ndarray,
+                     airmass: np.ndarray,
+                     tel_diam: float,
+                     qe: float,
+                     readnoise: float,
+                     pixsize: float,
+                     skymag: float,
+                     fwhm: float,
+                     aper_rad: float) -> np.ndarray:
+    """Exposure time needed to reach the target SNR, the inverse of `exposure_snr`.
+
+    With `S` and `B` the star and sky electron rates in the aperture and `R` the read electrons, the SNR is 
+    `S t / sqrt((S + B) t + R)` so the exposure is the positive root of `S^2 t^2 - SNR^2 (S + B) t - SNR^2 R = 0`.
+    Everything is broadcast so one call handles a whole catalogue.
+
+    Args:
+        snr (np.ndarray): Target SNR.
+        filter_name (str): Filter.
+        mag (np.ndarray): Star magnitudes, `NaN` gives `NaN` exposures.
+        airmass (np.ndarray): Airmasses.
+        tel_diam (float): Telescope diameter in cm.
+        qe (float): Quantum efficiency, between 0 and 1.
+        readnoise (float): Read noise in electrons.
+        pixsize (float): Pixel size in arcsec.
+        skymag (float): Sky brightness in magnitudes per square arcsec.
+        fwhm (float): Seeing FWHM in arcsec.
+        aper_rad (float): Photometry aperture radius in arcsec.
+
+    Returns:
+        np.ndarray: Exposure times in seconds.
+    """
+    _check_parameters(tel_diam, qe, readnoise, pixsize, skymag, 1.0, aper_rad)
+    star_rate, sky_rate, read_electrons = _electron_rates([filter_name], mag, airmass, tel_diam, qe, readnoise, pixsize, skymag, fwhm, aper_rad)
+    snr2 = np.asarray(snr, dtype=float) ** 2
+    b = snr2 * (star_rate[0] + sky_rate[0])
+    return (b + np.sqrt(b * b + 4.0 * star_rate[0] ** 2 * snr2 * read_electrons)) / (2.0 * star_rate[0] ** 2)
+
+
+def snr_for_precision(depth: np.ndarray, precision: float) -> np.ndarray:
+    """SNR needed for the photometric error of one exposure to be `precision` times the transit `depth` (both in mag)."""
+    return 2.5 / np.log(10.0) / (np.asarray(depth, dtype=float) * precision)
+
+
+def saturation_exposure(filter_name: str,
+                        mag: np.ndarray,
+                        airmass: np.ndarray,
+                        tel_diam: float,
+                        qe: float,
+                        pixsize: float,
+                        skymag: float,
+                        fwhm: float,
+                        full_well: float) -> np.ndarray:
+    """Exposure time at which the brightest pixel of a star centred on a pixel reaches the full well.
+
+    Args:
+        filter_name (str): Filter.
+        mag (np.ndarray): Star magnitudes.
+        airmass (np.ndarray): Airmasses.
+        tel_diam (float): Telescope diameter in cm.
+        qe (float): Quantum efficiency, between 0 and 1.
+        pixsize (float): Pixel size in arcsec.
+        skymag (float): Sky brightness in magnitudes per square arcsec.
+        fwhm (float): Seeing FWHM in arcsec.
+        full_well (float): Full well capacity in electrons.
+
+    Returns:
+        np.ndarray: Exposure times in seconds.
+    """
+    star_rate, sky_rate = _photon_rates([filter_name], mag, airmass, skymag, tel_diam, qe)
+    # fraction of the star light falling in to the central pixel
+    sigma = fwhm / 2.35
+    peak = math.erf(pixsize / (2.0 * math.sqrt(2.0) * sigma)) ** 2
+    return full_well / (star_rate[0] * peak + sky_rate[0] * pixsize * pixsize)
+
+
+def calc_exposure(filter: str,  # pylint:disable=redefined-builtin
+                  mag_start: float,
+                  mag_end: float,
+                  dmag: float,
+                  tel_diam: float,
+                  qe: float,
+                  readnoise: float,
+                  pixsize: float,
+                  skymag: float,
+                  airmass: float,
+                  exptime: float,
+                  fwhm: float,
+                  aper_rad: float) -> List[Tuple[float, float, float, float, float]]:
+    """Electrons and SNR for magnitudes from `mag_start` to `mag_end` (inclusive) in `dmag` steps.
+
+    Returns:
+        List[Tuple[float, float, float, float, float]]: (mag, star electrons, sky electrons, read electrons, SNR) tuples.
+    """
+    if mag_start > mag_end or dmag <= 0.0:
+        raise ValueError("invalid magnitude start/end or delta values")
+    mags = np.arange(mag_start, mag_end + 0.5 * dmag, dmag)
+    res = exposure_snr(filter, mags, airmass, exptime, tel_diam, qe, readnoise, pixsize, skymag, fwhm, aper_rad)
+    return [(r['mag'], r['star_electrons'], r['sky_electrons'], r['read_electrons'], r['snr']) for r in res]
+
+
+def fraction_inside(fwhm: float | np.ndarray,
+                    radius: float | np.ndarray,
+                    pixsize: float,
+                    psf_center: Tuple[float, float] = (0.5, 0.5)) -> float | np.ndarray:
+    """Fraction of the light of a Gaussian star that falls inside a circular aperture sampled on the pixel grid.
+
+    Every pixel is split in to 20x20 pieces and the pieces with centres inside the aperture are counted. The Gaussian
+    is separable so the sums along `x` and `y` are done with cumulative sums instead of visiting every piece, and the
+    results are memoised on `(FWHM/pixsize, radius/pixsize, centring)` so repeated queries are just a lookup.
+
+    Args:
+        fwhm (float | np.ndarray): Seeing FWHM in arcsec.
+        radius (float | np.ndarray): Aperture radius in arcsec.
+        pixsize (float): Pixel size in arcsec.
+        psf_center (Tuple[float, float], optional): Placement of the star on the pixel grid, (0, 0) to make the star
+            centered on a junction of four pixels and (0.5, 0.5) to make it centered on one pixel. Defaults to (0.5, 0.5).
+
+    Returns:
+        float | np.ndarray: The fraction, an array if `fwhm` or `radius` are arrays.
+    """
     # sanity check
     if pixsize <= 0.0:
         raise ValueError("radius must be greater than zero")
-    
-    # rescale FWHM and aperture radius into pixels (instead of arcsec)
-    fwhm /= pixsize
-    radius /= pixsize
-
-    max_pix_rad = 30
 
+    # rescale FWHM and aperture radius into pixels (instead of arcsec)
+    fwhm_pix = np.asarray(fwhm, dtype=float) / pixsize
+    radius_pix = np.asarray(radius, dtype=float) / pixsize
     # check to make sure user isn't exceeding our built-in limits
-    if radius >= max_pix_rad:
-        print(f"Warning: radius exceeds limit of {max_pix_rad}")
-    
+    if np.any(radius_pix >= FRACTION_INSIDE_MAX_RADIUS):
+        logging.getLogger().warning("Aperture radius exceeds the limit of %d pixels", FRACTION_INSIDE_MAX_RADIUS)
+    if fwhm_pix.ndim == 0 and radius_pix.ndim == 0:
+        return _fraction_inside(float(fwhm_pix), float(radius_pix), float(psf_center[0]), float(psf_center[1]))
+    fwhm_pix, radius_pix = np.broadcast_arrays(fwhm_pix, radius_pix)
+    res = [_fraction_inside(float(f), float(r), float(psf_center[0]), float(psf_center[1])) for f, r in zip(fwhm_pix.flat, radius_pix.flat)]
+    return np.array(res).reshape(fwhm_pix.shape)
 
-    # these values control the placement of the star on the pixel grid:
-    #    (0,0) to make the star centered on a junction of four pixels
-    #    (0.5, 0.5) to make star centered on one pixel
-    psf_center_x = 0.5;
-    psf_center_y = 0.5;
+
+@lru_cache(maxsize=4096)
+def _fraction_inside(fwhm: float, radius: float, psf_center_x: float, psf_center_y: float) -> float:
+    """`fraction_inside` for FWHM and radius in pixels."""
+    # how many pieces do we sub-divide pixels into?
+    piece = 20
+    max_pix_rad = FRACTION_INSIDE_MAX_RADIUS
 
     sigma2 = fwhm / 2.35
     sigma2 = sigma2 * sigma2
-    radius2 = radius * radius
     bit = 1.0 / piece
 
-    rad_sum = 0.0
-    all_sum = 0.0
-
-    for i in np.arrange(0.0-max_pix_rad, max_pix_rad, 1.0): 
-        for j in np.arrange(0.0-max_pix_rad, max_pix_rad, 1.0):
-            # now, how much light falls into pixel (i, j)?
-            pix_sum = 0.0
-            for k in range(piece):
-                x = (i - psf_center_x) + (k + 0.5) * bit
-                fx = np.exp(-(x * x) / (2.0 * sigma2))
-
-                for l in range(piece):
-                    y = (j - psf_center_y) + (l + 0.5) * bit
-                    fy = np.exp(-(y * y) / (2.0 * sigma2))
-                    
-                    inten = fx * fy
-                    this_bit =  inten * bit * bit
-                    pix_sum += this_bit
-                    
-                    rad2 = x * x +  y * y
-                    if rad2 <= radius2:
-                        rad_sum += this_bit
-
-            all_sum += pix_sum
-
-    ratio = rad_sum / all_sum
-    return ratio
+    # centres of all the pieces along one axis, relative to the star
+    offsets = (np.arange(piece) + 0.5) * bit
+    pix = np.arange(0.0 - max_pix_rad, max_pix_rad, 1.0)
+    x = ((pix - psf_center_x)[:, np.newaxis] + offsets).ravel()
+    y = np.sort(((pix - psf_center_y)[:, np.newaxis] + offsets).ravel())
+    fx = np.exp(-(x * x) / (2.0 * sigma2)) * bit
+    fy = np.exp(-(y * y) / (2.0 * sigma2)) * bit
+    all_sum = fx.sum() * fy.sum()
+
+    # for each x the pieces inside the aperture are the ones with |y| <= sqrt(r^2 - x^2)
+    cum_fy = np.concatenate([[0.0], np.cumsum(fy)])
+    y_max = np.sqrt(np.clip(radius * radius - x * x, 0.0, None))
+    inside = np.abs(x) <= radius
+    lo = np.searchsorted(y, -y_max, side='left')
+    hi = np.searchsorted(y, y_max, side='right')
+    rad_sum = np.sum(np.where(inside, fx * (cum_fy[hi] - cum_fy[lo]), 0.0))
+
+    return rad_sum / all_sum
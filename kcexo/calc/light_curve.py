@@ -0,0 +1,241 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore Agol logg teff laguerre lstsq
+"""Limb-darkened transit light curves for many planets and many time samples at once."""
+import csv
+from pathlib import Path
+from typing import Tuple, List
+
+import numpy as np
+import astropy.units as u
+import astropy.constants as const
+from scipy.interpolate import RegularGridInterpolator
+
+from kcexo.calc.orbits import planet_orbits
+
+
+filter_wavelength = {
+    'U': 365 * u.nm,
+    'B': 445 * u.nm,
+    'V': 551 * u.nm,
+    'R': 658 * u.nm,
+    'I': 806 * u.nm,
+    'G': 673 * u.nm
+}  #: effective wavelengths of the filters we know about
+
+
+class LimbDarkeningTable():
+    """Quadratic limb-darkening coefficients on a regular (Teff, logg, [Fe/H]) grid.
+
+    Lookups are vectorised and use linear interpolation between the grid nodes. Values outside
+    of the grid are clamped to the grid edges so every star gets *some* coefficients.
+    """
+
+    def __init__(self,
+                 teff: np.ndarray,
+                 logg: np.ndarray,
+                 feh: np.ndarray,
+                 u1: np.ndarray,
+                 u2: np.ndarray) -> None:
+        """Create the table.
+
+        Args:
+            teff (np.ndarray): Effective temperature grid in K, increasing.
+            logg (np.ndarray): Surface gravity grid in dex (cgs), increasing.
+            feh (np.ndarray): Metallicity grid in dex, increasing.
+            u1 (np.ndarray): Linear coefficients with shape (len(teff), len(logg), len(feh)).
+            u2 (np.ndarray): Quadratic coefficients with shape (len(teff), len(logg), len(feh)).
+        """
+        self.teff = np.asarray(teff, dtype=float)
+        self.logg = np.asarray(logg, dtype=float)
+        self.feh = np.asarray(feh, dtype=float)
+        # interpolators need at least two points in each dimension so duplicate single-valued axes
+        axes = [a if len(a) > 1 else np.array([a[0], a[0] + 1.0]) for a in (self.teff, self.logg, self.feh)]
+        coeffs = np.stack([np.asarray(u1, dtype=float), np.asarray(u2, dtype=float)], axis=-1)
+        for n, a in enumerate((self.teff, self.logg, self.feh)):
+            if len(a) == 1:
+                coeffs = np.repeat(coeffs, 2, axis=n)
+        self._axes = axes
+        self._interp = RegularGridInterpolator(axes, coeffs, 'linear', bounds_error=False, fill_value=None)
+
+    def __call__(self,
+                 teff: np.ndarray,
+                 logg: np.ndarray | None = None,
+                 feh: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (u1, u2) coefficients for the stars.
+
+        Args:
+            teff (np.ndarray): Effective temperatures in K.
+            logg (np.ndarray | None, optional): Surface gravities in dex. Defaults to None meaning solar (4.44).
+            feh (np.ndarray | None, optional): Metallicities in dex. Defaults to None meaning solar (0.0).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: `u1` and `u2` with the broadcast shape of the inputs.
+        """
+        t = np.asarray(teff, dtype=float)
+        g = np.full_like(t, 4.44) if logg is None else np.asarray(logg, dtype=float)
+        f = np.zeros_like(t) if feh is None else np.asarray(feh, dtype=float)
+        t, g, f = np.broadcast_arrays(t, g, f)
+        # replace missing values with solar and clamp to the grid
+        t = np.where(np.isfinite(t), t, 5772.0)
+        g = np.where(np.isfinite(g), g, 4.44)
+        f = np.where(np.isfinite(f), f, 0.0)
+        pts = np.stack([np.clip(v, a[0], a[-1]) for v, a in zip((t, g, f), self._axes)], axis=-1)
+        res = self._interp(pts.reshape(-1, 3)).reshape(t.shape + (2,))
+        return res[..., 0], res[..., 1]
+
+    @staticmethod
+    def from_grey_atmosphere(filter_name: str = 'R',
+                             teff: np.ndarray | None = None,
+                             num_mu: int = 50) -> "LimbDarkeningTable":
+        """Create the table for a filter from the Eddington grey atmosphere.
+
+        The intensity profile `I(mu)` is obtained by integrating the Planck function at the filter's effective
+        wavelength over the grey atmosphere temperature structure `T^4 = 3/4 Teff^4 (tau + 2/3)` and the quadratic
+        law is then least-squares fitted to it. This ignores gravity and metallicity (so the table is flat in those)
+        and is good to ~0.1 in the coefficients which is plenty for planning. If proper model-atmosphere
+        coefficients (eg Claret's tables) are available, use `from_csv` instead.
+
+        Args:
+            filter_name (str, optional): Filter name, one of the keys of `filter_wavelength`. Defaults to 'R'.
+            teff (np.ndarray | None, optional): Temperature grid in K. Defaults to None meaning 2500K to 12000K every 250K.
+            num_mu (int, optional): Number of `mu` points used in the fit. Defaults to 50.
+
+        Returns:
+            LimbDarkeningTable: The table.
+        """
+        if teff is None:
+            teff = np.arange(2500.0, 12001.0, 250.0)
+        lam = filter_wavelength.get(filter_name, filter_wavelength['V']).to(u.m).value
+        hc_k = (const.h * const.c / const.k_B).to(u.m * u.K).value
+        s, w = np.polynomial.laguerre.laggauss(40)
+        mu = np.linspace(0.02, 1.0, num_mu)
+        # I(mu) = int B(T(tau)) exp(-tau/mu) dtau/mu with tau = mu*s, shape (teff, mu, s)
+        tau = mu[np.newaxis, :, np.newaxis] * s[np.newaxis, np.newaxis, :]
+        temp = (0.75 * teff[:, np.newaxis, np.newaxis] ** 4 * (tau + 2.0 / 3.0)) ** 0.25
+        intensity = (w / np.expm1(hc_k / (lam * temp))).sum(axis=2)
+        intensity /= intensity[:, -1:]
+        x = 1.0 - mu
+        design = np.stack([-x, -x * x], axis=1)
+        coeffs, _, _, _ = np.linalg.lstsq(design, (intensity - 1.0).T, rcond=None)
+        return LimbDarkeningTable(teff, np.array([4.44]), np.array([0.0]),
+                                  coeffs[0][:, np.newaxis, np.newaxis], coeffs[1][:, np.newaxis, np.newaxis])
+
+    @staticmethod
+    def from_csv(file_name: str | Path, filter_name: str) -> "LimbDarkeningTable":
+        """Load a table from a CSV file with `teff,logg,feh,filter,u1,u2` columns (and a header).
+
+        The rows for the filter have to cover a full regular grid, as is the case with eg Claret's tables.
+        """
+        rows: List[Tuple[float, float, float, float, float]] = []
+        with open(file_name, 'r', encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row['filter'].strip() == filter_name:
+                    rows.append((float(row['teff']), float(row['logg']), float(row['feh']), float(row['u1']), float(row['u2'])))
+        if not rows:
+            raise ValueError(f"No limb darkening coefficients for filter '{filter_name}' in {file_name}")
+        data = np.array(rows)
+        teff, ti = np.unique(data[:, 0], return_inverse=True)
+        logg, gi = np.unique(data[:, 1], return_inverse=True)
+        feh, fi = np.unique(data[:, 2], return_inverse=True)
+        if len(teff) * len(logg) * len(feh) != len(data):
+            raise ValueError(f"Limb darkening coefficients for filter '{filter_name}' in {file_name} are not on a regular grid")
+        u1 = np.empty((len(teff), len(logg), len(feh)))
+        u2 = np.empty_like(u1)
+        u1[ti, gi, fi] = data[:, 3]
+        u2[ti, gi, fi] = data[:, 4]
+        return LimbDarkeningTable(teff, logg, feh, u1, u2)
+
+
+def _overlap_area(r: np.ndarray, p: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Area of the overlap of a circle of radius `r` and a circle of radius `p` with centres `z` apart."""
+    r, p, z = np.broadcast_arrays(r, p, z)
+    area = np.zeros(r.shape)
+    inside_planet = z <= p - r
+    inside_ring = z <= r - p
+    partial = ~inside_planet & ~inside_ring & (z < r + p)
+    area[inside_planet] = np.pi * r[inside_planet] ** 2
+    area[inside_ring] = np.pi * p[inside_ring] ** 2
+    rr, pp, zz = r[partial], p[partial], z[partial]
+    k0 = np.arccos(np.clip((zz * zz + rr * rr - pp * pp) / (2 * zz * rr), -1, 1))
+    k1 = np.arccos(np.clip((zz * zz + pp * pp - rr * rr) / (2 * zz * pp), -1, 1))
+    sq = np.sqrt(np.clip(4 * zz * zz * rr * rr - (rr * rr + zz * zz - pp * pp) ** 2, 0, None))
+    area[partial] = rr * rr * k0 + pp * pp * k1 - 0.5 * sq
+    return area
+
+
+def transit_light_curve(z: np.ndarray,
+                        rp_over_rs: np.ndarray,
+                        u1: np.ndarray,
+                        u2: np.ndarray,
+                        num_annuli: int = 100,
+                        chunk_size: int = 20000) -> np.ndarray:
+    """Relative flux of a star with quadratic limb darkening during a transit.
+
+    This is the quadratic limb-darkening model of Mandel & Agol (2002) evaluated numerically: the stellar disk
+    is split in to annuli (denser towards the limb where the intensity changes the fastest) and the flux blocked
+    in each annulus is the exact circle overlap area times the annulus intensity. With the default number of
+    annuli the flux is good to a few ppm. Only the samples that are actually in transit are integrated.
+
+    Args:
+        z (np.ndarray): Projected star-planet distances in stellar radii, shape `(N, M)` for `N` planets and
+            `M` time samples (or `(M,)` for a single planet). Use `inf` for points where the planet is behind the star.
+        rp_over_rs (np.ndarray): Planet radii over stellar radii, one per planet.
+        u1 (np.ndarray): Linear limb-darkening coefficients, one per planet.
+        u2 (np.ndarray): Quadratic limb-darkening coefficients, one per planet.
+        num_annuli (int, optional): Number of annuli used in the integration. Defaults to 100.
+        chunk_size (int, optional): Number of in-transit samples integrated at a time to limit the memory use. Defaults to 20000.
+
+    Returns:
+        np.ndarray: Relative flux with the shape of `z`.
+    """
+    zz = np.asarray(z, dtype=float)
+    single = zz.ndim < 2
+    zz = np.atleast_2d(zz)
+    n = zz.shape[0]
+    p = np.broadcast_to(np.atleast_1d(np.asarray(rp_over_rs, dtype=float)), (n,))[:, np.newaxis]
+    c1 = np.broadcast_to(np.atleast_1d(np.asarray(u1, dtype=float)), (n,))[:, np.newaxis]
+    c2 = np.broadcast_to(np.atleast_1d(np.asarray(u2, dtype=float)), (n,))[:, np.newaxis]
+
+    # annuli edges are uniform in angle so they get denser towards the limb
+    edges = np.sin(np.linspace(0.0, np.pi / 2, num_annuli + 1))
+    mid = 0.5 * (edges[1:] + edges[:-1])
+    one_minus_mu = 1.0 - np.sqrt(1.0 - mid * mid)
+
+    flux = np.ones(zz.shape)
+    in_transit = np.nonzero(zz < 1.0 + p)
+    rows, cols = in_transit
+    for start in range(0, len(rows), chunk_size):
+        r_i = rows[start:start + chunk_size]
+        c_i = cols[start:start + chunk_size]
+        pp = p[r_i]
+        intensity = 1.0 - c1[r_i] * one_minus_mu - c2[r_i] * one_minus_mu ** 2
+        ring_area = np.pi * (edges[1:] ** 2 - edges[:-1] ** 2)
+        total = (intensity * ring_area).sum(axis=1)
+        blocked = np.diff(_overlap_area(edges[np.newaxis, :], pp, zz[r_i, c_i][:, np.newaxis]), axis=1)
+        flux[r_i, c_i] = 1.0 - (intensity * blocked).sum(axis=1) / total
+    return flux[0] if single else flux
+
+
+def planet_light_curves(rp_over_rs: np.ndarray,
+                        period: u.Quantity['time'],
+                        sma_over_rs: np.ndarray,
+                        eccentricity: np.ndarray,
+                        inclination: u.Quantity['angle'],
+                        periastron: u.Quantity['angle'],
+                        mid_time: np.ndarray,
+                        time_array: np.ndarray,
+                        u1: np.ndarray,
+                        u2: np.ndarray,
+                        num_annuli: int = 100) -> np.ndarray:
+    """Limb-darkened light curves for many planets over a shared `(M,)` or per-planet `(N, M)` time grid.
+
+    The projected distances come from `planet_orbits` so the parameters are the same as for that function.
+    Times when the planet is behind the star are ignored (ie there are no secondary eclipses).
+
+    Returns:
+        np.ndarray: Relative flux of shape `(N, M)`.
+    """
+    x_t, y_t, z_t = planet_orbits(period, sma_over_rs, eccentricity, inclination, periastron, mid_time, time_array)
+    z = np.sqrt(y_t * y_t + z_t * z_t)
+    z = np.where(x_t > 0, z, np.inf)
+    return transit_light_curve(z, rp_over_rs, u1, u2, num_annuli)
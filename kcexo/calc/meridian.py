@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore TETE
+"""Meridian crossings straight from the local sidereal time and the right ascension, for many stars and times at once."""
+from typing import Tuple
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation, TETE
+
+
+SIDEREAL_RATE: float = 1.00273781191135448  #: sidereal days per solar (UT1) day
+
+
+def meridian_transit_times(coords: SkyCoord,
+                           times: Time,
+                           location: EarthLocation,
+                           which: str = 'nearest') -> Time:
+    """Time of the meridian crossing (upper culmination) of every star nearest to (or next/previous to) every time.
+
+    The hour angle is the apparent local sidereal time minus the star's apparent (true equator and equinox of date)
+    right ascension, the crossing is then `-hour angle` away in sidereal time. The star's position is taken at
+    `times`, which is plenty as it moves by a fraction of a second of time in a day.
+
+    Args:
+        coords (SkyCoord): Stars, a scalar or broadcastable to `times`.
+        times (Time): Reference times.
+        location (EarthLocation): Observer's location.
+        which (str, optional): 'nearest', 'next' or 'previous' crossing. Defaults to 'nearest'.
+
+    Raises:
+        ValueError: If `which` is not one of the above.
+
+    Returns:
+        Time: Meridian crossing times (UTC) with the broadcast shape of `coords` and `times`.
+    """
+    apparent = coords.transform_to(TETE(obstime=times, location=location))
+    lst = times.sidereal_time('apparent', longitude=location.lon)
+    # hour angle in sidereal hours wrapped in to [-12, 12)
+    ha = np.mod((lst - apparent.ra).to(u.hourangle).value + 12.0, 24.0) - 12.0
+    if which == 'nearest':
+        pass
+    elif which == 'next':
+        ha = np.where(ha > 0.0, ha - 24.0, ha)
+    elif which == 'previous':
+        ha = np.where(ha < 0.0, ha + 24.0, ha)
+    else:
+        raise ValueError(f'"which" must be "next", "previous" or "nearest", not "{which}"')
+    return times.utc - (ha / SIDEREAL_RATE) * u.hour
+
+
+def meridian_crossing_flags(meridian_jd: np.ndarray,
+                            ingress_jd: np.ndarray,
+                            egress_jd: np.ndarray,
+                            t12_d: np.ndarray,
+                            crossing_duration_d: float,
+                            margin_d: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Does the meridian flip happen during the transit and is it a problem (during ingress or egress)?
+
+    A flip takes `crossing_duration_d` and the data a `margin_d` either side of the ingress and egress is needed,
+    see `Transit._set_meridian`. All the times must be in the same time scale.
+
+    Args:
+        meridian_jd (np.ndarray): Meridian crossing times as JDs.
+        ingress_jd (np.ndarray): Ingress (`t1`) times as JDs.
+        egress_jd (np.ndarray): Egress (`t4`) times as JDs.
+        t12_d (np.ndarray): Ingress durations in days.
+        crossing_duration_d (float): Duration of the meridian flip in days.
+        margin_d (float): Margin in days.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: `has_meridian_crossing` and `problem_meridian_crossing` flags.
+    """
+    t1_wm = ingress_jd - crossing_duration_d - margin_d
+    t2_wm = ingress_jd + t12_d + margin_d
+    t3_wm = egress_jd - t12_d - crossing_duration_d - margin_d
+    t4_wm = egress_jd + margin_d
+    has_crossing = (t1_wm <= meridian_jd) & (meridian_jd <= t4_wm)
+    problem = ((t1_wm <= meridian_jd) & (meridian_jd <= t2_wm)) | ((t3_wm <= meridian_jd) & (meridian_jd <= t4_wm))
+    return has_crossing, problem
@@ -1,9 +1,9 @@
 # -*- coding: UTF-8 -*-
 # cSpell:ignore Angelos Tsiaras
-import warnings
+from typing import Tuple
+
 import numpy as np
 import astropy.units as u
-from scipy.optimize import curve_fit as scipy_curve_fit
 
 
 # These functions have been copied from Angelos Tsiaras' HOPS `exoplanet_lc.py` file and then modified with types and Quantities.
@@ -11,12 +11,122 @@ from scipy.optimize import curve_fit as scipy_curve_fit
 
 
 
-def curve_fit(*args, **kwargs) -> tuple:
-    """Fit a curve while ignoring the messages about covariances."""
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore",
-                                message='Covariance of the parameters could not be estimated')
-        return scipy_curve_fit(*args, **kwargs)
+def solve_kepler(mean_anomaly: np.ndarray,
+                 eccentricity: np.ndarray | float,
+                 tolerance: float = 1e-10,
+                 max_iterations: int = 50) -> np.ndarray:
+    """Solve Kepler's equation `M = E - e sin(E)` for the eccentric anomaly `E`.
+
+    The solver is vectorised: `mean_anomaly` and `eccentricity` are broadcast against each
+    other and every element is iterated only until it has converged so a handful of
+    very eccentric orbits do not keep the whole array in the loop. The starting
+    value is Danby's `E0 = M + 0.85 e sign(sin M)` which converges in a few steps
+    even for orbits like HD 80606 (e~0.93) where starting from `M` does not.
+
+    Args:
+        mean_anomaly (np.ndarray): Mean anomaly in radians. Any shape.
+        eccentricity (np.ndarray | float): Eccentricity, broadcastable to `mean_anomaly`.
+        tolerance (float, optional): Convergence limit on the change of `E` in radians. Defaults to 1e-10.
+        max_iterations (int, optional): Maximum number of Newton steps for any element. Defaults to 50.
+
+    Raises:
+        RuntimeError: If some of the elements have not converged after `max_iterations` steps.
+
+    Returns:
+        np.ndarray: Eccentric anomaly in radians with the broadcast shape of the inputs.
+    """
+    m, ecc = np.broadcast_arrays(np.asarray(mean_anomaly, dtype=float), np.asarray(eccentricity, dtype=float))
+    shape = m.shape
+    m = np.mod(m, 2.0 * np.pi).ravel()
+    ecc = ecc.ravel()
+
+    e_t = m + 0.85 * ecc * np.sign(np.sin(m))
+    active = np.arange(m.size)
+    for _ in range(max_iterations):
+        ea = e_t[active]
+        ee = ecc[active]
+        delta = (ea - ee * np.sin(ea) - m[active]) / (1.0 - ee * np.cos(ea))
+        e_t[active] = ea - delta
+        active = active[np.abs(delta) >= tolerance]
+        if active.size == 0:
+            break
+    else:
+        raise RuntimeError(f'Failed to solve Kepler\'s equation for {active.size} element(s) in {max_iterations} iterations')
+    return e_t.reshape(shape)
+
+
+def planet_orbits(period_in: u.Quantity['time'],
+                  sma_over_rs: np.ndarray,
+                  eccentricity: np.ndarray,
+                  inclination_in: u.Quantity['angle'],
+                  periastron_in: u.Quantity['angle'],
+                  mid_time: np.ndarray,
+                  time_array: np.ndarray,
+                  ww_in: u.Quantity['angle'] = 0 * u.rad) -> list:
+    """Calculate the orbits in XYZ for many planets in one go.
+
+    All the orbital parameters are 1D arrays (or scalars) of length `N`, one value per planet.
+    The `time_array` is either a single time grid of length `M` that is shared by all planets
+    or a `(N, M)` array with a separate grid for each planet. Times and `mid_time` have to be
+    in the same time system (eg BJD_TDB) and in days.
+
+    Args:
+        period_in (u.Quantity['time']): Orbital periods.
+        sma_over_rs (np.ndarray): Semi-major axes over stellar radii.
+        eccentricity (np.ndarray): Eccentricities.
+        inclination_in (u.Quantity['angle']): Inclinations.
+        periastron_in (u.Quantity['angle']): Arguments of periastron.
+        mid_time (np.ndarray): Mid-transit times in days.
+        time_array (np.ndarray): Shared `(M,)` or per-planet `(N, M)` time grid in days.
+        ww_in (u.Quantity['angle'], optional): Longitudes of the ascending node. Defaults to 0 * u.rad.
+
+    Returns:
+        list: `[x, y, z]` positions in units of stellar radii, each of shape `(N, M)`.
+    """
+    return _planet_orbits(period_in.to(u.day).value, sma_over_rs, eccentricity, inclination_in.to(u.rad).value,
+                          periastron_in.to(u.rad).value, mid_time, time_array, ww_in.to(u.rad).value)
+
+
+def _planet_orbits(period_d: np.ndarray,
+                   sma_over_rs: np.ndarray,
+                   eccentricity: np.ndarray,
+                   inclination_rad: np.ndarray,
+                   periastron_rad: np.ndarray,
+                   mid_time: np.ndarray,
+                   time_array: np.ndarray,
+                   ww_rad: np.ndarray | float = 0.0) -> list:
+    """Unit-less version of `planet_orbits` with periods in days and angles in radians."""
+    period = np.atleast_1d(np.asarray(period_d, dtype=float))[:, np.newaxis]
+    inclination = np.atleast_1d(np.asarray(inclination_rad, dtype=float))[:, np.newaxis]
+    periastron = np.atleast_1d(np.asarray(periastron_rad, dtype=float))[:, np.newaxis]
+    ww = np.atleast_1d(np.asarray(ww_rad, dtype=float))[:, np.newaxis]
+    sma = np.atleast_1d(np.asarray(sma_over_rs, dtype=float))[:, np.newaxis]
+    ecc = np.atleast_1d(np.asarray(eccentricity, dtype=float))[:, np.newaxis]
+    t_mid = np.atleast_1d(np.asarray(mid_time, dtype=float))[:, np.newaxis]
+    times = np.asarray(time_array, dtype=float)
+    if times.ndim < 2:
+        times = np.atleast_1d(times)[np.newaxis, :]
+
+    # time of periastron from the time of the mid transit
+    f_tmid = np.pi / 2 - periastron
+    e_tmid = 2 * np.arctan(np.sqrt((1 - ecc) / (1 + ecc)) * np.tan(f_tmid / 2))
+    e_tmid = np.where(e_tmid < 0, e_tmid + 2 * np.pi, e_tmid)
+    tp = t_mid - (period / 2.0 / np.pi) * (e_tmid - ecc * np.sin(e_tmid))
+
+    m = np.mod(times - tp, period) * 2.0 * np.pi / period
+    e_t = solve_kepler(m, ecc)
+
+    f_t = 2 * np.arctan(np.sqrt((1 + ecc) / (1 - ecc)) * np.tan(e_t / 2))
+    r_t = sma * (1 - (ecc ** 2)) / (1 + ecc * np.cos(f_t))
+    f_t_plus_periastron = f_t + periastron
+    cos_f_t_plus_periastron = np.cos(f_t_plus_periastron)
+    sin_f_t_plus_periastron = np.sin(f_t_plus_periastron)
+
+    x_t = r_t * sin_f_t_plus_periastron * np.sin(inclination)
+    y_t = - r_t * (cos_f_t_plus_periastron * np.cos(ww) - sin_f_t_plus_periastron * np.sin(ww) * np.cos(inclination))
+    z_t = - r_t * (cos_f_t_plus_periastron * np.sin(ww) + sin_f_t_plus_periastron * np.cos(ww) * np.cos(inclination))
+
+    return [x_t, y_t, z_t]
 
 
 def planet_orbit(period_in: u.Quantity['time'], 
@@ -27,61 +137,14 @@ def planet_orbit(period_in: u.Quantity['time'],
                  mid_time: float, 
                  time_array: list, 
                  ww_in: u.Quantity['angle'] = 0 * u.rad) -> tuple:
-    """Calculate the orbit in XYZ for a planet"""
-    inclination = inclination_in.to(u.rad).value
-    periastron = periastron_in.to(u.rad).value
-    period = period_in.to(u.day).value
-    ww = ww_in.to(u.rad).value
+    """Calculate the orbit in XYZ for a planet.
     
-    if eccentricity == 0 and ww == 0:
-
-        e_t = (2 * np.pi / period) * (time_array - mid_time)
-        cos_e_t = np.cos(e_t)
-        sin_e_t = np.sin(e_t)
-
-        x_t = (sma_over_rs * np.sin(inclination)) * cos_e_t
-        y_t = sma_over_rs * sin_e_t
-        z_t = (- sma_over_rs * np.cos(inclination)) * cos_e_t
-
-    else:
-
-        f_tmid = np.pi / 2 - periastron
-        e_tmid = 2 * np.arctan(np.sqrt((1 - eccentricity) / (1 + eccentricity)) * np.tan(f_tmid / 2))
-        if e_tmid < 0:
-            e_tmid += 2 * np.pi
-        tp = mid_time - (period / 2.0 / np.pi) * (e_tmid - eccentricity * np.sin(e_tmid))
-
-        m = (time_array - tp - np.int_((time_array - tp) / period) * period) * 2.0 * np.pi / period
-        e_t0 = m
-        e_t = e_t0
-        stop = False
-        for _ in range(10000):  # setting a limit of 10k iterations - arbitrary limit
-            e_t = e_t0 - (e_t0 - eccentricity * np.sin(e_t0) - m) / (1 - eccentricity * np.cos(e_t0))
-            stop = (np.abs(e_t - e_t0) < 10 ** (-7)).all()
-            if stop:
-                break
-            else:
-                e_t0 = e_t
-        if not stop:
-            raise RuntimeError('Failed to find a solution in 10000 loops')
-
-        f_t = 2 * np.arctan(np.sqrt((1 + eccentricity) / (1 - eccentricity)) * np.tan(e_t / 2))
-        r_t = sma_over_rs * (1 - (eccentricity ** 2)) / (1 + eccentricity * np.cos(f_t))
-        f_t_plus_periastron = f_t + periastron
-        cos_f_t_plus_periastron = np.cos(f_t_plus_periastron)
-        sin_f_t_plus_periastron = np.sin(f_t_plus_periastron)
-
-        x_t = r_t * sin_f_t_plus_periastron * np.sin(inclination)
-
-        if ww == 0:
-            y_t = - r_t * cos_f_t_plus_periastron
-            z_t = - r_t * sin_f_t_plus_periastron * np.cos(inclination)
-
-        else:
-            y_t = - r_t * (cos_f_t_plus_periastron * np.cos(ww) - sin_f_t_plus_periastron * np.sin(ww) * np.cos(inclination))
-            z_t = - r_t * (cos_f_t_plus_periastron * np.sin(ww) + sin_f_t_plus_periastron * np.cos(ww) * np.cos(inclination))
-
-    return [x_t, y_t, z_t]
+    This is a single planet version of `planet_orbits` and the returned positions have the shape of `time_array`.
+    """
+    shape = np.shape(time_array)
+    x_t, y_t, z_t = planet_orbits(period_in, sma_over_rs, eccentricity, inclination_in, periastron_in,
+                                  mid_time, np.ravel(time_array), ww_in)
+    return [x_t.reshape(shape), y_t.reshape(shape), z_t.reshape(shape)]
 
 
 def planet_star_projected_distance(period: u.Quantity['time'], 
@@ -96,6 +159,180 @@ def planet_star_projected_distance(period: u.Quantity['time'],
 
     return np.sqrt(y_t * y_t + z_t * z_t)
 
+def _contact_distance(period: np.ndarray,
+                      sma_over_rs: np.ndarray,
+                      eccentricity: np.ndarray,
+                      inclination: np.ndarray,
+                      periastron: np.ndarray,
+                      time_offsets: np.ndarray) -> np.ndarray:
+    """Projected star-planet distance for each planet at times (in days) relative to its mid transit."""
+    _, y_t, z_t = _planet_orbits(period, sma_over_rs, eccentricity, inclination, periastron,
+                                 np.zeros(len(period)), time_offsets)
+    return np.sqrt(y_t * y_t + z_t * z_t)
+
+
+def _refine_contact(params: tuple,
+                    target: np.ndarray,
+                    lo: np.ndarray,
+                    hi: np.ndarray,
+                    tolerance: float,
+                    max_iterations: int) -> np.ndarray:
+    """Find `t` in `[lo, hi]` where the projected distance equals `target` for each planet.
+
+    The root has to be bracketed, ie `distance - target` has to change sign between `lo` and `hi`.
+    We take Newton steps, with the derivative estimated from a small time step in the same orbit
+    solve, and fall back to bisection whenever a step would leave the bracket.
+    """
+    def f(t: np.ndarray, which: np.ndarray) -> np.ndarray:
+        return _contact_distance(*[p[which] for p in params], t) - target[which][:, np.newaxis]
+
+    f_lo = f(lo[:, np.newaxis], np.arange(len(lo)))[:, 0]
+    t = 0.5 * (lo + hi)
+    active = np.arange(len(t))
+    dt = tolerance * 10.0
+    for _ in range(max_iterations):
+        tt = t[active]
+        fv = f(np.stack([tt, tt + dt], axis=1), active)
+        f_t = fv[:, 0]
+        slope = (fv[:, 1] - fv[:, 0]) / dt
+        # tighten the bracket
+        same_as_lo = np.sign(f_t) == np.sign(f_lo[active])
+        lo[active] = np.where(same_as_lo, tt, lo[active])
+        f_lo[active] = np.where(same_as_lo, f_t, f_lo[active])
+        hi[active] = np.where(same_as_lo, hi[active], tt)
+        # newton step or bisection if newton wanders off
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_new = tt - f_t / slope
+        outside = ~np.isfinite(t_new) | (t_new <= lo[active]) | (t_new >= hi[active])
+        t_new = np.where(outside, 0.5 * (lo[active] + hi[active]), t_new)
+        t[active] = t_new
+        done = (np.abs(t_new - tt) < tolerance) | (hi[active] - lo[active] < tolerance)
+        active = active[~done]
+        if active.size == 0:
+            break
+    return t
+
+
+def transit_contact_times(rp_over_rs: np.ndarray,
+                          period_in: u.Quantity['time'],
+                          sma_over_rs: np.ndarray,
+                          eccentricity: np.ndarray,
+                          inclination_in: u.Quantity['angle'],
+                          periastron_in: u.Quantity['angle'],
+                          tolerance: u.Quantity['time'] = 0.01 * u.s,
+                          num_grid_points: int = 64,
+                          max_iterations: int = 50) -> Tuple[u.Quantity['time'], u.Quantity['time'], u.Quantity['time']]:
+    """Total transit duration, ingress and egress durations for many planets at once.
+
+    The contact points are the times around the mid transit at which the projected star-planet distance
+    is `1 + Rp/Rs` (T1, T4) or `1 - Rp/Rs` (T2, T3). For each planet the distance is first sampled on a
+    grid around the mid transit to bracket every contact point, the grid is widened for the planets
+    where the bracketing failed, and then the brackets are refined using safeguarded Newton steps. All
+    of this is done for all planets at the same time.
+
+    The contact times are solved to `tolerance` (0.01s by default) which is well below the precision
+    of the orbital parameters. The results reproduce the published values for HD 80606b and HD 149026b 
+    within their quoted uncertainties (see `kcexo.calc.tests.test_orbit`).
+
+    Planets that do not transit have all three values set to `nan`. Grazing transits have no T2 and T3
+    so T12 and T34 are set to half of T14.
+
+    Args:
+        rp_over_rs (np.ndarray): Planet radii over stellar radii.
+        period_in (u.Quantity['time']): Orbital periods.
+        sma_over_rs (np.ndarray): Semi-major axes over stellar radii.
+        eccentricity (np.ndarray): Eccentricities.
+        inclination_in (u.Quantity['angle']): Inclinations.
+        periastron_in (u.Quantity['angle']): Arguments of periastron.
+        tolerance (u.Quantity['time'], optional): Accuracy of the contact times. Defaults to 0.01 * u.s.
+        num_grid_points (int, optional): Number of points used to bracket the contact points. Defaults to 64.
+        max_iterations (int, optional): Maximum number of refinement steps. Defaults to 50.
+
+    Returns:
+        Tuple[u.Quantity['time'], u.Quantity['time'], u.Quantity['time']]: T14, T12 and T34 in days, 
+            each with one value per planet.
+    """
+    rp = np.atleast_1d(np.asarray(rp_over_rs, dtype=float))
+    period = np.atleast_1d(period_in.to(u.day).value)
+    aa = np.atleast_1d(np.asarray(sma_over_rs, dtype=float))
+    ee = np.atleast_1d(np.asarray(eccentricity, dtype=float))
+    ii = np.atleast_1d(inclination_in.to(u.rad).value)
+    ww = np.atleast_1d(periastron_in.to(u.rad).value)
+    rp, period, aa, ee, ii, ww = np.broadcast_arrays(rp, period, aa, ee, ii, ww)
+    params = tuple(np.array(p) for p in (period, aa, ee, ii, ww))
+    n = len(rp)
+    tol = tolerance.to(u.day).value
+
+    # analytic approximation of the half duration to set up the search grid
+    ro_pt = (1 - ee ** 2) / (1 + ee * np.sin(ww))
+    b_pt = aa * ro_pt * np.cos(ii)
+    b_pt = np.where(b_pt > 1, 0.5, b_pt)
+    with np.errstate(invalid='ignore'):
+        df = np.arcsin(np.clip(np.sqrt(((1.0 + rp) ** 2 - b_pt ** 2) / ((aa ** 2) * (ro_pt ** 2) - b_pt ** 2)), 0, 1))
+    half = (period * (ro_pt ** 2)) / (np.pi * np.sqrt(1 - ee ** 2)) * df
+    half = np.where(np.isfinite(half) & (half > 0), half, period / 100.0)
+
+    outer = 1.0 + rp
+    inner = 1.0 - rp
+    t1_lo = np.full(n, np.nan)
+    t1_hi = np.full(n, np.nan)
+    t4_lo = np.full(n, np.nan)
+    t4_hi = np.full(n, np.nan)
+    t2_lo = np.full(n, np.nan)
+    t2_hi = np.full(n, np.nan)
+    t3_lo = np.full(n, np.nan)
+    t3_hi = np.full(n, np.nan)
+
+    # bracket the contact points, widening the window (up to a quarter of the period) where needed
+    todo = np.arange(n)
+    width = np.minimum(2.0 * half, period / 4.0)
+    grid = np.linspace(-1.0, 1.0, num_grid_points)
+    while todo.size:
+        offsets = width[todo][:, np.newaxis] * grid[np.newaxis, :]
+        dist = _contact_distance(*[p[todo] for p in params], offsets)
+        rows = np.arange(todo.size)
+        i_min = np.argmin(dist, axis=1)[:, np.newaxis]
+        d_min = dist[rows, i_min[:, 0]]
+        idx = np.arange(num_grid_points)[np.newaxis, :]
+        no_idx = num_grid_points
+        # last grid point before/first point after the minimum that is outside of the stellar disk (or its inner edge)
+        is_out = dist >= outer[todo][:, np.newaxis]
+        is_out_inner = dist >= inner[todo][:, np.newaxis]
+        j1 = np.max(np.where(is_out & (idx <= i_min), idx, -1), axis=1)
+        j4 = np.min(np.where(is_out & (idx >= i_min), idx, no_idx), axis=1)
+        j2 = np.max(np.where(is_out_inner & (idx < i_min), idx, -1), axis=1)
+        j3 = np.min(np.where(is_out_inner & (idx > i_min), idx, no_idx), axis=1)
+        transiting = d_min < outer[todo]
+        ok = transiting & (j1 >= 0) & (j4 < no_idx)
+        full = ok & (d_min < inner[todo])
+        p = todo[ok]
+        t1_lo[p], t1_hi[p] = offsets[rows[ok], j1[ok]], offsets[rows[ok], j1[ok] + 1]
+        t4_lo[p], t4_hi[p] = offsets[rows[ok], j4[ok] - 1], offsets[rows[ok], j4[ok]]
+        p = todo[full]
+        t2_lo[p], t2_hi[p] = offsets[rows[full], j2[full]], offsets[rows[full], j2[full] + 1]
+        t3_lo[p], t3_hi[p] = offsets[rows[full], j3[full] - 1], offsets[rows[full], j3[full]]
+        # planets that never get close enough to transit or already span a quarter of the period are done
+        retry = ~ok & transiting & (width[todo] < period[todo] / 4.0)
+        width[todo[retry]] = np.minimum(width[todo[retry]] * 4.0, period[todo[retry]] / 4.0)
+        todo = todo[retry]
+
+    # refine all four contact points of all planets in one go
+    lo = np.concatenate([t1_lo, t2_lo, t3_lo, t4_lo])
+    hi = np.concatenate([t1_hi, t2_hi, t3_hi, t4_hi])
+    target = np.concatenate([outer, inner, inner, outer])
+    planet = np.tile(np.arange(n), 4)
+    contacts = np.full(4 * n, np.nan)
+    valid = np.nonzero(np.isfinite(lo))[0]
+    if valid.size:
+        contacts[valid] = _refine_contact(tuple(p[planet[valid]] for p in params), target[valid], lo[valid], hi[valid], tol, max_iterations)
+    t1, t2, t3, t4 = contacts.reshape(4, n)
+
+    t14 = t4 - t1
+    t12 = np.where(np.isfinite(t2), t2 - t1, 0.5 * t14)
+    t34 = np.where(np.isfinite(t3), t4 - t3, 0.5 * t14)
+    return t14 * u.day, t12 * u.day, t34 * u.day
+
+
 def transit_duration(rp_over_rs: float, 
                      period_in: u.Quantity['time'], 
                      sma_over_rs: float, 
@@ -103,27 +340,8 @@ def transit_duration(rp_over_rs: float,
                      inclination_in: u.Quantity['angle'], 
                      periastron_in: u.Quantity['angle']) -> u.Quantity['time']:
     """Total transit duration calculated using function solving."""
-    ww = periastron_in.to(u.rad).value
-    ii = inclination_in.to(u.rad).value
-    period = period_in.to(u.day).value
-    ee = eccentricity
-    aa = sma_over_rs
-    ro_pt = (1 - ee ** 2) / (1 + ee * np.sin(ww))
-    b_pt = aa * ro_pt * np.cos(ii)
-    if b_pt > 1:
-        b_pt = 0.5
-    s_ps = 1.0 + rp_over_rs
-    df = np.arcsin(np.sqrt((s_ps ** 2 - b_pt ** 2) / ((aa ** 2) * (ro_pt ** 2) - b_pt ** 2)))
-    aprox = (period * (ro_pt ** 2)) / (np.pi * np.sqrt(1 - ee ** 2)) * df * 60 * 60 * 24
-
-    def function_to_fit(_, t):
-        return planet_star_projected_distance(period_in, sma_over_rs, eccentricity, inclination_in, periastron_in,
-                                              10000, np.array(10000 + t / 24 / 60 / 60))
-
-    popt1, _ = curve_fit(function_to_fit, [0], [1.0 + rp_over_rs], p0=[-aprox / 2])  # pylint:disable=unbalanced-tuple-unpacking
-    popt2, _ = curve_fit(function_to_fit, [0], [1.0 + rp_over_rs], p0=[aprox / 2])  # pylint:disable=unbalanced-tuple-unpacking
-
-    return (popt2[0] - popt1[0]) * u.s
+    t14, _, _ = transit_contact_times(rp_over_rs, period_in, sma_over_rs, eccentricity, inclination_in, periastron_in)
+    return t14[0].to(u.s)
 
 
 def transit_t12(rp_over_rs: float, 
@@ -133,17 +351,5 @@ def transit_t12(rp_over_rs: float,
                 inclination: u.Quantity['angle'], 
                 periastron: u.Quantity['angle']) -> u.Quantity['time']:
     """Transit T12 calculated using function solving."""
-    aprox = transit_duration(rp_over_rs, period, sma_over_rs, eccentricity, inclination, periastron).to(u.s).value
-
-    def function_to_fit(_, t):
-        return planet_star_projected_distance(period, sma_over_rs, eccentricity, inclination, periastron,
-                                              10000, np.array(10000 + t / 24 / 60 / 60))
-
-    popt1, _ = curve_fit(function_to_fit, [0], [1.0 + rp_over_rs], p0=[-aprox / 2])  # pylint:disable=unbalanced-tuple-unpacking
-    popt2, _ = curve_fit(function_to_fit, [0], [1.0 - rp_over_rs], p0=[-aprox / 2])  # pylint:disable=unbalanced-tuple-unpacking
-
-    res = min(
-        (popt2[0] - popt1[0]) / 24 / 60 / 60,
-        0.5*transit_duration(rp_over_rs, period, sma_over_rs, eccentricity, inclination, periastron).to(u.day).value
-        ) 
-    return res * u.day
+    t14, t12, _ = transit_contact_times(rp_over_rs, period, sma_over_rs, eccentricity, inclination, periastron)
+    return min(t12[0], 0.5 * t14[0])
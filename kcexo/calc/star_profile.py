@@ -1,10 +1,192 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore photutils ndarray fwhms DATE-OBS
+"""Seeing (FWHM) measurements of the stars in a FITS frame or in a whole night worth of frames."""
+import os
+import warnings
+import functools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Executor, Future
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, NamedTuple
 
 import numpy as np
-
+from astropy.stats import sigma_clipped_stats
+from astropy.time import Time
 from photutils.detection import DAOStarFinder
-from photutils.psf import (CircularGaussianPRF, fit_fwhm,
+from photutils.utils.exceptions import NoDetectionsWarning
+
+from kcexo.data.fits import get_image_and_header
+
+
+FWHM_FROM_SIGMA: float = 2.0 * np.sqrt(2.0 * np.log(2.0))  #: FWHM = 2.3548 sigma for a Gaussian
+
+
+class FrameFWHM(NamedTuple):
+    """Seeing measured in a single frame."""
+    file_name: str
+    date_obs: Time | None
+    fwhm: float  #: median FWHM of the stars in pixels, `NaN` if no stars were measured
+    fwhm_std: float  #: standard deviation of the star FWHMs in pixels
+    num_stars: int
+
+
+def calc_fwhms(image: np.ndarray,
+               fwhm_guess: float = 3.0,
+               threshold_sigma: float = 5.0,
+               box_size: int = 0,
+               max_stars: int = 200,
+               saturation: float | None = None) -> np.ndarray:
+    """Detect the stars in an image and measure their FWHM.
+
+    The stars are found with `DAOStarFinder` and the FWHM of each star comes from the second moments of the
+    background subtracted pixels in a circular window around it. All the stars are measured at once
+    on a `(num_stars, box_size, box_size)` stack of cutouts.
+
+    Args:
+        image (np.ndarray): 2D image.
+        fwhm_guess (float, optional): Approximate FWHM in pixels used for the detection. Defaults to 3.0.
+        threshold_sigma (float, optional): Detection threshold in background standard deviations. Defaults to 5.0.
+        box_size (int, optional): Size of the cutouts in pixels. Defaults to 0 meaning 4x `fwhm_guess` (and odd).
+        max_stars (int, optional): Only the brightest `max_stars` stars are measured. Defaults to 200.
+        saturation (float | None, optional): Stars with a peak above this value are ignored. Defaults to None.
+
+    Returns:
+        np.ndarray: FWHM in pixels of every measured star, can be empty.
+    """
+    data = np.asarray(image, dtype=float)
+    _, median, std = sigma_clipped_stats(data, sigma=3.0)
+    if box_size <= 0:
+        box_size = int(np.ceil(4.0 * fwhm_guess)) | 1
+    half = box_size // 2
+
+    finder = DAOStarFinder(fwhm=fwhm_guess, threshold=threshold_sigma * std, exclude_border=True)
+    with warnings.catch_warnings(action="ignore", category=NoDetectionsWarning):
+        sources = finder(data - median)
+    if sources is None or len(sources) == 0:
+        return np.array([])
+    x_col = 'x_centroid' if 'x_centroid' in sources.colnames else 'xcentroid'
+    y_col = 'y_centroid' if 'y_centroid' in sources.colnames else 'ycentroid'
+    x = np.asarray(sources[x_col], dtype=float)
+    y = np.asarray(sources[y_col], dtype=float)
+    peak = np.asarray(sources['peak'], dtype=float) + median
+    flux = np.asarray(sources['flux'], dtype=float)
+
+    keep = (x >= half) & (x < data.shape[1] - half - 1) & (y >= half) & (y < data.shape[0] - half - 1)
+    if saturation is not None:
+        keep &= peak < saturation
+    order = np.argsort(-flux[keep])[:max_stars]
+    x = x[keep][order]
+    y = y[keep][order]
+    if len(x) == 0:
+        return np.array([])
+
+    # cutouts of all the stars at once
+    offsets = np.arange(-half, half + 1)
+    xc = np.round(x).astype(int)
+    yc = np.round(y).astype(int)
+    cutouts = data[(yc[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis]),
+                   (xc[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :])] - median
+
+    # second moments around the centroids inside a circular window
+    dx = offsets[np.newaxis, np.newaxis, :] - (x - xc)[:, np.newaxis, np.newaxis]
+    dy = offsets[np.newaxis, :, np.newaxis] - (y - yc)[:, np.newaxis, np.newaxis]
+    window = (dx * dx + dy * dy) <= half * half
+    weights = np.where(window, np.clip(cutouts, 0.0, None), 0.0)
+    total = weights.sum(axis=(1, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var_x = (weights * dx * dx).sum(axis=(1, 2)) / total
+        var_y = (weights * dy * dy).sum(axis=(1, 2)) / total
+        # remove the pixel sampling contribution to the variance
+        sigma = np.sqrt(0.5 * (var_x + var_y) - 1.0 / 12.0)
+    fwhm = FWHM_FROM_SIGMA * sigma
+    return fwhm[np.isfinite(fwhm) & (fwhm > 0)]
+
+
+def frame_fwhm(file_name: str | Path,
+               image_hdu_index: int = 0,
+               fwhm_guess: float = 3.0,
+               threshold_sigma: float = 5.0,
+               max_stars: int = 200) -> FrameFWHM:
+    """Measure the seeing of a single FITS frame, see `calc_fwhms` for the parameters.
+
+    Returns:
+        FrameFWHM: Median (and spread) of the FWHMs of the stars in the frame.
+    """
+    header, data = get_image_and_header(file_name, image_hdu_index)
+    date_obs = None
+    if header is not None and 'DATE-OBS' in header:
+        date_obs = Time(header['DATE-OBS'])
+    fwhms = np.array([])
+    if data is not None:
+        fwhms = calc_fwhms(data, fwhm_guess, threshold_sigma, max_stars=max_stars)
+    if len(fwhms) == 0:
+        return FrameFWHM(str(file_name), date_obs, np.nan, np.nan, 0)
+    return FrameFWHM(str(file_name), date_obs, float(np.median(fwhms)), float(np.std(fwhms)), len(fwhms))
+
+
+def iter_frame_fwhms(files: Iterable[str | Path] | str | Path,
+                     pattern: str = "*.fit*",
+                     workers: int | None = None,
+                     max_pending: int = 0,
+                     executor: Executor | None = None,
+                     **kwargs) -> Iterator[FrameFWHM]:
+    """Measure the seeing in many frames using a pool of processes.
+
+    The frames are measured in parallel but the results are yielded in the order of the files. At most
+    `max_pending` frames are in flight at any time so memory use does not grow with the number of frames.
+
+    Args:
+        files (Iterable[str | Path] | str | Path): FITS files or a directory with them.
+        pattern (str, optional): Glob pattern used if `files` is a directory. Defaults to "*.fit*".
+        workers (int | None, optional): Number of worker processes. Defaults to None meaning the number of CPUs.
+        max_pending (int, optional): Maximum number of frames being processed at once. Defaults to 0 meaning twice
+            the number of workers.
+        executor (Executor | None, optional): Executor to use instead of creating a process pool. Defaults to None.
+        **kwargs: Passed to `frame_fwhm`.
+
+    Yields:
+        FrameFWHM: Seeing of each frame.
+    """
+    if isinstance(files, (str, Path)) and Path(files).is_dir():
+        files = sorted(Path(files).glob(pattern))
+    elif isinstance(files, (str, Path)):
+        files = [files]
+    workers = workers or os.cpu_count() or 1
+    if max_pending <= 0:
+        max_pending = 2 * workers
+    measure = functools.partial(frame_fwhm, **kwargs)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    pending: Deque[Future] = deque()
+    try:
+        for file_name in files:
+            pending.append(executor.submit(measure, file_name))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def fwhm_time_series(files: Iterable[str | Path] | str | Path,
+                     pixel_scale: float = 1.0,
+                     **kwargs) -> List[FrameFWHM]:
+    """Seeing in all the frames, sorted by the observation time and optionally converted to arcsec.
 
-                           make_psf_model_image)
+    Args:
+        files (Iterable[str | Path] | str | Path): FITS files or a directory with them.
+        pixel_scale (float, optional): Arcsec per pixel. Defaults to 1.0 meaning that the FWHMs stay in pixels.
+        **kwargs: Passed to `iter_frame_fwhms`.
 
-def calc_fwhms(image: np.ndarray) -> np.ndarray:
-    
\ No newline at end of file
+    Returns:
+        List[FrameFWHM]: Seeing of each frame.
+    """
+    res = [f._replace(fwhm=f.fwhm * pixel_scale, fwhm_std=f.fwhm_std * pixel_scale) for f in iter_frame_fwhms(files, **kwargs)]
+    res.sort(key=lambda f: f.date_obs.jd if f.date_obs is not None else np.inf)
+    return res
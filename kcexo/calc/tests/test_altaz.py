@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore altaz astroplan
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation
+from astroplan import Observer
+
+from kcexo.calc.altaz import altitude_azimuth, fast_altaz, AltAzTrackCache
+
+
+LOCATION = EarthLocation.from_geodetic(-1.5 * u.deg, 52.0 * u.deg, 100 * u.m)
+
+
+def _stars_and_times(num_stars: int = 200, num_times: int = 50):
+    rng = np.random.default_rng(42)
+    coords = SkyCoord(rng.uniform(0.0, 360.0, num_stars) * u.deg,
+                      np.rad2deg(np.arcsin(rng.uniform(-0.7, 1.0, num_stars))) * u.deg)
+    # a year of dates
+    times = Time('2025-01-01') + np.sort(rng.uniform(0.0, 365.0, (num_stars, num_times)), axis=1) * u.day
+    return coords[:, np.newaxis], times
+
+
+@pytest.mark.parametrize("pressure", [0.0, 1010.0])
+def test_fast_against_astropy(pressure):
+    observer = Observer(location=LOCATION, pressure=pressure * u.hPa, temperature=10 * u.deg_C, relative_humidity=0.5)
+    coords, times = _stars_and_times()
+    alt, az = altitude_azimuth(coords, times, observer, 'exact')
+    fast_alt, fast_az = altitude_azimuth(coords, times, observer, 'fast')
+    assert fast_alt.shape == alt.shape and fast_az.shape == az.shape
+    # the refraction formulae differ close to the horizon
+    up = alt > 5.0
+    assert np.max(np.abs(fast_alt - alt)[up]) < 0.05
+    az_err = np.abs(np.mod(fast_az - az + 180.0, 360.0) - 180.0) * np.cos(np.deg2rad(alt))
+    assert np.max(az_err[up]) < 0.05
+    assert np.all((fast_az >= 0.0) & (fast_az < 360.0))
+
+
+def test_fast_altaz_simple_cases():
+    # the celestial pole is at the altitude of the latitude and due north
+    alt, az = fast_altaz(0.0, 90.0, 2451545.0, 52.0, 0.0)
+    assert alt == pytest.approx(52.0, abs=0.01)
+    assert min(az, 360.0 - az) < 1.0
+    # a star on the meridian at J2000 is south of the observer at 90 - latitude + declination
+    ra = 280.46061837  # the mean sidereal time at Greenwich at J2000
+    alt, az = fast_altaz(ra, 10.0, 2451545.0, 52.0, 0.0)
+    assert alt == pytest.approx(48.0, abs=1e-6)
+    assert az == pytest.approx(180.0, abs=1e-6)
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        altitude_azimuth(SkyCoord(0.0 * u.deg, 0.0 * u.deg), Time('2025-01-01'), Observer(location=LOCATION), 'rough')
+
+
+def _contacts(num_transits: int):
+    rng = np.random.default_rng(7)
+    start = 2460700.0 + rng.uniform(0.0, 30.0, num_transits)
+    offsets = np.array([0.0, 0.04, 0.08, 0.12, 0.16])
+    return Time(start[:, np.newaxis] + offsets, format='jd', scale='utc')
+
+
+@pytest.mark.parametrize("precision", ['exact', 'fast'])
+def test_track_cache(precision):
+    observer = Observer(location=LOCATION, pressure=1010 * u.hPa, temperature=10 * u.deg_C)
+    cache = AltAzTrackCache(observer, precision)
+    coords = SkyCoord([15.0, 111.9, 250.0] * u.deg, [-20.0, 24.3, 45.0] * u.deg)
+    contacts = _contacts(3)
+    jds, alt, az, idx = cache.get_tracks(coords, contacts, 10)
+    assert jds.shape == alt.shape == az.shape == (3, 13)
+    assert np.all(np.diff(jds, axis=1) >= 0.0)
+    assert np.take_along_axis(jds, idx, axis=1) == pytest.approx(contacts.jd, abs=1e-9)
+    expected_alt, expected_az = altitude_azimuth(coords[:, np.newaxis], Time(jds, format='jd', scale='utc'), observer, precision)
+    assert alt == pytest.approx(expected_alt)
+    assert az == pytest.approx(expected_az)
+    assert cache.misses == 3 and cache.hits == 0
+
+    # the filter's contact times and a plot's track are served from the cache
+    contact_alt, _ = cache.contact_altaz(coords, contacts, 10)
+    assert contact_alt == pytest.approx(np.take_along_axis(alt, idx, axis=1))
+    times, track_alt, _ = cache.track(coords[1], contacts[1], 10)
+    assert track_alt == pytest.approx(alt[1])
+    assert times.jd == pytest.approx(jds[1])
+    assert cache.misses == 3 and cache.hits == 4
+    # a different number of points is a different track
+    cache.track(coords[1], contacts[1], 20)
+    assert cache.misses == 4 and len(cache) == 4
+
+
+def test_track_cache_lru():
+    cache = AltAzTrackCache(Observer(location=LOCATION), 'fast', max_tracks=4)
+    coords = SkyCoord(np.linspace(0.0, 300.0, 6) * u.deg, np.linspace(-20.0, 60.0, 6) * u.deg)
+    contacts = _contacts(6)
+    # more tracks than the cache holds are still all returned
+    _, alt, _, _ = cache.get_tracks(coords, contacts)
+    assert alt.shape[0] == 6 and len(cache) == 4
+    # the first two were evicted, using the third makes it the most recent
+    cache.get_tracks(coords[2:3], contacts[2:3])
+    assert cache.hits == 1
+    cache.get_tracks(coords[:1], contacts[:1])
+    assert cache.misses == 7 and len(cache) == 4
+    cache.get_tracks(coords[2:4], contacts[2:4])
+    assert cache.hits == 2 and cache.misses == 8
+    empty = cache.get_tracks(coords[:0], contacts[:0])
+    assert empty[0].shape == (0, 23) and empty[3].shape == (0, 5)
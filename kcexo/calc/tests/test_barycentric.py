@@ -0,0 +1,50 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation
+
+from kcexo.calc.barycentric import light_travel_times, transit_light_travel_times
+
+
+LOCATION = EarthLocation.from_geodetic(-0.1 * u.deg, 51.5 * u.deg, 50 * u.m)
+
+
+def _transit_times(durations_h: np.ndarray) -> Time:
+    mids = Time(2460700.0 + np.arange(len(durations_h)) * 7.3, format='jd', scale='utc')
+    offsets = np.array([-1.0, -0.5, 0.0, 0.5, 1.0])[np.newaxis, :] * durations_h[:, np.newaxis] / 24.0
+    return mids[:, np.newaxis] + offsets * u.day
+
+
+def test_light_travel_times_matches_astropy():
+    coords = SkyCoord([10.0, 150.0, 280.0] * u.deg, [20.0, -30.0, 60.0] * u.deg)
+    times = Time([2460700.1, 2460800.2, 2460900.3], format='jd', scale='utc')
+    res = light_travel_times(times, coords, LOCATION)
+    for k in range(3):
+        expected = times[k].light_travel_time(coords[k], kind='barycentric', location=LOCATION)
+        assert res[k].to(u.s).value == pytest.approx(expected.to(u.s).value, abs=1e-6)
+
+
+def test_transit_light_travel_times_exact():
+    times = _transit_times(np.array([3.0, 6.0]))
+    coords = SkyCoord([45.0, 200.0] * u.deg, [10.0, -5.0] * u.deg)
+    res = transit_light_travel_times(times, coords, LOCATION, tolerance=None)
+    assert res.shape == (2, 5)
+    for k in range(2):
+        for j in range(5):
+            expected = times[k, j].light_travel_time(coords[k], kind='barycentric', location=LOCATION)
+            assert res[k, j].to(u.s).value == pytest.approx(expected.to(u.s).value, abs=1e-6)
+
+
+def test_transit_light_travel_times_tolerance():
+    # 0.5 hour transit uses the mid time value, 12 hour one is too long for 1s tolerance
+    times = _transit_times(np.array([0.5, 12.0]))
+    coords = SkyCoord(45.0 * u.deg, 10.0 * u.deg)
+    exact = transit_light_travel_times(times, coords, LOCATION, tolerance=None)
+    res = transit_light_travel_times(times, coords, LOCATION, tolerance=1 * u.s)
+    assert np.all(res[0] == res[0, 2])
+    assert np.all(np.abs(res - exact) <= 1 * u.s)
+    assert res[1].to(u.s).value == pytest.approx(exact[1].to(u.s).value, abs=1e-6)
+    assert np.ptp(res[1].to(u.s).value) > 1.0
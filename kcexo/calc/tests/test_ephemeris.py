@@ -0,0 +1,41 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+
+from kcexo.calc.ephemeris import transit_epochs, transit_times
+
+
+def test_transit_epochs():
+    t0 = np.array([2450000.0, 2460000.5, 2460010.0, 2459000.0])
+    period = np.array([3.0, 0.7, 100.0, 10.0])
+    start, end = 2460001.0, 2460031.0
+    planet, epoch = transit_epochs(t0, period, start, end)
+    for n in range(len(t0)):
+        mids = t0[n] + np.arange(-100000, 100000) * period[n]
+        expected = np.nonzero((mids > start) & (mids <= end))[0] - 100000
+        assert list(epoch[planet == n]) == list(expected)
+    assert np.all(np.diff(planet) >= 0)
+
+
+def test_transit_epochs_on_boundary():
+    # a transit exactly at the start is not included, one exactly at the end is
+    planet, epoch = transit_epochs(np.array([10.0]), np.array([2.0]), 10.0, 14.0)
+    assert list(planet) == [0, 0]
+    assert list(epoch) == [1, 2]
+
+
+def test_transit_times():
+    t0 = np.array([2460000.0, 2460000.25])
+    period = np.array([1.0, 2.0])
+    duration = np.array([0.1, 0.2])
+    res = transit_times(t0, period, duration, 0.05, 0.04, 2460000.5, 2460005.08)
+    assert list(res['planet']) == [0, 0, 0, 0, 1, 1]
+    assert res['mid'] == pytest.approx([2460001.0, 2460002.0, 2460003.0, 2460004.0, 2460002.25, 2460004.25])
+    assert res['ingress'] == pytest.approx(res['mid'] - 0.5 * duration[res['planet']])
+    assert res['egress'] == pytest.approx(res['mid'] + 0.5 * duration[res['planet']])
+    assert res['pre_ingress'] == pytest.approx(res['ingress'] - 0.05)
+    assert res['post_egress'] == pytest.approx(res['egress'] + 0.04)
+    # transit at 2460005.0 ends after the window
+    assert np.all(res['post_egress'] <= 2460005.08)
+    assert len(transit_times(t0, period, duration, 0.05, 0.04, 2460000.5, 2460000.6)) == 0
@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore readnoise pixsize skymag exptime
+# pylint:disable=missing-function-docstring
+import logging
+
+import numpy as np
+import pytest
+
+from kcexo.calc.exposure import exposure_snr, exposure_grid, calc_exposure, fraction_inside, exposure_for_snr, snr_for_precision, saturation_exposure
+
+# tel_diam, qe, readnoise, pixsize, skymag, fwhm, aper_rad
+instrument = (20.0, 0.6, 8.0, 1.0, 20.0, 3.0, 4.0)
+
+
+def test_exposure_grid():
+    res = exposure_grid(['V', 'R'], np.array([10.0, 12.0, 14.0]), np.array([1.0, 2.0]), np.array([10.0, 60.0, 120.0, 300.0]), *instrument)
+    assert res.shape == (2, 3, 2, 4)
+    assert res['filter'][1, 0, 0, 0] == 'R'
+    assert res['mag'][0, 2, 0, 0] == 14.0
+    # fainter stars, higher airmass and shorter exposures all give worse SNR
+    assert np.all(np.diff(res['snr'], axis=1) < 0)
+    assert np.all(np.diff(res['snr'], axis=2) < 0)
+    assert np.all(np.diff(res['snr'], axis=3) > 0)
+    # 4 magnitudes is 10^1.6x fewer electrons
+    assert res['star_electrons'][0, 0, 0, 0] == pytest.approx(10 ** 1.6 * res['star_electrons'][0, 2, 0, 0])
+    # read noise does not depend on the exposure
+    assert np.all(res['read_electrons'] == res['read_electrons'].flat[0])
+    # elementwise broadcasting gives the same values
+    same = exposure_snr('R', np.array([10.0, 14.0]), np.array([1.0, 2.0]), 60.0, *instrument)
+    assert same['snr'] == pytest.approx([res['snr'][1, 0, 0, 1], res['snr'][1, 2, 1, 1]])
+
+
+def test_calc_exposure():
+    res = calc_exposure('V', 10.0, 12.0, 0.5, 20.0, 0.6, 8.0, 1.0, 20.0, 1.2, 60.0, 3.0, 4.0)
+    assert [r[0] for r in res] == pytest.approx([10.0, 10.5, 11.0, 11.5, 12.0])
+    mag, star, sky, read, snr = res[0]
+    assert mag == 10.0
+    assert snr == pytest.approx(star / np.sqrt(star + sky + read))
+    fraction = fraction_inside(3.0, 4.0, 1.0)
+    expected = 10 ** (-0.4 * (10.0 + 1.2 * 0.2)) * 8.66e+05 * 60.0 * np.pi * 100.0 * 0.6 * fraction
+    assert star == pytest.approx(expected)
+    with pytest.raises(ValueError):
+        calc_exposure('V', 12.0, 10.0, 0.5, 20.0, 0.6, 8.0, 1.0, 20.0, 1.2, 60.0, 3.0, 4.0)
+    with pytest.raises(ValueError):
+        exposure_snr('V', 10.0, 1.0, np.array([60.0, -1.0]), *instrument)
+
+
+@pytest.mark.parametrize("fwhm, radius, pixsize", [(3.0, 4.0, 1.0), (2.0, 2.2, 0.7), (5.0, 3.0, 1.5)])
+def test_fraction_inside(fwhm, radius, pixsize):
+    # continuous Gaussian encircled energy, the pixel sampling is fine enough to match it closely
+    sigma = fwhm / 2.35
+    expected = 1.0 - np.exp(-radius * radius / (2.0 * sigma * sigma))
+    assert fraction_inside(fwhm, radius, pixsize) == pytest.approx(expected, abs=2e-3)
+    assert fraction_inside(fwhm, radius, pixsize, (0.0, 0.0)) == pytest.approx(expected, abs=2e-3)
+    res = fraction_inside(np.array([fwhm, fwhm]), np.array([radius, 20.0 * pixsize]), pixsize)
+    assert res.shape == (2,)
+    assert res[0] == fraction_inside(fwhm, radius, pixsize)
+    assert res[1] == pytest.approx(1.0)
+
+
+def test_fraction_inside_radius_limit(caplog, capsys):
+    # the warning is logged every time, also when the value comes from the cache
+    for _ in range(2):
+        with caplog.at_level(logging.WARNING):
+            caplog.clear()
+            assert fraction_inside(3.0, 40.0, 1.0) == pytest.approx(1.0)
+        assert "exceeds the limit" in caplog.text
+    assert capsys.readouterr().out == ""
+
+
+def test_exposure_for_snr():
+    mags = np.array([8.0, 11.0, 14.0, np.nan])
+    snr = np.array([100.0, 300.0, 50.0, 100.0])
+    exptime = exposure_for_snr(snr, 'R', mags, 1.3, *instrument)
+    assert np.isnan(exptime[-1])
+    res = exposure_snr('R', mags[:-1], 1.3, exptime[:-1], *instrument)
+    assert res['snr'] == pytest.approx(snr[:-1])
+    # 1.0857 mag / SNR is the photometric error
+    assert snr_for_precision(np.array([0.01, 0.02]), 0.1) == pytest.approx([1085.7, 542.9], rel=1e-3)
+
+
+def test_saturation_exposure():
+    tel_diam, qe, _, pixsize, skymag, fwhm, _ = instrument
+    sat = saturation_exposure('R', np.array([6.0, 8.5]), 1.0, tel_diam, qe, pixsize, skymag, fwhm, 50_000.0)
+    assert sat[0] < sat[1]
+    # the brightest pixel is well within the 1-pixel aperture's light
+    peak_rate = 50_000.0 / sat[1]
+    star = exposure_snr('R', 8.5, 1.0, 1.0, tel_diam, qe, 1.0, pixsize, skymag, fwhm, 20.0 * pixsize)
+    assert 0.0 < peak_rate < star['star_electrons']
@@ -0,0 +1,72 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore Teff logg
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+import astropy.units as u
+
+from kcexo.calc.light_curve import LimbDarkeningTable, transit_light_curve, planet_light_curves
+
+
+def test_uniform_disk_depth():
+    z = np.array([0.0, 0.3, 0.5, 2.0, np.inf])
+    flux = transit_light_curve(z, 0.1, 0.0, 0.0)
+    assert flux[:3] == pytest.approx(1.0 - 0.1 ** 2, abs=1e-9)
+    assert flux[3:] == pytest.approx(1.0)
+
+
+def test_limb_darkened_central_depth():
+    u1, u2 = 0.4, 0.25
+    flux = transit_light_curve(np.array([0.0]), 0.01, u1, u2)
+    # for a small planet at the centre the depth is p^2 * I(1) / <I>
+    expected = 0.01 ** 2 / (1.0 - u1 / 3.0 - u2 / 6.0)
+    assert 1.0 - flux[0] == pytest.approx(expected, rel=1e-3)
+
+
+def test_light_curve_shape():
+    z = np.linspace(0.0, 1.2, 50)
+    flux = transit_light_curve(np.vstack([z, z]), np.array([0.1, 0.05]), np.array([0.4, 0.4]), np.array([0.25, 0.25]))
+    assert flux.shape == (2, 50)
+    assert np.all(np.diff(flux[0]) >= 0.0)
+    assert np.all(flux[1] >= flux[0])
+    assert flux[:, -1] == pytest.approx(1.0)
+
+
+def test_planet_light_curves():
+    times = np.linspace(-0.2, 0.2, 101)
+    flux = planet_light_curves(np.array([0.1, 0.1]), np.array([3.0, 3.0]) * u.day, np.array([10.0, 10.0]),
+                               np.array([0.0, 0.0]), np.array([90.0, 70.0]) * u.deg, np.array([90.0, 90.0]) * u.deg,
+                               np.zeros(2), times, 0.4, 0.25)
+    assert flux.shape == (2, 101)
+    assert flux[0, 50] == flux[0].min()
+    assert flux[0, 50] < 1.0 - 0.01
+    assert flux[0, 0] == pytest.approx(1.0)
+    # not transiting
+    assert flux[1] == pytest.approx(1.0)
+
+
+def test_limb_darkening_table():
+    table = LimbDarkeningTable.from_grey_atmosphere('R')
+    u1, u2 = table(np.array([4000.0, 5800.0, 9000.0]))
+    assert np.all((u1 + u2 > 0.0) & (u1 + u2 < 1.0))
+    # cooler stars are more limb darkened
+    assert u1[0] + u2[0] > u1[1] + u2[1] > u1[2] + u2[2]
+    # outside of the grid and missing values are clamped / replaced
+    assert table(1e6)[0] == pytest.approx(table(12000.0)[0])
+    assert table(np.nan, np.nan, np.nan)[0] == pytest.approx(table(5772.0)[0])
+
+
+def test_limb_darkening_table_from_csv(tmp_path):
+    file_name = tmp_path / "ld.csv"
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write("teff,logg,feh,filter,u1,u2\n")
+        for teff in (5000, 6000):
+            for logg in (4.0, 4.5):
+                f.write(f"{teff},{logg},0.0,R,{teff / 10000},{logg / 10}\n")
+                f.write(f"{teff},{logg},0.0,V,0.9,0.1\n")
+    table = LimbDarkeningTable.from_csv(file_name, 'R')
+    u1, u2 = table(5500.0, 4.25, 0.0)
+    assert u1 == pytest.approx(0.55)
+    assert u2 == pytest.approx(0.425)
+    with pytest.raises(ValueError):
+        LimbDarkeningTable.from_csv(file_name, 'B')
@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import warnings
+
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation
+from astroplan import Observer, FixedTarget
+
+from kcexo.calc.meridian import meridian_transit_times, meridian_crossing_flags
+
+
+LOCATION = EarthLocation.from_geodetic(-1.5 * u.deg, 52.0 * u.deg, 100 * u.m)
+COORDS = SkyCoord([15.0, 111.9, 250.0, 330.0] * u.deg, [-20.0, 24.3, 45.0, 75.0] * u.deg)
+TIMES = Time([2460700.3, 2460790.7, 2460850.1, 2461020.9], format='jd', scale='utc')
+
+
+@pytest.mark.parametrize("which", ['nearest', 'next', 'previous'])
+def test_meridian_transit_times_astroplan(which):
+    res = meridian_transit_times(COORDS, TIMES, LOCATION, which)
+    observer = Observer(location=LOCATION)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for k in range(len(TIMES)):
+            expected = observer.target_meridian_transit_time(TIMES[k], FixedTarget(COORDS[k]), which, n_grid_points=1000)
+            assert abs((res[k] - expected).to(u.s).value) < 5.0
+    if which == 'next':
+        assert np.all(res > TIMES)
+    elif which == 'previous':
+        assert np.all(res < TIMES)
+    else:
+        assert np.all(np.abs((res - TIMES).to(u.hour).value) <= 12.0)
+
+
+def test_meridian_transit_times_broadcast():
+    times = TIMES[0] + np.arange(3) * u.day
+    res = meridian_transit_times(COORDS[0], times, LOCATION)
+    assert res.shape == (3,)
+    # one sidereal day apart
+    assert np.diff(res.jd) == pytest.approx(1.0 / 1.0027378, abs=1e-5)
+    with pytest.raises(ValueError):
+        meridian_transit_times(COORDS[0], times, LOCATION, 'soon')
+
+
+def test_meridian_crossing_flags():
+    hr = 1.0 / 24.0
+    ingress = np.zeros(5)
+    egress = np.full(5, 3.0 * hr)
+    # well before, during ingress, mid transit, during egress, well after
+    meridian = np.array([-2.0, 0.1, 1.5, 2.9, 5.0]) * hr
+    has_crossing, problem = meridian_crossing_flags(meridian, ingress, egress, 0.25 * hr, 0.1 * hr, 10.0 / 60.0 * hr)
+    assert has_crossing.tolist() == [False, True, True, True, False]
+    assert problem.tolist() == [False, True, False, True, False]
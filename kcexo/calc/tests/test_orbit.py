@@ -5,7 +5,7 @@ import numpy as np
 import pytest
 import astropy.units as u
 
-from kcexo.calc.orbits import transit_duration, transit_t12
+from kcexo.calc.orbits import solve_kepler, planet_orbit, planet_orbits, transit_duration, transit_t12, transit_contact_times
 
 
 stars = [
@@ -60,3 +60,68 @@ def test_duration_t12(name, inputs, expected) -> None:  # pylint:disable=unused-
     
     assert np.abs(duration - exp_duration) <= exp_duration_e
     assert np.abs(t12 - exp_t12) <= exp_t12_e
+
+
+@pytest.mark.parametrize("eccentricity", [0.0, 0.013, 0.5, 0.93286, 0.99])
+def test_solve_kepler(eccentricity) -> None:
+    m = np.linspace(-2 * np.pi, 4 * np.pi, 1001)
+    e_t = solve_kepler(m, eccentricity)
+    residual = np.mod(e_t - eccentricity * np.sin(e_t) - m + np.pi, 2 * np.pi) - np.pi
+    assert np.all(np.abs(residual) < 1e-9)
+
+
+def test_planet_orbits_matches_planet_orbit() -> None:
+    params = [s[1] for s in stars]
+    times = np.linspace(9990.0, 10010.0, 401)
+    x_t, y_t, z_t = planet_orbits(
+        u.Quantity([p[2] for p in params]),
+        np.array([p[1] for p in params]),
+        np.array([p[3] for p in params]),
+        u.Quantity([p[4] for p in params]),
+        u.Quantity([p[5] for p in params]),
+        np.full(len(params), 10000.0),
+        times)
+    assert x_t.shape == (len(params), len(times))
+    for n, p in enumerate(params):
+        x1, y1, z1 = planet_orbit(p[2], p[1], p[3], p[4], p[5], 10000.0, times)
+        assert np.allclose(x_t[n], x1)
+        assert np.allclose(y_t[n], y1)
+        assert np.allclose(z_t[n], z1)
+    # per-planet time grids
+    x_g, _, _ = planet_orbits(
+        u.Quantity([p[2] for p in params]),
+        np.array([p[1] for p in params]),
+        np.array([p[3] for p in params]),
+        u.Quantity([p[4] for p in params]),
+        u.Quantity([p[5] for p in params]),
+        np.full(len(params), 10000.0),
+        np.vstack([times, times + 1.0]))
+    assert np.allclose(x_g[0], x_t[0])
+    assert np.allclose(x_g[1], planet_orbit(params[1][2], params[1][1], params[1][3], params[1][4], params[1][5], 10000.0, times + 1.0)[0])
+
+
+def test_transit_contact_times_vectorised() -> None:
+    params = [s[1] for s in stars]
+    t14, t12, t34 = transit_contact_times(
+        np.array([p[0] for p in params]),
+        u.Quantity([p[2] for p in params]),
+        np.array([p[1] for p in params]),
+        np.array([p[3] for p in params]),
+        u.Quantity([p[4] for p in params]),
+        u.Quantity([p[5] for p in params]))
+    for n, (name, inputs, expected) in enumerate(stars):  # pylint:disable=unused-variable
+        assert np.abs(t14[n] - expected[1][0]) <= expected[1][1]
+        assert np.abs(t12[n] - expected[0][0]) <= expected[0][1]
+        # eccentric orbits have different ingress and egress durations but not by much
+        assert np.abs(t12[n] - t34[n]) <= expected[0][1]
+        assert np.abs(t14[n] - transit_duration(inputs[0], inputs[2], inputs[1], inputs[3], inputs[4], inputs[5])) < 0.1 * u.s
+
+
+def test_transit_contact_times_grazing_and_missing() -> None:
+    # b ~ 0.96 so grazing, b ~ 1.7 so no transit at all
+    t14, t12, t34 = transit_contact_times(np.array([0.1, 0.1]), [3.0, 3.0] * u.day, np.array([10.0, 10.0]),
+                                          np.array([0.0, 0.0]), [84.5, 80.0] * u.deg, [0.0, 0.0] * u.deg)
+    assert np.isfinite(t14[0])
+    assert t12[0] == 0.5 * t14[0]
+    assert t34[0] == 0.5 * t14[0]
+    assert np.isnan(t14[1]) and np.isnan(t12[1]) and np.isnan(t34[1])
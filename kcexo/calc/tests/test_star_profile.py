@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore fwhms
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from kcexo.calc.star_profile import calc_fwhms, frame_fwhm, iter_frame_fwhms, fwhm_time_series
+
+
+def make_image(fwhm: float, num_stars: int = 30, size: int = 256, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sigma = fwhm / 2.3548
+    yy, xx = np.mgrid[0:size, 0:size]
+    image = np.full((size, size), 100.0)
+    for _ in range(num_stars):
+        x0, y0 = rng.uniform(15, size - 15, 2)
+        image += rng.uniform(500, 5000) * np.exp(-((xx - x0) ** 2 + (yy - y0) ** 2) / (2 * sigma * sigma))
+    return image + rng.normal(0.0, 3.0, image.shape)
+
+
+def write_frame(file_name, fwhm, date_obs, seed):
+    header = fits.Header()
+    header['EXPTIME'] = 60.0
+    header['FILTER'] = 'R'
+    header['DATE-OBS'] = date_obs
+    fits.PrimaryHDU(make_image(fwhm, seed=seed), header).writeto(file_name)
+
+
+@pytest.mark.parametrize("fwhm", [2.5, 4.0, 6.0])
+def test_calc_fwhms(fwhm):
+    fwhms = calc_fwhms(make_image(fwhm), fwhm_guess=4.0)
+    assert len(fwhms) > 10
+    assert np.median(fwhms) == pytest.approx(fwhm, rel=0.05)
+
+
+def test_calc_fwhms_no_stars():
+    image = np.random.default_rng(1).normal(100.0, 3.0, (64, 64))
+    assert len(calc_fwhms(image)) == 0
+
+
+def test_frame_fwhms(tmp_path):
+    dates = ["2025-03-01T22:30:00", "2025-03-01T21:00:00", "2025-03-01T23:15:00"]
+    fwhms = [3.0, 4.0, 5.0]
+    for n, (d, f) in enumerate(zip(dates, fwhms)):
+        write_frame(tmp_path / f"frame_{n}.fits", f, d, n)
+    res = frame_fwhm(tmp_path / "frame_0.fits")
+    assert res.fwhm == pytest.approx(3.0, rel=0.05)
+    assert res.num_stars > 10
+
+    res = list(iter_frame_fwhms(tmp_path, workers=2, max_pending=1))
+    assert [r.file_name for r in res] == [(tmp_path / f"frame_{n}.fits").as_posix() for n in range(3)]
+    assert [r.fwhm for r in res] == pytest.approx(fwhms, rel=0.05)
+
+    series = fwhm_time_series(tmp_path, pixel_scale=0.5, workers=2)
+    assert [s.date_obs.isot[11:16] for s in series] == ["21:00", "22:30", "23:15"]
+    assert [s.fwhm for s in series] == pytest.approx([2.0, 1.5, 2.5], rel=0.05)
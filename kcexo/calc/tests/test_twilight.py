@@ -0,0 +1,54 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import warnings
+
+import numpy as np
+import pytest
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import EarthLocation
+from astroplan import Observer
+
+from kcexo.calc.twilight import TwilightTable
+
+
+OBSERVER = Observer(location=EarthLocation.from_geodetic(-1.5 * u.deg, 52.0 * u.deg, 100 * u.m),
+                    temperature=10 * u.deg_C, pressure=1010 * u.hPa, relative_humidity=0.5)
+MJD0 = 60700  # 2025-01-24
+
+
+def _jd(t: Time) -> float:
+    return np.nan if np.ma.is_masked(t.jd) else float(t.jd)
+
+
+@pytest.mark.parametrize("night", [0, 150, 250])
+def test_twilight_table_astroplan(night):
+    table = TwilightTable.compute(OBSERVER, MJD0, MJD0 + 300)
+    date = Time(MJD0 + night, format='mjd', scale='utc')
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        evening = [OBSERVER.sun_set_time(date, which='next', n_grid_points=2000),
+                   OBSERVER.twilight_evening_civil(date, which='next', n_grid_points=2000),
+                   OBSERVER.twilight_evening_nautical(date, which='next', n_grid_points=2000),
+                   OBSERVER.twilight_evening_astronomical(date, which='next', n_grid_points=2000)]
+        morning = [OBSERVER.twilight_morning_astronomical(date, which='next', n_grid_points=2000),
+                   OBSERVER.twilight_morning_nautical(date, which='next', n_grid_points=2000),
+                   OBSERVER.twilight_morning_civil(date, which='next', n_grid_points=2000),
+                   OBSERVER.sun_rise_time(date, which='next', n_grid_points=2000)]
+    expected = np.array([_jd(t) for t in evening + morning])
+    res = np.concatenate([table.evening_jd(MJD0 + night), table.morning_jd(MJD0 + night)])
+    assert np.array_equal(np.isnan(res), np.isnan(expected))
+    ok = ~np.isnan(res)
+    assert np.all(np.abs(res[ok] - expected[ok]) * 86400.0 < 5.0)
+
+
+def test_twilight_table_extended():
+    table = TwilightTable.compute(OBSERVER, MJD0 + 10, MJD0 + 20)
+    wider = table.extended(MJD0, MJD0 + 30)
+    assert wider.mjd0 == MJD0
+    assert wider.num_nights == 31
+    assert wider.morning.shape == (32, 4)
+    assert table.extended(MJD0 + 12, MJD0 + 15) is table
+    full = TwilightTable.compute(OBSERVER, MJD0, MJD0 + 30)
+    assert wider.evening == pytest.approx(full.evening, abs=2.0 / 86400.0, nan_ok=True)
+    assert wider.morning == pytest.approx(full.morning, abs=2.0 / 86400.0, nan_ok=True)
@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import numpy as np
+import pytest
+import astropy.units as u
+
+from kcexo.calc.uncertainty import sample_transit_durations, transit_timing_windows, sigma_percentiles
+
+
+def durations(n, rp_e=0.0, a_e=0.0, i_e=0.0, num_samples=2000, seed=0):
+    return sample_transit_durations(np.full(n, 0.1), np.full(n, rp_e), np.full(n, 3.0) * u.day,
+                                    np.full(n, 10.0), np.full(n, a_e), np.zeros(n), np.zeros(n),
+                                    np.full(n, 88.0) * u.deg, np.full(n, i_e) * u.deg,
+                                    np.full(n, 90.0) * u.deg, np.zeros(n) * u.deg,
+                                    num_samples, np.random.default_rng(seed))
+
+
+def test_sigma_percentiles():
+    p = sigma_percentiles([1.0, 3.0])
+    assert p[0] == pytest.approx([15.866, 84.134], abs=1e-3)
+    assert p[1] == pytest.approx([0.135, 99.865], abs=1e-3)
+
+
+def test_sample_transit_durations():
+    d = durations(3)
+    assert d.shape == (3, 2000)
+    assert np.all(d == 0.0)
+    d = durations(3, a_e=0.3, i_e=0.5)
+    assert np.std(d) > 0.0
+    assert np.abs(np.nanmedian(d)) < np.nanstd(d)
+
+
+def test_ephemeris_windows_grow_with_epoch():
+    n = 2
+    rng = np.random.default_rng(1)
+    epochs = np.array([[0.0, 100.0, 1000.0], [0.0, 1.0, np.nan]])
+    t1, t4 = transit_timing_windows(epochs, np.full(n, 1.0) * u.min, np.full(n, 0.1) * u.min, durations(n, num_samples=4000),
+                                    (1.0, 3.0), rng)
+    assert t1.shape == (2, 3, 2, 2)
+    # 1 sigma of the mid time is sqrt(T0_e^2 + (n P_e)^2) when the duration is exact
+    for k, epoch in enumerate(epochs[0]):
+        sigma = np.hypot(1.0, epoch * 0.1) / (24 * 60)
+        assert t1[0, k, 0] == pytest.approx([-sigma, sigma], rel=0.1)
+        assert t4[0, k, 1] == pytest.approx([-3 * sigma, 3 * sigma], rel=0.2)
+    assert np.all(np.isnan(t1[1, 2]))
+
+
+def test_duration_widens_windows():
+    n = 1
+    rng = np.random.default_rng(2)
+    t1, t4 = transit_timing_windows(np.array([[0.0]]), np.zeros(n) * u.min, np.zeros(n) * u.min,
+                                    durations(n, a_e=0.3, i_e=0.5), (1.0,), rng)
+    # a longer transit starts earlier and ends later so the windows mirror each other
+    assert t1[0, 0, 0, 0] < 0.0 < t1[0, 0, 0, 1]
+    assert t1[0, 0, 0] == pytest.approx(-t4[0, 0, 0, ::-1], rel=1e-6)
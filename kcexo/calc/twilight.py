@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore altaz astroplan
+"""Sunset, sunrise and twilight times for many nights at once from a single sweep of the Sun's altitude."""
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astroplan import Observer
+
+
+EVENING_ALTITUDES: Tuple[float, ...] = (0.0, -6.0, -12.0, -18.0)  #: sunset, end of civil, nautical and astronomical twilight
+MORNING_ALTITUDES: Tuple[float, ...] = (-18.0, -12.0, -6.0, 0.0)  #: start of astronomical, nautical and civil twilight, sunrise
+
+
+def sun_altitudes(observer: Observer, jds: np.ndarray) -> np.ndarray:
+    """Altitude of the Sun in degrees at all the (UTC) JDs in one AltAz transform, the same way `astroplan` does it."""
+    return observer.sun_altaz(Time(jds, format='jd', scale='utc')).alt.to(u.deg).value
+
+
+def altitude_crossings(jds: np.ndarray,
+                       altitudes: np.ndarray,
+                       horizon: float,
+                       rising: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Brackets of the altitude crossing `horizon` in a sorted grid of times.
+
+    Args:
+        jds (np.ndarray): `(N,)` sorted times.
+        altitudes (np.ndarray): `(N,)` altitudes at the times.
+        horizon (float): Altitude to cross.
+        rising (bool): Look for the rising (True) or the setting crossings.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Indices `i` of the grid points just before the crossings (the crossing is between
+            `i` and `i + 1`) and the linearly interpolated crossing times.
+    """
+    above = altitudes >= horizon
+    if rising:
+        idx = np.nonzero(~above[:-1] & above[1:])[0]
+    else:
+        idx = np.nonzero(above[:-1] & ~above[1:])[0]
+    a0 = altitudes[idx] - horizon
+    a1 = altitudes[idx + 1] - horizon
+    return idx, jds[idx] + (jds[idx + 1] - jds[idx]) * a0 / (a0 - a1)
+
+
+class TwilightTable():
+    """Sunset, sunrise and twilight times of consecutive nights of one observer as float arrays.
+
+    Night `n` is the evening of the UTC date `mjd0 + n`, the same convention as `Observatory.zero_time`: the evening
+    events are the first ones after the midnight (UTC) starting that date and the morning events are the first ones
+    after the midnight of the following date. All the times are UTC JDs, `NaN` where the Sun does not reach the altitude
+    within a day.
+    """
+
+    def __init__(self,
+                 observer: Observer,
+                 mjd0: int,
+                 evening: np.ndarray,
+                 morning: np.ndarray) -> None:
+        """Initialisation of the table.
+
+        Args:
+            observer (Observer): Observer (location, pressure and temperature) the table is for.
+            mjd0 (int): MJD of the first night's date.
+            evening (np.ndarray): `(num_nights, 4)` evening events, see `EVENING_ALTITUDES`.
+            morning (np.ndarray): `(num_nights + 1, 4)` morning events of the dates from `mjd0`, see `MORNING_ALTITUDES`.
+        """
+        self.observer: Observer = observer
+        self.mjd0: int = int(mjd0)
+        self.evening: np.ndarray = evening
+        self.morning: np.ndarray = morning
+
+    @classmethod
+    def compute(cls,
+                observer: Observer,
+                start_mjd: int,
+                end_mjd: int,
+                step: u.Quantity["time"] = 30 * u.min,
+                refine_iterations: int = 2) -> "TwilightTable":
+        """Calculate the twilights of the nights starting on the dates `start_mjd` to `end_mjd` (inclusive).
+
+        The Sun's altitude is evaluated on a grid of `step` over the whole span in one go, the crossings are
+        interpolated on the grid and then refined with `refine_iterations` more (batched) evaluations of the altitude.
+
+        Args:
+            observer (Observer): Observer (location, pressure and temperature).
+            start_mjd (int): Date of the first night.
+            end_mjd (int): Date of the last night.
+            step (u.Quantity['time'], optional): Grid step. Defaults to 30 minutes.
+            refine_iterations (int, optional): Number of refinement steps. Defaults to 2 which is good to a second or so.
+
+        Returns:
+            TwilightTable: The table.
+        """
+        start_mjd = int(start_mjd)
+        end_mjd = max(int(end_mjd), start_mjd)
+        num_nights = end_mjd - start_mjd + 1
+        # the last morning event can be a day after the last night's date
+        step_d = step.to(u.day).value
+        grid = (start_mjd + 2400000.5) + np.arange(0.0, num_nights + 2.0 + step_d, step_d)
+        altitudes = sun_altitudes(observer, grid)
+
+        midnights = (start_mjd + 2400000.5) + np.arange(num_nights + 1, dtype=float)
+        horizons = EVENING_ALTITUDES + MORNING_ALTITUDES
+        rising = [False] * len(EVENING_ALTITUDES) + [True] * len(MORNING_ALTITUDES)
+        brackets = [altitude_crossings(grid, altitudes, h, r) for h, r in zip(horizons, rising)]
+
+        # refine all the crossings together: evaluate the altitude at the estimates (one transform per iteration)
+        # and shrink the brackets (regula falsi)
+        idx = np.concatenate([i for i, _ in brackets])
+        target = np.concatenate([np.full(len(i), h) for (i, _), h in zip(brackets, horizons)])
+        t = np.concatenate([c for _, c in brackets])
+        t_l, t_r = grid[idx], grid[idx + 1]
+        a_l, a_r = altitudes[idx] - target, altitudes[idx + 1] - target
+        for _ in range(refine_iterations if len(t) > 0 else 0):
+            a_t = sun_altitudes(observer, t) - target
+            left = np.sign(a_t) == np.sign(a_l)
+            t_l, a_l = np.where(left, t, t_l), np.where(left, a_t, a_l)
+            t_r, a_r = np.where(left, t_r, t), np.where(left, a_r, a_t)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                t = np.where(a_l == a_r, t, t_l + (t_r - t_l) * a_l / (a_l - a_r))
+        events = np.split(t, np.cumsum([len(i) for i, _ in brackets])[:-1])
+
+        def first_after(t: np.ndarray, refs: np.ndarray) -> np.ndarray:
+            """First event after each of the `refs` and within a day of it."""
+            i = np.searchsorted(t, refs, side='right')
+            res = np.full(len(refs), np.nan)
+            ok = i < len(t)
+            res[ok] = t[i[ok]]
+            return np.where(res - refs < 1.0, res, np.nan)
+
+        n_e = len(EVENING_ALTITUDES)
+        evening = np.stack([first_after(events[k], midnights[:-1]) for k in range(n_e)], axis=1)
+        morning = np.stack([first_after(events[n_e + k], midnights) for k in range(len(MORNING_ALTITUDES))], axis=1)
+        return cls(observer, start_mjd, evening, morning)
+
+    @property
+    def num_nights(self) -> int:
+        """Number of nights in the table."""
+        return self.evening.shape[0]
+
+    def covers(self, night_mjd: int) -> bool:
+        """Is the night with date `night_mjd` (and its morning) in the table?"""
+        return self.mjd0 <= night_mjd < self.mjd0 + self.num_nights
+
+    def evening_jd(self, night_mjd: int) -> np.ndarray:
+        """Evening events (UTC JDs) of the date `night_mjd`, see `EVENING_ALTITUDES`."""
+        return self.evening[night_mjd - self.mjd0]
+
+    def morning_jd(self, date_mjd: int) -> np.ndarray:
+        """Morning events (UTC JDs) of the date `date_mjd`, see `MORNING_ALTITUDES`."""
+        return self.morning[date_mjd - self.mjd0]
+
+    def extended(self, start_mjd: int, end_mjd: int, **kwargs) -> "TwilightTable":
+        """A table covering both this table and the nights `start_mjd` to `end_mjd`, only the missing nights are calculated.
+
+        Args:
+            start_mjd (int): Date of the first night.
+            end_mjd (int): Date of the last night.
+            **kwargs: Passed to `compute`.
+
+        Returns:
+            TwilightTable: The extended table (or this one if nothing is missing).
+        """
+        first = min(int(start_mjd), self.mjd0)
+        last = max(int(end_mjd), self.mjd0 + self.num_nights - 1)
+        evening = [self.evening]
+        morning = [self.morning]
+        if first < self.mjd0:
+            before = TwilightTable.compute(self.observer, first, self.mjd0 - 1, **kwargs)
+            evening.insert(0, before.evening)
+            # the last morning of `before` is the first morning of this table
+            morning.insert(0, before.morning[:-1])
+        if last >= self.mjd0 + self.num_nights:
+            after = TwilightTable.compute(self.observer, self.mjd0 + self.num_nights, last, **kwargs)
+            evening.append(after.evening)
+            morning[-1] = morning[-1][:-1]
+            morning.append(after.morning)
+        if len(evening) == 1:
+            return self
+        return TwilightTable(self.observer, first, np.concatenate(evening), np.concatenate(morning))
+
+    def save(self, file_name: Path) -> None:
+        """Save the table as a `.npz` file."""
+        np.savez(file_name, mjd0=self.mjd0, evening=self.evening, morning=self.morning)
+
+    @classmethod
+    def load(cls, file_name: Path, observer: Observer) -> "TwilightTable":
+        """Load a table saved with `save`, it is up to the caller to make sure that it is for the same `observer`."""
+        with np.load(file_name) as data:
+            return cls(observer, int(data['mjd0']), data['evening'], data['morning'])
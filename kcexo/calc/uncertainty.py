@@ -0,0 +1,151 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore nanpercentile Winn
+"""Monte Carlo propagation of the ephemeris and orbit uncertainties to the transit times."""
+import math
+from typing import Tuple, Sequence
+
+import numpy as np
+import astropy.units as u
+
+
+def _approx_t14(rp_over_rs: np.ndarray,
+                period_d: np.ndarray,
+                sma_over_rs: np.ndarray,
+                eccentricity: np.ndarray,
+                inclination_rad: np.ndarray,
+                periastron_rad: np.ndarray) -> np.ndarray:
+    """Total transit duration in days using the analytic approximation of Winn (2010), eq. 14 and 16.
+
+    It is not as accurate as `transit_contact_times` but it is good enough for the *spread* of the durations
+    and it is cheap enough to evaluate for thousands of samples per planet. `NaN` means no transit.
+    """
+    ecc_factor = (1.0 - eccentricity * eccentricity) / (1.0 + eccentricity * np.sin(periastron_rad))
+    b = sma_over_rs * np.cos(inclination_rad) * ecc_factor
+    with np.errstate(invalid='ignore'):
+        s = np.sqrt((1.0 + rp_over_rs) ** 2 - b * b) / (sma_over_rs * np.sin(inclination_rad))
+        return period_d / np.pi * np.arcsin(np.where(s <= 1.0, s, np.nan)) * np.sqrt(1.0 - eccentricity * eccentricity) / (1.0 + eccentricity * np.sin(periastron_rad))
+
+
+def sample_transit_durations(rp_over_rs: np.ndarray,
+                             rp_over_rs_e: np.ndarray,
+                             period_in: u.Quantity['time'],
+                             sma_over_rs: np.ndarray,
+                             sma_over_rs_e: np.ndarray,
+                             eccentricity: np.ndarray,
+                             eccentricity_e: np.ndarray,
+                             inclination_in: u.Quantity['angle'],
+                             inclination_e: u.Quantity['angle'],
+                             periastron_in: u.Quantity['angle'],
+                             periastron_e: u.Quantity['angle'],
+                             num_samples: int = 1000,
+                             rng: np.random.Generator | None = None) -> np.ndarray:
+    """Draw samples of the change of the total transit duration caused by the orbit parameter uncertainties.
+
+    All the parameters are arrays of length `N` (one value per planet). Each parameter is drawn from a normal
+    distribution, with `Rp/Rs` kept positive, `a/Rs` kept above one, the eccentricity folded in to `[0, 0.99]`
+    and the inclination folded to `<= 90deg` (which gives the same transit).
+
+    Returns:
+        np.ndarray: `(N, num_samples)` array of `T14(sample) - T14(nominal)` in days. Samples that do not transit
+            are `NaN`.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    rp = np.atleast_1d(np.asarray(rp_over_rs, dtype=float))
+    n = rp.shape[0]
+    shape = (n, num_samples)
+
+    def draw(value, error):
+        value = np.broadcast_to(np.atleast_1d(np.asarray(value, dtype=float)), (n,))[:, np.newaxis]
+        error = np.broadcast_to(np.atleast_1d(np.abs(np.asarray(error, dtype=float))), (n,))[:, np.newaxis]
+        return value, value + error * rng.standard_normal(shape)
+
+    period_d = np.broadcast_to(np.atleast_1d(period_in.to(u.day).value), (n,))[:, np.newaxis]
+    rp_n, rp_s = draw(rp, rp_over_rs_e)
+    a_n, a_s = draw(sma_over_rs, sma_over_rs_e)
+    e_n, e_s = draw(eccentricity, eccentricity_e)
+    i_n, i_s = draw(inclination_in.to(u.rad).value, inclination_e.to(u.rad).value)
+    w_n, w_s = draw(periastron_in.to(u.rad).value, periastron_e.to(u.rad).value)
+
+    rp_s = np.abs(rp_s)
+    a_s = np.maximum(a_s, 1.0 + rp_s)
+    e_s = np.minimum(np.abs(e_s), 0.99)
+    i_s = np.pi / 2 - np.abs(np.pi / 2 - i_s)
+
+    t14_n = _approx_t14(rp_n, period_d, a_n, e_n, i_n, w_n)
+    t14_s = _approx_t14(rp_s, period_d, a_s, e_s, i_s, w_s)
+    return t14_s - t14_n
+
+
+def sigma_percentiles(sigmas: Sequence[float]) -> np.ndarray:
+    """Lower and upper percentiles of a normal distribution for the `sigmas`, ie `[[15.87, 84.13]]` for `[1]`."""
+    lower = np.array([50.0 * (1.0 + math.erf(-s / math.sqrt(2.0))) for s in sigmas])
+    return np.stack([lower, 100.0 - lower], axis=1)
+
+
+def _nan_percentile(a: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Percentiles `q` along the last axis ignoring `NaN`, same as `np.nanpercentile` but without its slow
+    per-row fallback when there are `NaN` values. Rows with no values give `NaN`."""
+    a = np.sort(a, axis=-1)  # NaN values go to the end
+    count = np.sum(~np.isnan(a), axis=-1, keepdims=True)
+    pos = q / 100.0 * np.maximum(count - 1, 0)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, np.maximum(count - 1, 0))
+    frac = pos - lo
+    res = np.take_along_axis(a, lo, axis=-1) * (1.0 - frac) + np.take_along_axis(a, hi, axis=-1) * frac
+    return np.where(count > 0, res, np.nan)
+
+
+def transit_timing_windows(epochs: np.ndarray,
+                           mid_time_e: u.Quantity['time'],
+                           period_e: u.Quantity['time'],
+                           delta_t14: np.ndarray,
+                           sigmas: Sequence[float] = (1.0, 3.0),
+                           rng: np.random.Generator | None = None,
+                           max_chunk_elements: int = 4_000_000) -> Tuple[np.ndarray, np.ndarray]:
+    """Timing uncertainty windows on `t1` (start of ingress) and `t4` (end of egress) for many transits of many planets.
+
+    For every planet the mid-time and period errors are sampled (the same samples for all of its transits, so the
+    windows correctly grow with the distance from the reference epoch) and combined with the duration samples from
+    `sample_transit_durations`: `t1 = dT0 + n dP - dT14/2` and `t4 = dT0 + n dP + dT14/2`. The planets are processed
+    in chunks so that no more than `max_chunk_elements` samples are held in memory at once.
+
+    Args:
+        epochs (np.ndarray): `(N, K)` transit numbers counted from the reference mid time. `NaN` can be used
+            to pad planets with fewer transits.
+        mid_time_e (u.Quantity['time']): `(N,)` uncertainty of the reference mid time.
+        period_e (u.Quantity['time']): `(N,)` uncertainty of the period.
+        delta_t14 (np.ndarray): `(N, S)` duration change samples in days.
+        sigmas (Sequence[float], optional): Window widths in standard deviations. Defaults to (1.0, 3.0).
+        rng (np.random.Generator | None, optional): Random number generator. Defaults to None meaning a new one.
+        max_chunk_elements (int, optional): Memory limit, see above. Defaults to 4_000_000.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: `t1` and `t4` windows, each `(N, K, len(sigmas), 2)` holding the early and late
+            offsets in days relative to the nominal `t1` and `t4`.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    epochs = np.atleast_2d(np.asarray(epochs, dtype=float))
+    dt14 = np.atleast_2d(np.asarray(delta_t14, dtype=float))
+    n, k = epochs.shape
+    s = dt14.shape[1]
+    t0_e = np.broadcast_to(np.atleast_1d(mid_time_e.to(u.day).value), (n,))
+    p_e = np.broadcast_to(np.atleast_1d(period_e.to(u.day).value), (n,))
+    q = sigma_percentiles(sigmas).ravel()
+
+    t1_w = np.full((n, k, len(q)), np.nan)
+    t4_w = np.full((n, k, len(q)), np.nan)
+    # planets where no sample transits get no extra window from the duration
+    half = np.where(np.all(np.isnan(dt14), axis=1, keepdims=True), 0.0, 0.5 * dt14)
+    chunk = max(1, max_chunk_elements // max(1, k * s))
+    for start in range(0, n, chunk):
+        sl = slice(start, min(n, start + chunk))
+        m = sl.stop - sl.start
+        d_t0 = t0_e[sl, np.newaxis] * rng.standard_normal((m, s))
+        d_p = p_e[sl, np.newaxis] * rng.standard_normal((m, s))
+        d_mid = d_t0[:, np.newaxis, :] + epochs[sl, :, np.newaxis] * d_p[:, np.newaxis, :]
+        h = half[sl, np.newaxis, :]
+        t1_w[sl] = _nan_percentile(d_mid - h, q)
+        t4_w[sl] = _nan_percentile(d_mid + h, q)
+    return t1_w.reshape(n, k, len(sigmas), 2), t4_w.reshape(n, k, len(sigmas), 2)
@@ -59,7 +59,8 @@ class HorizonConstraint(Constraint):
     def __init__(self, 
                  horizon: List[Tuple[float, float]]|None=None, 
                  boolean_constraint: bool=True,
-                 az_interpolator: RegularGridInterpolator=None
+                 az_interpolator: RegularGridInterpolator=None,
+                 resolution: float=0.1
                  ):
         """Initialise the constraint.
 
@@ -69,10 +70,11 @@ class HorizonConstraint(Constraint):
             boolean_constraint (bool, optional): If True, the constraint is treated as a boolean 
                 (True for within the limits and False for outside). If False, the constraint 
                 returns a float on [0, 1], where 0 is the min altitude and 1 is the max. 
-                Defaults to True. Not tested as it is not really used. TODO: test...
+                Defaults to True.
             az_interpolator (RegularGridInterpolator, optional): The linear interpolator used
                 generate value for the horizon. Default is None meaning that an interpolator 
                 will be created. 
+            resolution (float, optional): Azimuth step in degrees of the horizon lookup table. Defaults to 0.1.
         """
         if horizon is None:
             horizon = [(0.0, 0.0), (90.0, 0.0), (180.0, 0.0), (270.0, 0.0), (360.0, 0.0)]
@@ -84,6 +86,52 @@ class HorizonConstraint(Constraint):
         self.min_val = min([e[1] for e in horizon])
         self.boolean_constraint = boolean_constraint
 
+        # horizon altitude every `resolution` degrees, the last entry (360 degrees) is the same as the first
+        num = int(np.ceil(360.0 / resolution))
+        self.resolution: float = 360.0 / num
+        self.table: np.ndarray = self.az_interp(np.arange(num + 1) * self.resolution)
+        self.table[-1] = self.table[0]
+
+    def horizon_altitude(self, az: np.ndarray) -> np.ndarray:
+        """Altitude of the horizon at the azimuths, linearly interpolated in the lookup table.
+
+        Args:
+            az (np.ndarray): Azimuths in degrees, any shape and any range.
+
+        Returns:
+            np.ndarray: Horizon altitudes in degrees with the shape of `az`.
+        """
+        x = np.mod(np.asarray(az, dtype=float), 360.0) / self.resolution
+        i = np.minimum(x.astype(int), len(self.table) - 2)
+        frac = x - i
+        return self.table[i] * (1.0 - frac) + self.table[i + 1] * frac
+
+    def is_above(self, alt: np.ndarray, az: np.ndarray) -> np.ndarray:
+        """Are the positions above the horizon?
+
+        Args:
+            alt (np.ndarray): Altitudes in degrees, any shape.
+            az (np.ndarray): Azimuths in degrees, the same shape as `alt`.
+
+        Returns:
+            np.ndarray: Boolean array with the shape of `alt`.
+        """
+        return self.horizon_altitude(az) < np.asarray(alt, dtype=float)
+
+    def score(self, alt: np.ndarray, az: np.ndarray) -> np.ndarray:
+        """Altitudes rescaled so that the lowest point of the horizon is 0 and the zenith is 1, 0 below the horizon.
+
+        Args:
+            alt (np.ndarray): Altitudes in degrees, any shape.
+            az (np.ndarray): Azimuths in degrees, the same shape as `alt`.
+
+        Returns:
+            np.ndarray: Scores with the shape of `alt`.
+        """
+        alt = np.asarray(alt, dtype=float)
+        rescaled = (alt - self.min_val) / (90. - self.min_val)
+        return np.where(alt < self.horizon_altitude(az), 0.0, rescaled)
+
     def compute_constraint(self, times, observer, targets):
         """Compute the constraint.
         
@@ -93,32 +141,13 @@ class HorizonConstraint(Constraint):
             targets (List[astroplan.Target]): The targets on which to apply the constraints.
 
         Returns:
-            List[List[bool]] | List[List[float]]: 2D array of float or bool. The constraints, with targets along the first 
+            np.ndarray: 2D array of float or bool. The constraints, with targets along the first 
                 index and times along the second.
         """
         cached_altaz = _get_altaz(times, observer, targets)
         altaz = cached_altaz['altaz']
+        alt = altaz.alt.degree
+        az = altaz.az.degree
         if self.boolean_constraint:
-            azs = altaz.az
-            alts = altaz.alt
-            res = []
-            for target_azs, target_alts in zip(azs, alts):
-                interpolated_alt = self.az_interp([e.degree for e in target_azs])
-                alt = np.array([e.degree for e in target_alts])
-                mask = interpolated_alt < alt
-                res.append(mask)
-                
-            return res
-        else:
-            # return max_best_rescale(alt, self.min, self.max, greater_than_max=0)
-            azs = altaz.az
-            alts = altaz.alt
-            res = []
-            for target_azs, target_alts in zip(azs, alts):
-                vals = np.array([e.degree for e in target_alts])
-                rescaled = (vals - self.min_val) / (90. - self.min_val)
-                interpolated_horizon = self.az_interp([e.degree for e in target_azs])
-                mask = vals < interpolated_horizon
-                rescaled[mask] = 0        
-                res.append(rescaled)
-            return res
+            return self.is_above(alt, az)
+        return self.score(alt, az)
@@ -1,36 +1,182 @@
 # -*- coding: UTF-8 -*-
 # cSpell:ignore exoclock kcexo
-import copy
+import contextlib
+import os
 import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Sequence, Tuple
 
 import numpy as np
 
 import astropy.units as u
 from astropy.time import Time
-from astroplan import is_event_observable, AltitudeConstraint, TargetNeverUpWarning
+from astropy.coordinates import SkyCoord
+from astroplan import is_event_observable, AltitudeConstraint, TargetAlwaysUpWarning, TargetNeverUpWarning
 
 from kcexo.source.exoclock import ExoClock
+from kcexo.source.derived_cache import DerivedParameterCache
 from kcexo.planet import Planet
-from kcexo.observatory import Observatory
+from kcexo.observatory import Observatory, Observatories
 from kcexo.transit import Transit
+from kcexo.transit_table import TransitTable, MultiSiteTransitTable
+from kcexo.constraint import HorizonConstraint
+from kcexo.calc.ephemeris import transit_times, EPHEMERIS_SCALE
+from kcexo.calc.exposure import exposure_for_snr, saturation_exposure, snr_for_precision
+
+
+def _transit_table_rows(planets: List[Planet],
+                        times: np.ndarray,
+                        start_time: Time,
+                        end_time: Time,
+                        observatory: Observatory,
+                        night_only: bool,
+                        uncertainty_sigma: float,
+                        ignore_warnings: bool = True) -> Tuple[np.ndarray, str, List[Tuple[u.Quantity, u.Quantity] | None]]:
+    """Worker side of `ExoClockData.get_transits`: transits of some planets as `TransitTable` rows.
+
+    `ignore_warnings` is passed to `Planet.get_transits`, False leaves the warning filters to the caller.
+
+    Returns:
+        Tuple[np.ndarray, str, List[Tuple[u.Quantity, u.Quantity] | None]]: The rows, their time scale and T12/T14 of every planet.
+    """
+    bounds = np.searchsorted(times['planet'], np.arange(len(planets) + 1))
+    with warnings.catch_warnings(action="ignore", category=TargetNeverUpWarning) if ignore_warnings else contextlib.nullcontext():
+        transits = {
+            p.name: p.get_transits(start_time, end_time, observatory, night_only, uncertainty_sigma, times=times[bounds[n]:bounds[n + 1]],
+                                   ignore_warnings=ignore_warnings)
+            for n, p in enumerate(planets)
+        }
+    table = TransitTable.from_transits(transits, {p.name: p for p in planets}, observatory)
+    return table.data, table.scale, [p.derived_values() for p in planets]
+
+
+def _site_transit_times(times: np.ndarray,
+                        keep: np.ndarray,
+                        observatory: Observatory,
+                        end_jd: float) -> np.ndarray:
+    """One observatory's rows of transit times calculated without margins (see `ExoClockData.get_transit_times`).
+
+    Args:
+        times (np.ndarray): Transit times of all the planets without the pre-ingress and post-egress margins.
+        keep (np.ndarray): Which of the planets the observatory has, the `planet` field of the result counts only these.
+        observatory (Observatory): Observatory, its margins are added.
+        end_jd (float): End of the window as TDB JD, transits that end after it are left out like `transit_times` does.
+
+    Returns:
+        np.ndarray: Transit times with the same fields and order as `transit_times` gives for the observatory.
+    """
+    res = times[keep[times['planet']]]
+    res['planet'] = (np.cumsum(keep) - 1)[res['planet']]
+    res['pre_ingress'] = res['ingress'] - observatory.exo_hours_before.to(u.day).value
+    res['post_egress'] = res['egress'] + observatory.exo_hours_after.to(u.day).value
+    return res[res['post_egress'] <= end_jd]
+
+
+def _site_transit_table_rows(planets: List[Planet],
+                             times: np.ndarray,
+                             start_time: Time,
+                             end_time: Time,
+                             observatory: Observatory,
+                             night_only: bool,
+                             uncertainty_sigma: float,
+                             filter_args: Dict[str, Any] | None,
+                             ignore_warnings: bool) -> Tuple[np.ndarray, str]:
+    """Worker side of `ExoClockData.get_transits_for_observatories`: the transits of one observatory as `TransitTable` rows.
+    With `ignore_warnings` False the warning filters are left to the caller, see `Planet.get_transits`.
+
+    Returns:
+        Tuple[np.ndarray, str]: The rows (filtered by `ExoClockData.filter_transits` with `filter_args` if given) and their time scale.
+    """
+    observatory.prepare_twilights(start_time, end_time)
+    data, scale, _ = _transit_table_rows(planets, times, start_time, end_time, observatory, night_only, uncertainty_sigma,
+                                         ignore_warnings)
+    if filter_args is None:
+        return data, scale
+    return data[_filter_mask(TransitTable(planets, observatory, data, scale), observatory, **filter_args)], scale
+
+
+def _is_array_constraint(constraint) -> bool:
+    """Can the constraint be applied to altitude and azimuth arrays by `_array_constraint_mask`?"""
+    return isinstance(constraint, (HorizonConstraint, AltitudeConstraint)) and constraint.boolean_constraint
+
+
+def _array_constraint_mask(constraint: HorizonConstraint | AltitudeConstraint, alt: np.ndarray, az: np.ndarray) -> np.ndarray:
+    """Boolean horizon or altitude constraint for altitude and azimuth arrays in degrees."""
+    if isinstance(constraint, HorizonConstraint):
+        return constraint.is_above(alt, az)
+    return (constraint.min.to(u.deg).value <= alt) & (alt <= constraint.max.to(u.deg).value)
+
+
+def _filter_mask(table: TransitTable,
+                 observatory: Observatory,
+                 apply_horizon: bool = True,
+                 apply_twilight: str = 'none',
+                 include_meridian_flip: bool = True,
+                 include_problem_meridian_flip: bool = True) -> np.ndarray:
+    """Rows of `table` that pass `ExoClockData.filter_transits` (with the same arguments).
+
+    The twilight and meridian rules are array masks. The positions of the remaining transits' stars at all their
+    contact times come from the observatory's track cache (one call for all the missing tracks, see
+    `kcexo.calc.altaz.AltAzTrackCache`) so that the plots of the transits can reuse them, and the horizon or altitude constraints are applied to
+    the arrays. Constraints that cannot be applied to the arrays fall back to one `is_event_observable` call per planet.
+    """
+    horizon_constraint = [observatory.horizon_constraint if apply_horizon else AltitudeConstraint(20*u.deg)]
+    mask = table.twilight_mask(apply_twilight) & table.meridian_mask(include_meridian_flip, include_problem_meridian_flip)
+    rows = np.nonzero(mask)[0]
+    if len(rows) == 0:
+        return mask
+    if all(_is_array_constraint(c) for c in horizon_constraint):
+        planet_idx = table.data['planet'][rows]
+        ra = np.array([p.host_star.c.ra.to(u.deg).value for p in table.planets])[planet_idx]
+        dec = np.array([p.host_star.c.dec.to(u.deg).value for p in table.planets])[planet_idx]
+        coords = SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+        alt, az = observatory.altaz_tracks.contact_altaz(coords, table[rows].all_times())
+        observable = np.logical_and.reduce([_array_constraint_mask(c, alt, az) for c in horizon_constraint])
+        mask[rows] = np.all(observable, axis=1)
+        return mask
+    all_times = table.all_times()
+    for n in np.unique(table.data['planet'][rows]):
+        planet_rows = rows[table.data['planet'][rows] == n]
+        times = all_times[planet_rows].ravel()
+        observable = is_event_observable(horizon_constraint, observatory.observer, table.planets[n].host_star.target, times)
+        mask[planet_rows] = np.all(np.reshape(observable, (len(planet_rows), -1)), axis=1)
+    return mask
 
 
 class ExoClockData():
     """Exoclock data represented as `kcexo` objects."""
+    
+    CHUNKS_PER_WORKER: int = 4  #: number of chunks per worker process when `get_transits` runs in parallel
     def __init__(self,
                  file_root: Path,
                  file_stem_override: str = "",
-                 max_age: u.Quantity["time"] = 1 * u.day):
+                 max_age: u.Quantity["time"] = 1 * u.day,
+                 derived_cache: DerivedParameterCache | None = None):
+        """Load the exoclock catalogue and create all the planets.
+
+        Args:
+            file_root (Path): Directory where the catalogue cache files are.
+            file_stem_override (str, optional): Override of the catalogue cache file stem. Defaults to "".
+            max_age (u.Quantity['time'], optional): How old can the catalogue be before it is refreshed? Defaults to one day.
+            derived_cache (DerivedParameterCache | None, optional): Cache of T12/T14 values. Defaults to None meaning 
+                that the cache stored next to the catalogue cache file will be used.
+        """
         self.sc = ExoClock(file_root, file_stem_override, max_age)
         self.sc.load()
         
+        if derived_cache is None:
+            derived_cache = DerivedParameterCache(file_root, self.sc.file_stem+"_derived")
+        # a cache reused from an earlier load only keeps what this catalogue uses
+        derived_cache.reset_usage()
+        self.derived_cache: DerivedParameterCache = derived_cache
+        
         self.data: Dict[str, Planet] = {}
         for row in self.sc.data['data']:
-            p = Planet.from_exoclock_js(row)
+            p = Planet.from_exoclock_js(row, self.derived_cache)
             self.data[p.name] = p
+        self.derived_cache.save()
     
     def get_transits(self,
                      start_time: Time,
@@ -38,25 +184,217 @@ class ExoClockData():
                      observatory: Observatory,
                      night_only: bool = True,
                      telescope_only: bool = True,
-                     ) -> Dict[str, List[Transit]]:
+                     uncertainty_sigma: float = 0.0,
+                     as_table: bool = False,
+                     workers: int | None = None,
+                     executor: Executor | None = None,
+                     names: List[str] | None = None,
+                     ) -> Dict[str, List[Transit]] | TransitTable:
         """Return a map from planet name to a list of transits, optionally filtered by telescope aperture and "night only" constraint.
 
+        Every planet's transits are independent so, if `workers` or `executor` are given, the planets are split
+        in to chunks (of about the same number of transits) that are processed in parallel. The observatory,
+        with its twilight table already prepared, is sent with every chunk and the workers send back the
+        transits as `TransitTable` rows which are merged in the planet order, so the result does not depend on
+        the scheduling.
+
         Args:
             start_time (Time): Transits start time
             end_time (Time): Transits end time
             observatory (Observatory): Location and the instrument that will be used.
             night_only (bool, optional): Should only night transits be listed? Defaults to True.
             telescope_only (bool, optional): Should only planets potentially visible with the equipment be listed. Defaults to True.
+            uncertainty_sigma (float, optional): Widen the transit windows by the timing uncertainty of this many sigma, 
+                see `Planet.get_transits`. Defaults to 0.0 meaning no widening.
+            as_table (bool, optional): Return a `TransitTable` instead of the map. Defaults to False.
+            workers (int | None, optional): Number of worker processes. Defaults to None meaning no parallel processing
+                unless an `executor` is given, in which case the number of CPUs is used for the chunking.
+            executor (Executor | None, optional): Executor to use instead of creating a process pool. Defaults to None.
+            names (List[str] | None, optional): Only these planets. Defaults to None meaning all the planets.
             
         Returns:
-            Dict[str, Transit]: Mapping from planet name to transit objects
+            Dict[str, Transit] | TransitTable: Mapping from planet name to transit objects or all the transits as a table.
         """
+        names = [name for name in (names if names is not None else self.data.keys())
+                 if (telescope_only and (self.data[name].status.min_aperture <= observatory.aperture)) or (not telescope_only)]
+        # transit times of all the planets at once, each planet then only gets its own rows
+        times = self.get_transit_times(start_time, end_time, observatory, names)
+        # twilights of all the nights in one batch, every transit then only looks them up
+        observatory.prepare_twilights(start_time, end_time)
+        if workers is not None or executor is not None:
+            table = self._get_transits_parallel(names, times, start_time, end_time, observatory, night_only, uncertainty_sigma,
+                                                workers, executor)
+            self.derived_cache.save(prune=False)
+            return table if as_table else table.to_dict()
+        bounds = np.searchsorted(times['planet'], np.arange(len(names) + 1))
         with warnings.catch_warnings(action="ignore", category=TargetNeverUpWarning):
-            return {
-                name: p.get_transits(start_time, end_time, observatory, night_only)
-                for name, p in self.data.items()
-                if (telescope_only and (p.status.min_aperture <= observatory.aperture)) or (not telescope_only)
+            transits = {
+                name: self.data[name].get_transits(start_time, end_time, observatory, night_only, uncertainty_sigma,
+                                                   times=times[bounds[n]:bounds[n + 1]])
+                for n, name in enumerate(names)
             }
+        # planets solve their orbits when first used so save any new values
+        self.derived_cache.save(prune=False)
+        if as_table:
+            return TransitTable.from_transits(transits, self.data, observatory)
+        return transits
+
+    def _get_transits_parallel(self,
+                               names: List[str],
+                               times: np.ndarray,
+                               start_time: Time,
+                               end_time: Time,
+                               observatory: Observatory,
+                               night_only: bool,
+                               uncertainty_sigma: float,
+                               workers: int | None,
+                               executor: Executor | None) -> TransitTable:
+        """Process pool part of `get_transits`."""
+        workers = workers or os.cpu_count() or 1
+        planets = [self.data[name] for name in names]
+        bounds = np.searchsorted(times['planet'], np.arange(len(names) + 1))
+        # chunk edges (planet indices) so that every chunk has about the same number of transits
+        num_chunks = max(1, min(len(names), workers * self.CHUNKS_PER_WORKER))
+        edges = np.searchsorted(bounds, np.linspace(0, len(times), num_chunks + 1)[1:-1])
+        edges = np.unique(np.concatenate([[0], edges, [len(names)]]))
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = []
+            for a, b in zip(edges[:-1], edges[1:]):
+                rows = times[bounds[a]:bounds[b]].copy()
+                rows['planet'] -= a
+                futures.append(executor.submit(_transit_table_rows, planets[a:b], rows, start_time, end_time, observatory,
+                                               night_only, uncertainty_sigma))
+            # merged in the submission order so the result is deterministic
+            data = []
+            scale = start_time.scale
+            for a, future in zip(edges[:-1], futures):
+                rows, rows_scale, derived = future.result()
+                rows['planet'] += a
+                data.append(rows)
+                if len(rows) > 0:
+                    scale = rows_scale
+                # orbits solved by the workers are kept (and cached) here too
+                for p, values in zip(planets[a:], derived):
+                    if values is not None:
+                        p.set_derived_values(*values)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+        merged = np.concatenate(data) if data else None
+        return TransitTable(planets, observatory, merged, scale)
+
+    def get_transits_for_observatories(self,
+                                       start_time: Time,
+                                       end_time: Time,
+                                       observatories: Observatories | Sequence[Observatory],
+                                       night_only: bool = True,
+                                       telescope_only: bool = True,
+                                       uncertainty_sigma: float = 0.0,
+                                       filter_args: Dict[str, Any] | None = None,
+                                       workers: int | None = None,
+                                       executor: Executor | None = None,
+                                       names: List[str] | None = None) -> MultiSiteTransitTable:
+        """Transits of many observatories in one call, as one table with an `observatory` column.
+
+        The work that does not depend on the site is done once for all the observatories: the transit times from the
+        linear ephemeris of every planet (the observatory margins are added afterwards, see `_site_transit_times`) and
+        T12/T14 of every planet. The rest (barycentric correction, meridian crossings, twilights and, with `filter_args`,
+        the altitude/azimuth and horizon filter) is done for the observatories concurrently, one task per observatory.
+
+        Args:
+            start_time (Time): Transits start time
+            end_time (Time): Transits end time
+            observatories (Observatories | Sequence[Observatory]): The observatories, all the configured ones of an `Observatories`.
+            night_only (bool, optional): Should only night transits be listed? Defaults to True.
+            telescope_only (bool, optional): Should only planets potentially visible with each observatory's equipment
+                be listed? Defaults to True.
+            uncertainty_sigma (float, optional): Widen the transit windows by the timing uncertainty of this many sigma,
+                see `Planet.get_transits`. Defaults to 0.0 meaning no widening.
+            filter_args (Dict[str, Any] | None, optional): Keyword arguments of `filter_transits` (e.g. `{'apply_twilight': 'nautical'}`)
+                to filter the transits of every observatory with. Defaults to None meaning no filtering.
+            workers (int | None, optional): Number of worker threads. Defaults to None meaning one per observatory
+                (up to the number of CPUs), ignored if an `executor` is given.
+            executor (Executor | None, optional): Executor to use instead of creating a thread pool, e.g. a
+                `ProcessPoolExecutor` so that the observatories do not share the GIL (the twilights calculated by the
+                processes are not kept by the observatories of this process then). Executors other than a
+                `ThreadPoolExecutor` are taken to run the tasks in other processes. Defaults to None.
+            names (List[str] | None, optional): Only these planets. Defaults to None meaning all the planets.
+
+        Returns:
+            MultiSiteTransitTable: The transits, in the observatory order and then in the planet order.
+        """
+        if isinstance(observatories, Observatories):
+            observatories = list(observatories.observatories.values())
+        observatories = list(observatories)
+        names = list(names if names is not None else self.data.keys())
+        planets = [self.data[name] for name in names]
+        # the orbits are solved here, once, rather than by every observatory
+        for p in planets:
+            _ = p.t12
+        self.derived_cache.save(prune=False)
+        times = self.get_transit_times(start_time, end_time, None, names)
+        end_jd = getattr(end_time, EPHEMERIS_SCALE).jd
+
+        site_planets = [np.array([not telescope_only or p.status.min_aperture <= observatory.aperture for p in planets], dtype=bool)
+                        for observatory in observatories]
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=max(1, min(len(observatories), workers or os.cpu_count() or 1)))
+        # `warnings.catch_warnings` is not thread safe so threads share the filters set here, processes set their own
+        in_threads = isinstance(executor, ThreadPoolExecutor)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=TargetAlwaysUpWarning)
+            warnings.filterwarnings("ignore", category=TargetNeverUpWarning)
+            try:
+                futures = [
+                    executor.submit(_site_transit_table_rows, [p for p, k in zip(planets, keep) if k], _site_transit_times(times, keep, observatory, end_jd),
+                                    start_time, end_time, observatory, night_only, uncertainty_sigma, filter_args, not in_threads)
+                    for observatory, keep in zip(observatories, site_planets)
+                ]
+                tables = []
+                for keep, observatory, future in zip(site_planets, observatories, futures):
+                    data, scale = future.result()
+                    tables.append(TransitTable([p for p, k in zip(planets, keep) if k], observatory, data, scale))
+            finally:
+                if own_executor:
+                    executor.shutdown(wait=True, cancel_futures=True)
+        return MultiSiteTransitTable.from_tables(tables, planets)
+
+    def get_transit_times(self,
+                          start_time: Time,
+                          end_time: Time,
+                          observatory: Observatory | None,
+                          names: List[str] | None = None) -> np.ndarray:
+        """Transit times of many planets as one array, see `kcexo.calc.ephemeris.transit_times`.
+
+        Nothing but array arithmetic is done here so it is fast even for the whole catalogue over many months.
+        The times are TDB JDs and they have *not* been adjusted for barycentric coordinates.
+
+        Args:
+            start_time (Time): Transits start time
+            end_time (Time): Transits end time
+            observatory (Observatory | None): Location and the instrument that will be used, the pre-ingress and
+                post-egress times use its margins. None means no margins, see `_site_transit_times`.
+            names (List[str] | None, optional): Planets to use, the `planet` field indexes this list. Defaults to None
+                meaning all the planets in the order of `data`.
+
+        Returns:
+            np.ndarray: Structured array with all the transit times.
+        """
+        if names is None:
+            names = list(self.data.keys())
+        planets = [self.data[name] for name in names]
+        return transit_times(np.array([p.ephem_mid_time_jd for p in planets]),
+                             np.array([p.period.to(u.day).value for p in planets]),
+                             np.array([p.duration.to(u.day).value for p in planets]),
+                             observatory.exo_hours_before.to(u.day).value if observatory is not None else 0.0,
+                             observatory.exo_hours_after.to(u.day).value if observatory is not None else 0.0,
+                             getattr(start_time, EPHEMERIS_SCALE).jd,
+                             getattr(end_time, EPHEMERIS_SCALE).jd)
 
     def get_transits_for_single_target(self,
                                        target: str,
@@ -65,7 +403,9 @@ class ExoClockData():
                                        observatory: Observatory,
                                        night_only: bool = True,
                                        telescope_only: bool = True,
-                                       ) -> Dict[str, List[Transit]]:
+                                       uncertainty_sigma: float = 0.0,
+                                       as_table: bool = False,
+                                       ) -> Dict[str, List[Transit]] | TransitTable:
         """Return a map from planet name to a list of transits, optionally filtered by telescope aperture and "night only" constraint for a single target.
 
         Args:
@@ -74,29 +414,37 @@ class ExoClockData():
             observatory (Observatory): Location and the instrument that will be used.
             night_only (bool, optional): Should only night transits be listed? Defaults to True.
             telescope_only (bool, optional): Should only planets potentially visible with the equipment be listed. Defaults to True.
+            uncertainty_sigma (float, optional): Widen the transit windows by the timing uncertainty of this many sigma, 
+                see `Planet.get_transits`. Defaults to 0.0 meaning no widening.
+            as_table (bool, optional): Return a `TransitTable` instead of the map. Defaults to False.
             
         Returns:
-            Dict[str, Transit]: Mapping from planet name to transit objects
+            Dict[str, Transit] | TransitTable: Mapping from planet name to transit objects or the transits as a table.
         """
         with warnings.catch_warnings(action="ignore", category=TargetNeverUpWarning):
             planet = self.data[target]
             if (telescope_only and (planet.status.min_aperture <= observatory.aperture)):
-                transits = planet.get_transits(start_time, end_time, observatory, night_only)
-                return { target: transits }
+                transits = planet.get_transits(start_time, end_time, observatory, night_only, uncertainty_sigma)
+                self.derived_cache.save(prune=False)
+                transits = { target: transits }
             else:
-                return {}
+                transits = {}
+        if as_table:
+            return TransitTable.from_transits(transits, self.data, observatory)
+        return transits
   
     def filter_transits(self,
-                        all_transits: Dict[str, List[Transit]],
+                        all_transits: Dict[str, List[Transit]] | TransitTable,
                         observatory: Observatory,
                         apply_horizon: bool = True,
                         apply_twilight: str = 'none',
                         include_meridian_flip: bool = True,
-                        include_problem_meridian_flip: bool = True) -> Tuple[Dict[str, List[Transit]], List[str]]:
+                        include_problem_meridian_flip: bool = True) -> Tuple[Dict[str, List[Transit]] | TransitTable, List[str]]:
         """Filter transits by various parameters.
 
         Args:
-            all_transits (Dict[str, List[Transit]]): Transits for each planet.
+            all_transits (Dict[str, List[Transit]] | TransitTable): Transits for each planet, a table is filtered 
+                with array masks and a filtered table is returned.
             observatory (Observatory): Location and the instrument that will be used.
             apply_horizon (bool, optional): Should horizon visibility be applied? Default it True.
             apply_twilight (bool, str): Which twilight should be applied. Default is 'none'. Acceptible twilights are 
@@ -108,62 +456,63 @@ class ExoClockData():
             Tuple[Dict[str, List[Transit]], List[str]]: A filtered list of transits for each planet and a list of planet names with visible transits. If a planet does not 
                 have a visible transits the first map will map to an empty list.
         """
-        transits = copy.deepcopy(all_transits)
-        horizon_constraint = []
-        if apply_horizon:
-            horizon_constraint.append(observatory.horizon_constraint)
-        else:
-            horizon_constraint.append(AltitudeConstraint(20*u.deg))
+        if isinstance(all_transits, TransitTable):
+            mask = _filter_mask(all_transits, observatory, apply_horizon, apply_twilight,
+                                     include_meridian_flip, include_problem_meridian_flip)
+            filtered = all_transits.filter(mask)
+            return filtered, filtered.visible()
+        # the same masks on a table of the transits, the result keeps the original `Transit` objects
+        table = TransitTable.from_transits(all_transits, self.data, observatory)
+        mask = _filter_mask(table, observatory, apply_horizon, apply_twilight,
+                                 include_meridian_flip, include_problem_meridian_flip)
+        transits: Dict[str, List[Transit]] = {}
         visible: List[str] = []
-        for name, planet_transits in transits.items():
-            new_transits = []
-            for i, transit in enumerate(planet_transits):
-                # we we don't want meridian flips and have them or if we are not ok with the twilight, skip this transit
-                if (((not include_meridian_flip and transit.has_meridian_crossing) or 
-                     (not include_problem_meridian_flip and transit.problem_meridian_crossing)) or
-                    not self._twilight_is_ok(transit, apply_twilight)):
-                    continue
-                # if the transit is visible (given the horizon)
-                if np.all(is_event_observable(horizon_constraint, observatory.observer, self.data[name].host_star.target, transit.as_list())):
-                    new_transits.append(planet_transits[i])
-            transits[name] = new_transits
-            if new_transits:
+        start = 0
+        for name, planet_transits in all_transits.items():
+            planet_mask = mask[start:start + len(planet_transits)]
+            start += len(planet_transits)
+            transits[name] = [t for t, ok in zip(planet_transits, planet_mask) if ok]
+            if transits[name]:
                 visible.append(name)
         return transits, visible
 
-    def _twilight_is_ok(self,
-                        transit: Transit, 
-                        apply_twilight: str) -> bool:
-        """Check if the twilight constraint is ok.
+    def get_exposure_times(self,
+                           observatory: Observatory,
+                           target_snr: float | None = None,
+                           depth_precision: float = 0.1,
+                           airmass: float = 1.2) -> Dict[str, Tuple[u.Quantity["time"], u.Quantity["time"]]]:
+        """Exposure times needed for every planet's host star and the exposure at which the star saturates.
+
+        All the planets are done in a single vectorised call using the observatory's instrument and the sky
+        settings (see `kcexo.calc.exposure`). Stars without a magnitude in the observatory's photometry filter get `NaN`.
 
         Args:
-            transit (Transit): Transit in question
-            apply_twilight (str): which twilight? Acceptible twilights are 
-                'astronomical', 'nautical', 'civil', 'none' or 'all'. If
-                e.g. 'nautical' is passed in then 'nautical' and 'astronomical' are
-                acceptable while 'civil' is not. If 'none' is passed in then none
-                of twilights are ok. 'all' means that we don't care if it is day or night.
-                Strictly speaking 'civil' and 'none' are the same in this context as
-                day or night is filtered off elsewhere.
-
-        Raises:
-            ValueError: If the twilight is not one of 'astronomical', 'nautical', 'civil', 'none' or 'all'.
+            observatory (Observatory): Location and the instrument that will be used.
+            target_snr (float | None, optional): SNR to reach. Defaults to None meaning that `depth_precision` is used.
+            depth_precision (float, optional): Required photometric error of a single exposure as a fraction of the
+                planet's transit depth. Defaults to 0.1.
+            airmass (float, optional): Airmass to assume. Defaults to 1.2.
 
         Returns:
-            bool: denoting if the twilight constraint has been satisfied
+            Dict[str, Tuple[u.Quantity['time'], u.Quantity['time']]]: Map from planet name to the exposure time and the saturation exposure time.
         """
-        if apply_twilight not in ['all', 'civil']:
-            if apply_twilight == 'astronomical':
-                return not transit.problem_twilight_astronomical
-            elif apply_twilight == 'nautical':
-                return not transit.problem_twilight_nautical
-            elif apply_twilight == 'none':
-                return not transit.problem_twilight_civil and not transit.problem_twilight_nautical and not transit.problem_twilight_civil
-            else:
-                raise ValueError(f"Unknown twilight constraint: {apply_twilight}")
+        names = list(self.data.keys())
+        band = observatory.photometry_filter
+        mags = np.array([self.data[n].host_star.mag.get(band, np.nan) for n in names], dtype=float)
+        if target_snr is None:
+            depths = np.array([self.data[n].depth.to(u.mag).value for n in names])
+            snr = snr_for_precision(depths, depth_precision)
         else:
-            return True
-    
+            snr = target_snr
+        tel_diam = observatory.aperture.to(u.cm).value
+        pixsize = observatory.pixel_scale.to(u.arcsec).value
+        fwhm = observatory.seeing.to(u.arcsec).value
+        exptime = exposure_for_snr(snr, band, mags, airmass, tel_diam, observatory.qe, observatory.read_noise, pixsize,
+                                   observatory.sky_mag, fwhm, fwhm * observatory.aperture_radius_fwhm)
+        saturation = saturation_exposure(band, mags, airmass, tel_diam, observatory.qe, pixsize, observatory.sky_mag, fwhm,
+                                         observatory.full_well)
+        return {n: (e * u.s, t * u.s) for n, e, t in zip(names, exptime, saturation)}
+
     def __getitem__(self, key: str) -> Planet:
         """Provide the [] operator to access the planet data.
         
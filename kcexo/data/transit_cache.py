@@ -0,0 +1,238 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+import hashlib
+import logging
+import pickle
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+
+from kcexo.planet import Planet
+from kcexo.observatory import Observatory
+from kcexo.transit_table import TransitTable, transit_table_dtype
+from kcexo.calc.ephemeris import EPHEMERIS_SCALE
+from kcexo.data.exoclock_data import ExoClockData
+
+
+class TransitCache():
+    """Transits already found, kept per observatory, planet and day so that moving the search window only
+    calculates the days that have not been searched before.
+
+    A transit belongs to the day (TDB JD `(d, d + 1]`) of its ephemeris mid time, ie before the barycentric
+    adjustment, which is also what `ExoClockData.get_transits` uses to pick the transits in a window, so the cached
+    results are the same as the ones calculated from scratch. Entries are keyed by the hash of the observatory settings
+    that the transits depend on and by the hash of every planet's parameters, so a changed planet or observatory
+    simply misses the cache. If `file_root` is given the cache is kept in a pickle file there between sessions, use
+    `drop_days_before` to forget the days that have passed.
+    """
+    VERSION: int = 2  #: bump this if the way transits are calculated changes
+    MARGIN_DAYS: int = 2  #: extra days searched after the last day so that the transits that end after it are found
+
+    def __init__(self, file_root: Path | None = None, file_stem: str = "transits") -> None:
+        """Initialise the cache and load whatever is already on disk.
+
+        Args:
+            file_root (Path | None, optional): Directory where the cache file is. Defaults to None meaning memory only.
+            file_stem (str, optional): Cache file stem. Defaults to "transits".
+        """
+        self.log = logging.getLogger()
+
+        self.file: Path | None = file_root.joinpath(file_stem+".pickle") if file_root is not None else None
+        # settings key -> planet key -> (days searched, transit rows with the `planet` column set to 0, day of every row)
+        self.data: Dict[str, Dict[str, Tuple[Set[int], np.ndarray, np.ndarray]]] = {}
+        self.used: Set[Tuple[str, str]] = set()
+        self.dirty: bool = False
+        self.load()
+
+    @staticmethod
+    def settings_key(observatory: Observatory, night_only: bool, uncertainty_sigma: float) -> str:
+        """Create the key of everything, other than the planet, that the transits depend on."""
+        values = np.array([
+            TransitCache.VERSION,
+            observatory.location.lat.to(u.deg).value,
+            observatory.location.lon.to(u.deg).value,
+            observatory.location.height.to(u.m).value,
+            observatory.observer.pressure.to(u.hPa).value,
+            observatory.observer.temperature.to(u.deg_C, equivalencies=u.temperature()).value,
+            observatory.observer.relative_humidity,
+            observatory.exo_hours_before.to(u.hour).value,
+            observatory.exo_hours_after.to(u.hour).value,
+            observatory.meridian_crossing_duration.to(u.min).value,
+            float(night_only),
+            uncertainty_sigma
+        ], dtype=np.float64)
+        return hashlib.sha1(values.tobytes()).hexdigest()
+
+    @staticmethod
+    def planet_key(planet: Planet) -> str:
+        """Create the key of a planet from all the values its transits depend on."""
+        values = np.array([
+            planet.ephem_mid_time_jd,
+            planet.ephem_mid_time_e.to(u.day).value,
+            planet.period.to(u.day).value,
+            planet.period_e.to(u.day).value,
+            planet.duration.to(u.day).value,
+            planet.depth.to(u.mmag).value,
+            planet.RpRs,
+            planet.RpRs_e,
+            planet.aRs,
+            planet.aRs_e,
+            planet.e,
+            planet.e_e,
+            planet.i.to(u.deg).value,
+            planet.i_e.to(u.deg).value,
+            planet.omega.to(u.deg).value,
+            planet.omega_e.to(u.deg).value,
+            planet.host_star.c.ra.to(u.deg).value,
+            planet.host_star.c.dec.to(u.deg).value
+        ], dtype=np.float64)
+        return hashlib.sha1(planet.name.encode("utf-8") + values.tobytes()).hexdigest()
+
+    @staticmethod
+    def _ephemeris_mid(planet: Planet, mid_jd: np.ndarray) -> np.ndarray:
+        """Ephemeris (not adjusted for barycentric coordinates) mid times of the transits with the mid times `mid_jd`."""
+        t0 = planet.ephem_mid_time_jd
+        period = planet.period.to(u.day).value
+        return t0 + np.round((mid_jd - t0) / period) * period
+
+    def get_transits(self,
+                     db: ExoClockData,
+                     start_time: Time,
+                     end_time: Time,
+                     observatory: Observatory,
+                     night_only: bool = True,
+                     telescope_only: bool = True,
+                     uncertainty_sigma: float = 0.0,
+                     workers: int | None = None,
+                     executor: Executor | None = None) -> TransitTable:
+        """Same as `ExoClockData.get_transits` (with `as_table=True`) but only the days that are not in the cache are calculated.
+
+        Args:
+            db (ExoClockData): Catalogue.
+            The rest are the same as for `ExoClockData.get_transits`.
+
+        Returns:
+            TransitTable: All the transits.
+        """
+        names = [name for name, p in db.data.items()
+                 if (telescope_only and (p.status.min_aperture <= observatory.aperture)) or (not telescope_only)]
+        start_jd = getattr(start_time, EPHEMERIS_SCALE).jd
+        end_jd = getattr(end_time, EPHEMERIS_SCALE).jd
+        days = set(range(int(np.floor(start_jd)), int(np.ceil(end_jd))))
+
+        settings = self.settings_key(observatory, night_only, uncertainty_sigma)
+        entries = self.data.setdefault(settings, {})
+        keys = [self.planet_key(db.data[name]) for name in names]
+
+        # planets that miss the same days are calculated together
+        missing: Dict[Tuple[int, ...], List[int]] = {}
+        for n, key in enumerate(keys):
+            searched = entries[key][0] if key in entries else set()
+            todo = tuple(sorted(days - searched))
+            if todo:
+                missing.setdefault(todo, []).append(n)
+        for todo, planet_indices in missing.items():
+            self._calculate(db, [names[n] for n in planet_indices], [keys[n] for n in planet_indices], list(todo),
+                            observatory, night_only, uncertainty_sigma, workers, executor, entries)
+
+        data = []
+        for n, (name, key) in enumerate(zip(names, keys)):
+            self.used.add((settings, key))
+            rows = entries[key][1]
+            planet = db.data[name]
+            mid = self._ephemeris_mid(planet, rows['mid'])
+            # the window end is applied to both the ephemeris and the adjusted post-egress times, like `get_transits` does
+            ephemeris_post_egress = (mid + 0.5 * planet.duration.to(u.day).value) + observatory.exo_hours_after.to(u.day).value
+            rows = rows[(mid > start_jd) & (mid <= end_jd) & (ephemeris_post_egress <= end_jd) & (rows['post_egress'] <= end_jd)].copy()
+            rows['planet'] = n
+            data.append(rows)
+        merged = np.concatenate(data) if data else None
+        return TransitTable([db.data[name] for name in names], observatory, merged, start_time.scale)
+
+    def _calculate(self,
+                   db: ExoClockData,
+                   names: List[str],
+                   keys: List[str],
+                   days: List[int],
+                   observatory: Observatory,
+                   night_only: bool,
+                   uncertainty_sigma: float,
+                   workers: int | None,
+                   executor: Executor | None,
+                   entries: Dict[str, Tuple[Set[int], np.ndarray, np.ndarray]]) -> None:
+        """Calculate the transits of some planets on some days and add them to `entries`."""
+        # runs of consecutive days
+        breaks = np.nonzero(np.diff(days) > 1)[0] + 1
+        for run in np.split(np.array(days), breaks):
+            first, last = int(run[0]), int(run[-1]) + 1
+            self.log.debug("Searching for transits of %d planets between JD %d and %d", len(names), first, last)
+            table = db.get_transits(Time(first, format='jd', scale=EPHEMERIS_SCALE).utc,
+                                    Time(last + self.MARGIN_DAYS, format='jd', scale=EPHEMERIS_SCALE).utc,
+                                    observatory, night_only, False, uncertainty_sigma, as_table=True,
+                                    workers=workers, executor=executor, names=names)
+            for n, (name, key) in enumerate(zip(names, keys)):
+                rows = table.data[table.data['planet'] == n]
+                mid = self._ephemeris_mid(db.data[name], rows['mid'])
+                in_days = (mid > first) & (mid <= last)
+                rows = rows[in_days].copy()
+                rows['planet'] = 0
+                row_days = (np.ceil(mid[in_days]) - 1).astype(int)
+                searched, old_rows, old_days = entries.get(key, (set(), np.empty(0, dtype=transit_table_dtype), np.empty(0, dtype=int)))
+                entries[key] = (searched | set(range(first, last)), np.concatenate([old_rows, rows]), np.concatenate([old_days, row_days]))
+        self.dirty = True
+
+    def drop_days_before(self, time: Time) -> None:
+        """Forget the days before the one `time` is on, e.g. the start of the search window, so that a cache used for
+        a search every day does not keep growing. Planets and observatory settings left without days are dropped too.
+
+        Args:
+            time (Time): First day to keep.
+        """
+        first = int(np.floor(getattr(time, EPHEMERIS_SCALE).jd))
+        for entries in self.data.values():
+            for key, (searched, rows, row_days) in list(entries.items()):
+                kept = {d for d in searched if d >= first}
+                if len(kept) == len(searched):
+                    continue
+                if kept:
+                    entries[key] = (kept, rows[row_days >= first], row_days[row_days >= first])
+                else:
+                    del entries[key]
+                self.dirty = True
+        self.data = {settings: entries for settings, entries in self.data.items() if entries}
+
+    def load(self) -> None:
+        """Load the cache file if there is one. Broken files are ignored as they will be rebuilt."""
+        if self.file is None or not self.file.is_file():
+            return
+        try:
+            with open(self.file, "rb") as f:
+                data = pickle.load(f)
+            if data.get('version') == self.VERSION:
+                self.data = data['data']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError) as err:
+            self.log.warning("Ignoring transit cache %s: %s", self.file, err)
+
+    def save(self, prune: bool = True) -> None:
+        """Save the cache if anything has changed and there is a file.
+
+        Args:
+            prune (bool, optional): Drop the planets (and observatory settings) that have not been used since the cache
+                was loaded, ie planets that are no longer in the catalogue or that have changed. Defaults to True.
+        """
+        if prune:
+            pruned = {s: {k: v for k, v in entries.items() if (s, k) in self.used} for s, entries in self.data.items()}
+            pruned = {s: entries for s, entries in pruned.items() if entries}
+            if sum(len(e) for e in pruned.values()) != sum(len(e) for e in self.data.values()):
+                self.data = pruned
+                self.dirty = True
+        if not self.dirty or self.file is None:
+            return
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "wb") as f:
+            pickle.dump({'version': self.VERSION, 'data': self.data}, f, pickle.HIGHEST_PROTOCOL)
+        self.dirty = False
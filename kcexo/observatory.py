@@ -1,22 +1,29 @@
 # -*- coding: UTF-8 -*-
-# cSpell:ignore crota exoclock tofo
+# cSpell:ignore crota exoclock tofo altaz
 import logging
 import csv
 import datetime
-import functools
+import hashlib
 from pathlib import Path
 from typing import Tuple, List, NamedTuple, Any, Dict
 
 import numpy as np
 from jsonschema import Draft202012Validator
 
+import astropy
 import astropy.units as u
-from astropy.coordinates import EarthLocation
+from astropy.coordinates import EarthLocation, SkyCoord
 from astropy.time import Time
 from astroplan import Observer
+try:
+    import astropy_iers_data
+except ImportError:  # older astropy versions bundle the IERS data
+    astropy_iers_data = None
 
 from kcexo.schema import observatories_schema
 from kcexo.constraint.horizon_constraint import HorizonConstraint, get_interpolator
+from kcexo.calc.twilight import TwilightTable
+from kcexo.calc.altaz import PRECISIONS, altitude_azimuth, AltAzTrackCache
 
 
 class SourceDefinition(NamedTuple):
@@ -28,7 +35,11 @@ class SourceDefinition(NamedTuple):
 class Observatory:
     """All things related to the observing location and the equipment that is to be used."""    
     
-    def __init__(self, name: str, data: dict, root: Path) -> None:
+    TWILIGHT_TABLE_PADDING: int = 7  #: extra nights calculated either side when `twilight_table` has to be extended
+    TWILIGHT_CACHE_VERSION: int = 1  #: bump this if the way the twilight table is calculated changes
+    MAX_ALTAZ_TRACKS: int = 8192  #: number of transit altitude/azimuth tracks kept in `altaz_tracks`
+    
+    def __init__(self, name: str, data: dict, root: Path, cache_dir: Path | None = None) -> None:
         """Create the observatory object from dictionary.
         
         The dictionary is usually created by reading in the YAML or JSON file with
@@ -36,8 +47,12 @@ class Observatory:
         
         This "constructor" also creates horizon and twilight constraint list, if the right data
         is passed in.
+        
+        If `cache_dir` is given, the twilight table is kept there between sessions (see `twilight_cache_file`).
         """
+        self.log = logging.getLogger()
         self.name = name
+        self.cache_dir: Path | None = cache_dir
         physical_data = data['physical']
         if np.abs(physical_data['lat_deg']*u.deg) > 65*u.deg:
             raise ValueError("Only Longitudes below 65 degrees or above -65 degrees are supported.")
@@ -66,13 +81,24 @@ class Observatory:
         self.cdelt2: float = (self.fov[1]/self.sensor_size_px[1]).value
         self.crota1: float = instrument['sensor']['crota1']
         self.crota2: float = instrument['sensor']['crota2']
+        self.pixel_scale: u.Quantity["angle"] = (np.sqrt(self.cdelt1 * self.cdelt2) * u.deg).to(u.arcsec)
+        self.qe: float = instrument['sensor'].get('qe', 0.6)
+        self.read_noise: float = instrument['sensor'].get('read_noise_e', 3.5)
+        self.full_well: float = instrument['sensor'].get('full_well_e', 50_000.0)
         
         config = data['configuration']
         self.limiting_mag: float = config['limiting_mag']
+        self.seeing: u.Quantity["angle"] = config.get('seeing_arcsec', 3.0) * u.arcsec
+        self.sky_mag: float = config.get('sky_mag_arcsec2', 19.5)
+        self.photometry_filter: str = config.get('photometry_filter', 'R')
+        self.aperture_radius_fwhm: float = config.get('aperture_radius_fwhm', 2.0)
         
         self.exo_hours_before: u.Quantity["time"] = config['exo_hours_before'] * u.hour
         self.exo_hours_after: u.Quantity["time"] = config['exo_hours_after'] * u.hour
         self.meridian_crossing_duration: u.Quantity["time"] = config.get('meridian_crossing_duration_min', 10) * u.minute
+        self.altaz_precision: str = config.get('altaz_precision', 'exact')
+        if self.altaz_precision not in PRECISIONS:
+            raise ValueError(f"Unknown altaz precision: {self.altaz_precision}, use one of {PRECISIONS}")
 
         # load horizon
         self.horizon: List[Tuple[float, float]] = []
@@ -90,9 +116,12 @@ class Observatory:
         self.horizon = list(zip(az, alt))
         self.horizon_constraint = HorizonConstraint(self.horizon, az_interpolator=self.horizon_interpolator)
         
-        # cashed version of `_get_twilight_*`
-        self._get_twilight_e = functools.lru_cache(maxsize=365*10)(self.__get_twilight_e)
-        self._get_twilight_m = functools.lru_cache(maxsize=365*10)(self.__get_twilight_m)
+        # altitude/azimuth tracks of the transits shared by the filters and the plots
+        self.altaz_tracks: AltAzTrackCache = AltAzTrackCache(self.observer, self.altaz_precision, self.MAX_ALTAZ_TRACKS)
+
+        # sunset/sunrise and twilight times of many nights, see `prepare_twilights`
+        self.twilight_table: TwilightTable | None = None
+        self._twilight_cache_checked: bool = False
 
     def __eq__(self, other: Any):
         """Equality for all..."""
@@ -120,17 +149,106 @@ class Observatory:
                 self.cdelt2 == other.cdelt2,
                 self.crota1 == other.crota1,
                 self.crota2 == other.crota2,
+                self.qe == other.qe,
+                self.read_noise == other.read_noise,
+                self.full_well == other.full_well,
                 self.limiting_mag == other.limiting_mag,
+                self.seeing == other.seeing,
+                self.sky_mag == other.sky_mag,
+                self.photometry_filter == other.photometry_filter,
+                self.aperture_radius_fwhm == other.aperture_radius_fwhm,
                 self.exo_hours_before == other.exo_hours_before,
                 self.exo_hours_after == other.exo_hours_after,
+                self.altaz_precision == other.altaz_precision,
                 self.horizon == other.horizon
                 # we are not checking constraints at the moment (as we don't know how it can be done) so twilight could be different
             ])
         return False
     
+    def altaz(self, coords: SkyCoord, times: Time) -> Tuple[np.ndarray, np.ndarray]:
+        """Altitude and azimuth in degrees of the stars at the times (broadcast against each other) with the
+        observatory's `altaz_precision`, see `kcexo.calc.altaz.altitude_azimuth`."""
+        return altitude_azimuth(coords, times, self.observer, self.altaz_precision)
+
+    def __getstate__(self) -> dict:
+        """Pickle (e.g. for the worker processes of `ExoClockData.get_transits`) without the altitude/azimuth tracks."""
+        state = self.__dict__.copy()
+        state['altaz_tracks'] = AltAzTrackCache(self.observer, self.altaz_precision, self.MAX_ALTAZ_TRACKS)
+        return state
+
+    def prepare_twilights(self, start_time: Time, end_time: Time) -> None:
+        """Make sure that the twilights of all the nights between the two times are in `twilight_table`.
+
+        The missing nights (plus `TWILIGHT_TABLE_PADDING` nights either side) are calculated in a single batch, see
+        `kcexo.calc.twilight.TwilightTable`, so planning over a long period costs one calculation.
+
+        Args:
+            start_time (Time): Start of the period.
+            end_time (Time): End of the period.
+        """
+        if self.twilight_table is None and not self._twilight_cache_checked:
+            self._load_twilight_table()
+        first = self._night_mjd(start_time) - 1
+        last = self._morning_mjd(end_time) + 1
+        if self.twilight_table is not None and self.twilight_table.covers(first) and self.twilight_table.covers(last):
+            return
+        first -= self.TWILIGHT_TABLE_PADDING
+        last += self.TWILIGHT_TABLE_PADDING
+        if self.twilight_table is None:
+            self.twilight_table = TwilightTable.compute(self.observer, first, last)
+        else:
+            self.twilight_table = self.twilight_table.extended(first, last)
+        self._save_twilight_table()
+
+    @property
+    def twilight_cache_file(self) -> Path | None:
+        """File the twilight table is kept in, None if there is no `cache_dir`.
+
+        The twilights only depend on the location, the atmosphere (refraction) and the astropy/IERS data
+        so these are hashed in to the file name. Anything else can change without invalidating the file.
+        """
+        if self.cache_dir is None:
+            return None
+        values = np.array([
+            self.TWILIGHT_CACHE_VERSION,
+            self.location.lat.to(u.deg).value,
+            self.location.lon.to(u.deg).value,
+            self.location.height.to(u.m).value,
+            self.observer.pressure.to(u.hPa).value,
+            self.observer.temperature.to(u.deg_C, equivalencies=u.temperature()).value,
+            self.observer.relative_humidity,
+        ], dtype=np.float64)
+        versions = f"{astropy.__version__}/{astropy_iers_data.__version__ if astropy_iers_data else ''}"
+        key = hashlib.sha1(values.tobytes() + versions.encode("utf-8")).hexdigest()
+        return self.cache_dir.joinpath(f"twilight_{key}.npz")
+
+    def _load_twilight_table(self) -> None:
+        """Load the twilight table from `twilight_cache_file`, done once on the first use. Broken files are ignored as they will be rebuilt."""
+        self._twilight_cache_checked = True
+        file_name = self.twilight_cache_file
+        if file_name is None or not file_name.is_file():
+            return
+        try:
+            self.twilight_table = TwilightTable.load(file_name, self.observer)
+        except (OSError, ValueError, KeyError) as err:
+            self.log.warning("Ignoring twilight cache %s: %s", file_name, err)
+
+    def _save_twilight_table(self) -> None:
+        """Save the twilight table to `twilight_cache_file`, if there is one."""
+        file_name = self.twilight_cache_file
+        if file_name is None or self.twilight_table is None:
+            return
+        try:
+            file_name.parent.mkdir(parents=True, exist_ok=True)
+            self.twilight_table.save(file_name)
+        except OSError as err:
+            self.log.warning("Failed to save twilight cache %s: %s", file_name, err)
+
     def get_twilights(self, date1: Time, date2: Time|None = None) -> Tuple[List[Time], List[Time]]:
         """Return all the twilights for a specific date or two.
 
+        The twilights are looked up in `twilight_table` which is extended (see `prepare_twilights`) if the dates are not in it.
+
         Args:
             date1 (Time): Date to use to look for evening twilights. This `Time` is expected to have zero time.
             date2 (Time | None, optional): Date to use to look for morning twilights. Defaults to None meaning that the first date + half a day will be used.
@@ -138,15 +256,13 @@ class Observatory:
         Returns:
             Tuple[List[Time], List[Time]]: A list of evening and morning twilights.
         """
-        d1 = self.zero_time(date1, evening=True)
+        d1 = self._night_mjd(date1)
         if date2 is None:
-            d2 = d1 + 12 * u.hour
+            d2 = d1 + 1
         else:
-            d2 = self.zero_time(date2, evening=False)
-        if d1 == d2:
-            d2 = d1 + 24 * u.hour
-        if d2-d1 > 1 * u.day:
-            d2 = d1 + 24 * u.hour
+            d2 = self._morning_mjd(date2)
+        if d1 == d2 or d2 - d1 > 1:
+            d2 = d1 + 1
         twilight_e = self._get_twilight_e(d1)
         twilight_m = self._get_twilight_m(d2)
         return twilight_e, twilight_m
@@ -171,43 +287,45 @@ class Observatory:
         dz1 = Time(f"{dt1.year}-{dt1.month:02d}-{dt1.day:02d}", scale=d1.scale, location=d1.location, precision=d1.precision)
         return dz1
 
-    def __get_twilight_e(self, date1: Time) -> List[Time]:
-        """Get sunset and the evening twilight times for some date.
+    @staticmethod
+    def _night_mjd(d1: Time) -> int:
+        """MJD of the date `zero_time(d1, evening=True)` would return."""
+        return int(np.floor(d1.mjd - 13.0 / 24.0))
+
+    @staticmethod
+    def _morning_mjd(d2: Time) -> int:
+        """MJD of the date `zero_time(d2, evening=False)` would return."""
+        return int(np.floor(d2.mjd + 12.0 / 24.0))
 
-        This method is here so that it can be caches since getting these times is expensive.
+    def _get_twilight_e(self, night_mjd: int) -> List[Time | None]:
+        """Get sunset and the evening twilight times for some date.
 
         Args:
-            date1 (Time): Date for which twilight times are needed
+            night_mjd (int): MJD of the date for which twilight times are needed
 
         Returns:
-            List[Time]: List with the sunset time and civil, nautical and astronomical twilight end time
+            List[Time | None]: List with the sunset time and civil, nautical and astronomical twilight end time
         """
-        twilight_e = [
-            self.observer.sun_set_time(date1, which='next'),
-            self.observer.twilight_evening_civil(date1, which='next'),
-            self.observer.twilight_evening_nautical(date1, which='next'),
-            self.observer.twilight_evening_astronomical(date1, which='next')
-        ]
-        return [t if t.value.all() else None for t in twilight_e]
-
-    def __get_twilight_m(self, date2: Time) -> List[Time]:
-        """Get sunrise and the morning twilight times for some date.
+        if self.twilight_table is None or not self.twilight_table.covers(night_mjd):
+            self.prepare_twilights(Time(night_mjd + 1, format='mjd'), Time(night_mjd + 1, format='mjd'))
+        return self._as_times(self.twilight_table.evening_jd(night_mjd))
 
-        This method is here so that it can be caches since getting these times is expensive.
+    def _get_twilight_m(self, date_mjd: int) -> List[Time | None]:
+        """Get sunrise and the morning twilight times for some date.
 
         Args:
-            date2 (Time): Date for which twilight times are needed
+            date_mjd (int): MJD of the date for which twilight times are needed
 
         Returns:
-            List[Time]: List with the start of astronomical, nautical and civil times and the sunset time
+            List[Time | None]: List with the start of astronomical, nautical and civil times and the sunset time
         """
-        twilight_m = [
-            self.observer.twilight_morning_astronomical(date2, which='next'),
-            self.observer.twilight_morning_nautical(date2, which='next'),
-            self.observer.twilight_morning_civil(date2, which='next'),
-            self.observer.sun_rise_time(date2, which='next')
-        ]
-        return [t if t.value.all() else None for t in twilight_m]
+        if self.twilight_table is None or not self.twilight_table.covers(date_mjd - 1):
+            self.prepare_twilights(Time(date_mjd, format='mjd'), Time(date_mjd, format='mjd'))
+        return self._as_times(self.twilight_table.morning_jd(date_mjd))
+
+    @staticmethod
+    def _as_times(jds: np.ndarray) -> List[Time | None]:
+        return [Time(jd, format='jd', scale='utc') if np.isfinite(jd) else None for jd in jds]
 
 class Observatories:
     """Collection of observatories and instruments we are interested in."""
@@ -250,7 +368,7 @@ class Observatories:
         observatories: Dict[str, Observatory] = data['observatories']
         self.observatories = {}
         for obs in observatories:
-            self.observatories[obs['name']] = Observatory(obs['name'], obs, self.root_dir)
+            self.observatories[obs['name']] = Observatory(obs['name'], obs, self.root_dir, self.cache_dir)
 
     def __eq__(self, other: Any):
         """Equality for all..."""
@@ -1,8 +1,9 @@
 # -*- coding: UTF-8 -*-
 # cSpell:ignore logg teff exoclock mmag
+import contextlib
 import logging
 import warnings
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Sequence, Tuple
 
 import numpy as np
 
@@ -16,8 +17,13 @@ from astroplan import EclipsingSystem, TargetAlwaysUpWarning, TargetNeverUpWarni
 from kcexo.star import Star
 from kcexo.observatory import Observatory
 from kcexo.transit import Transit
-from kcexo.calc.orbits import transit_t12
+from kcexo.calc.orbits import transit_contact_times
+from kcexo.calc.ephemeris import transit_times, EPHEMERIS_SCALE
+from kcexo.calc.barycentric import transit_light_travel_times
+from kcexo.calc.meridian import meridian_transit_times
+from kcexo.calc.uncertainty import sample_transit_durations, transit_timing_windows
 from kcexo.source.exoclock import exoclock_t_t, exoclock_to_u
+from kcexo.source.derived_cache import DerivedParameterCache
 
 
 class ExoClockStatus():
@@ -87,7 +93,9 @@ class Planet():
                  i_e: u.Quantity["angle"] = 0.0 * u.deg,
                  e_e: float = 0.0,
                  omega_e: u.Quantity["angle"] = 0.0 * u.deg,
-                 status: ExoClockStatus | None = None
+                 status: ExoClockStatus | None = None,
+                 t12: u.Quantity["time"] | None = None,
+                 t14: u.Quantity["time"] | None = None
                  ):
         self.log = logging.getLogger()
         
@@ -111,11 +119,34 @@ class Planet():
         self.omega_e: u.Quantity["angle"] = omega_e
         self.status: ExoClockStatus | None = status
         
-        self.t12: u.Quantity['time']
-        self._calculate_t12()
+        # expensive to calculate so calculated on first use, see `t12`, `t14` and `system_target` properties
+        self._t12: u.Quantity['time'] | None = t12
+        self._t14: u.Quantity['time'] | None = t14
+        self._system_target: EclipsingSystem | None = None
+        self._ephem_mid_time_jd: float | None = None
+        self._derived_cache: DerivedParameterCache | None = None
+        self._derived_cache_key: str = ""
 
-        # NB: this is barycentric!
-        self.system_target: EclipsingSystem = EclipsingSystem(self.ephem_mid_time, self.period, self.duration, self.name, self.e, self.omega.to(u.rad).value)
+    @property
+    def t12(self) -> u.Quantity['time']:
+        """Duration of the ingress (and egress). Orbit is solved on first access."""
+        if self._t12 is None:
+            self._calculate_t12()
+        return self._t12
+
+    @property
+    def t14(self) -> u.Quantity['time']:
+        """Total transit duration from the orbit solution. Orbit is solved on first access."""
+        if self._t14 is None:
+            self._calculate_t12()
+        return self._t14
+
+    @property
+    def system_target(self) -> EclipsingSystem:
+        """`astroplan` representation of the planet which is created on first access. NB: this is barycentric!"""
+        if self._system_target is None:
+            self._system_target = EclipsingSystem(self.ephem_mid_time, self.period, self.duration, self.name, self.e, self.omega.to(u.rad).value)
+        return self._system_target
 
     def __eq__(self, other: "Planet") -> bool:
         """simple equality check"""
@@ -143,8 +174,12 @@ class Planet():
         ])
 
     @staticmethod
-    def from_exoclock_js(obj: Dict[str, Any]) -> "Planet":
-        """Create a planet from exoclock json representation"""
+    def from_exoclock_js(obj: Dict[str, Any], derived_cache: DerivedParameterCache | None = None) -> "Planet":
+        """Create a planet from exoclock json representation.
+        
+        If the `derived_cache` is provided then T12 and T14 are taken from it and only if they
+        are not there will the orbit be solved, when first needed, and the results added to the cache.
+        """
         star_mag = {
             'V': obj['v_mag'],
             'R': obj['r_mag'],
@@ -175,97 +210,232 @@ class Planet():
             total_observations_recent = obj.get('total_observations_recent', 0),
             oc = obj.get('current_oc_min', 0.0) * u.minute,
         )
+        RpRs = obj['rp_over_rs'] * exoclock_to_u(obj['rp_over_rs_units'])  # pylint:disable=invalid-name
+        period = obj['ephem_period'] * exoclock_to_u(obj['ephem_period_units'])
+        aRs = obj['sma_over_rs'] * exoclock_to_u(obj['sma_over_rs_units'])  # pylint:disable=invalid-name
+        i = obj['inclination'] * exoclock_to_u(obj['inclination_units'])
+        e = obj['eccentricity']
+        omega = obj['periastron'] * exoclock_to_u(obj['periastron_units'])
+        t12 = t14 = None
+        cache_key = ""
+        if derived_cache is not None:
+            cache_key = DerivedParameterCache.key(RpRs, period, aRs, e, i, omega)
+            cached = derived_cache.get(cache_key)
+            if cached is not None:
+                t12, t14 = cached
         p = Planet(
             name = obj['name'],
             host_star = s,
             ephem_mid_time = exoclock_t_t(obj['ephem_mid_time'], obj['ephem_mid_time_format']),
             ephem_mid_time_e = obj['ephem_mid_time_e1'] * exoclock_to_u(obj['ephem_mid_time_units']),
-            period = obj['ephem_period'] * exoclock_to_u(obj['ephem_period_units']),
+            period = period,
             period_e = obj['ephem_period_e1'] * exoclock_to_u(obj['ephem_period_units']),
-            RpRs = obj['rp_over_rs'] * exoclock_to_u(obj['rp_over_rs_units']),
+            RpRs = RpRs,
             RpRs_e = obj['rp_over_rs_e1'] * exoclock_to_u(obj['rp_over_rs_units']),
-            aRs = obj['sma_over_rs'] * exoclock_to_u(obj['sma_over_rs_units']),
+            aRs = aRs,
             aRs_e = obj['sma_over_rs_e1'] * exoclock_to_u(obj['sma_over_rs_units']),
-            i = obj['inclination'] * exoclock_to_u(obj['inclination_units']),
+            i = i,
             i_e = obj['inclination_e1'] * exoclock_to_u(obj['inclination_units']),
             depth = obj['depth_r_mmag'] * u.mmag,
             duration = obj['duration_hours'] * u.hour,
-            e = obj['eccentricity'],
+            e = e,
             e_e = obj['eccentricity_e1'],
-            omega = obj['periastron'] * exoclock_to_u(obj['periastron_units']),
+            omega = omega,
             omega_e = obj['periastron_e1'] * exoclock_to_u(obj['periastron_units']),
-            status = ecs
+            status = ecs,
+            t12 = t12,
+            t14 = t14
         )
+        if derived_cache is not None and t12 is None:
+            p._derived_cache = derived_cache  # pylint:disable=protected-access
+            p._derived_cache_key = cache_key  # pylint:disable=protected-access
         return p
 
     def _calculate_t12(self) -> None:
-        """Calculate the time from the beginning of ingress/egress to the end.
+        """Calculate the time from the beginning of ingress/egress to the end and the total transit duration.
         
         We use the same method here like ExoClock do where we solve the orbit for the values.
         This is easiest given that orbits with inclination, eccentricity and omega all make
         calcs rather unpleasant.
         
-        Not for public use as the value will be calculated on instantiation and stored in `t12` attribute 
-        which is easily accessible.
+        Not for public use as the values will be calculated on first access of `t12` or `t14` properties
+        and then kept. If the planet came with a derived parameter cache, the values are added to it too.
 
         """
-        t12 = transit_t12(self.RpRs, self.period, self.aRs, self.e, self.i, self.omega)
-        self.t12 = t12
+        t14, t12, _ = transit_contact_times(self.RpRs, self.period, self.aRs, self.e, self.i, self.omega)
+        self._t14 = t14[0]
+        self._t12 = min(t12[0], 0.5 * t14[0])
+        if self._derived_cache is not None:
+            self._derived_cache.put(self._derived_cache_key, self._t12, self._t14)
+            self._derived_cache = None
+
+    def derived_values(self) -> Tuple[u.Quantity['time'], u.Quantity['time']] | None:
+        """T12 and T14 if they are already known (calculated or from the cache), None otherwise."""
+        if self._t12 is None or self._t14 is None:
+            return None
+        return self._t12, self._t14
+
+    def set_derived_values(self, t12: u.Quantity['time'], t14: u.Quantity['time']) -> None:
+        """Set T12 and T14 that have been calculated elsewhere, e.g. by a copy of this planet in a worker process.
+        They are added to the derived parameter cache like the values calculated here would be."""
+        if self.derived_values() is not None:
+            return
+        self._t12 = t12
+        self._t14 = t14
+        if self._derived_cache is not None:
+            self._derived_cache.put(self._derived_cache_key, self._t12, self._t14)
+            self._derived_cache = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle without the derived parameter cache (it is shared by all the planets) and the `astroplan` target
+        (it is recreated when needed), see `ExoClockData.get_transits` with `workers`."""
+        state = self.__dict__.copy()
+        state['_derived_cache'] = None
+        state['_system_target'] = None
+        return state
+
+    @property
+    def ephem_mid_time_jd(self) -> float:
+        """Reference mid-transit time as a TDB JD, used by the array based transit time calculations."""
+        if self._ephem_mid_time_jd is None:
+            self._ephem_mid_time_jd = getattr(self.ephem_mid_time, EPHEMERIS_SCALE).jd
+        return self._ephem_mid_time_jd
+
+    def get_transit_times(self,
+                          start_time: Time,
+                          end_time: Time,
+                          observatory: Observatory) -> np.ndarray:
+        """Transit times between the specified dates as an array, see `kcexo.calc.ephemeris.transit_times`.
+
+        The times are TDB JDs and they have *not* been adjusted for barycentric coordinates.
+        """
+        return transit_times(np.array([self.ephem_mid_time_jd]), 
+                             np.array([self.period.to(u.day).value]), 
+                             np.array([self.duration.to(u.day).value]),
+                             observatory.exo_hours_before.to(u.day).value,
+                             observatory.exo_hours_after.to(u.day).value,
+                             getattr(start_time, EPHEMERIS_SCALE).jd,
+                             getattr(end_time, EPHEMERIS_SCALE).jd)
 
     def get_transits(self, 
                      start_time: Time,
                      end_time: Time,
                      observatory: Observatory,
-                     night_only: bool = True) -> List[Transit]:
+                     night_only: bool = True,
+                     uncertainty_sigma: float = 0.0,
+                     num_samples: int = 1000,
+                     times: np.ndarray | None = None,
+                     ignore_warnings: bool = True) -> List[Transit]:
         """Return all transits for a specific instrument (and thus observer) between specified dates.
 
-        Note that all the times have been adjusted for barycentric coordinates.
+        Note that all the times have been adjusted for barycentric coordinates (in one go for all the transits).
 
         Args:
             start_time (Time): Start time
             end_time (Time): End time
             instrument (Instrument): Observer and the instrument
             night_only (bool, optional): Filter off anything that starts before sunset or ends after sunrise. Default is True.
+            uncertainty_sigma (float, optional): If positive, the pre-ingress and post-egress times are moved out by the
+                timing uncertainty window of this many sigma (see `timing_windows`) so the night, twilight and horizon
+                checks cover the whole window. Defaults to 0.0 meaning the nominal times are used.
+            num_samples (int, optional): Number of Monte Carlo samples for the timing uncertainty. Defaults to 1000.
+            times (np.ndarray | None, optional): This planet's rows of an already calculated `transit_times` array.
+                Defaults to None meaning that they will be calculated with `get_transit_times`.
+            ignore_warnings (bool, optional): Ignore the `astroplan` target always/never up warnings here. Defaults to True.
+                False leaves the warning filters alone (`warnings.catch_warnings` is not thread safe) so that threads can
+                share filters set once by their caller.
 
         Returns:
             List[Transit]: List of transits
         """
-        duration = (end_time - start_time).to(u.day)
-        num_transits = int(np.ceil(duration / self.period))
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", category=TargetAlwaysUpWarning)
-            warnings.filterwarnings("ignore", category=TargetNeverUpWarning)
-            transits = self.system_target.next_primary_eclipse_time(start_time, num_transits)
-            
-            d: u.Quantity['time'] = self.duration / 2.0
-            ret = []      
-            for mid_time in transits:
-                t0 = mid_time - d - observatory.exo_hours_before
-                t5 = mid_time + d + observatory.exo_hours_after
-                tw_e, tw_m = observatory.get_twilights(t0, t5)  # this is cached so should be fast
-                if t5 <= end_time:
-                    if night_only:
-                        sunset = tw_e[0]
-                        sunrise = tw_m[-1]
-                        if sunset >= t0 or sunrise <= t5:
-                            self.log.debug("Rejecting %s because ss=%s >= t0=%s or sr=%s <= t5={t5.iso}", self.name, sunset.iso, t0.iso, sunrise.iso)
-                            continue
-                        else:
-                            self.log.debug("Including  %s because ss=%s >= t0=%s or sr=%s <= t5={t5.iso}", self.name, sunset.iso, t0.iso, sunrise.iso)
-                    tran = Transit(
-                        pre_ingress = t0,
-                        ingress = mid_time - d,
-                        mid = mid_time,
-                        egress = mid_time + d,
-                        post_egress= t5,
-                        t12=self.t12,
-                        depth=self.depth,
-                        host_star=self.host_star,
-                        observer=observatory
-                    )
-                    ret.append(tran)
+        if times is None:
+            times = self.get_transit_times(start_time, end_time, observatory)
+        if len(times) == 0:
+            return []
+        # all the times at once, converted to the scale of the start time
+        jds = np.stack([times[f] for f in ('pre_ingress', 'ingress', 'mid', 'egress', 'post_egress')], axis=1)
+        all_times = getattr(Time(jds, format='jd', scale=EPHEMERIS_SCALE), start_time.scale)
+        # barycentric correction of all the transits in one go, so `Transit` does not need to do it
+        all_times = all_times - transit_light_travel_times(all_times, self.host_star.c, observatory.location,
+                                                           tolerance=Transit.BARYCENTRIC_TOLERANCE)
+        mids = all_times[:, 2]
+        ingress_e = egress_e = np.zeros((len(times), 1, 2)) * u.min
+        if uncertainty_sigma > 0:
+            ingress_e, egress_e = self.timing_windows(mids, [uncertainty_sigma], num_samples)
+        pre_ingress = all_times[:, 0] + ingress_e[:, 0, 0]
+        post_egress = all_times[:, 4] + egress_e[:, 0, 1]
+        in_window = post_egress <= end_time
+        # meridian crossings of all the transits in one go
+        meridians = meridian_transit_times(self.host_star.c, pre_ingress, observatory.location, 'nearest')
+
+        if night_only:
+            # all the nights' twilights in one batch
+            observatory.prepare_twilights(start_time, end_time)
+        with warnings.catch_warnings() if ignore_warnings else contextlib.nullcontext():
+            if ignore_warnings:
+                warnings.filterwarnings("ignore", category=TargetAlwaysUpWarning)
+                warnings.filterwarnings("ignore", category=TargetNeverUpWarning)
+            ret = []
+            for k in np.nonzero(in_window)[0]:
+                t0 = pre_ingress[k]
+                t5 = post_egress[k]
+                if night_only:
+                    tw_e, tw_m = observatory.get_twilights(t0, t5)  # this is a table lookup so should be fast
+                    sunset = tw_e[0]
+                    sunrise = tw_m[-1]
+                    if sunset >= t0 or sunrise <= t5:
+                        self.log.debug("Rejecting %s because ss=%s >= t0=%s or sr=%s <= t5={t5.iso}", self.name, sunset.iso, t0.iso, sunrise.iso)
+                        continue
+                    else:
+                        self.log.debug("Including  %s because ss=%s >= t0=%s or sr=%s <= t5={t5.iso}", self.name, sunset.iso, t0.iso, sunrise.iso)
+                tran = Transit(
+                    pre_ingress = t0,
+                    ingress = all_times[k, 1],
+                    mid = mids[k],
+                    egress = all_times[k, 3],
+                    post_egress= t5,
+                    t12=self.t12,
+                    depth=self.depth,
+                    host_star=self.host_star,
+                    observer=observatory,
+                    do_not_adjust_for_barycenter=True,
+                    ingress_e=ingress_e[k, 0],
+                    egress_e=egress_e[k, 0],
+                    meridian_crossing=meridians[k]
+                )
+                ret.append(tran)
         return ret
 
+    def timing_windows(self,
+                       mid_times: Time,
+                       sigmas: Sequence[float] = (1.0, 3.0),
+                       num_samples: int = 1000,
+                       seed: int | None = 0) -> Tuple[u.Quantity['time'], u.Quantity['time']]:
+        """Monte Carlo timing uncertainty windows of `t1` and `t4` for the transits at `mid_times`.
+
+        The ephemeris (`ephem_mid_time_e`, `period_e`) and the orbit (`RpRs_e`, `aRs_e`, `i_e`, `e_e`, `omega_e`)
+        uncertainties are sampled, see `kcexo.calc.uncertainty`, so the windows grow with the number of
+        periods from the reference epoch.
+
+        Args:
+            mid_times (Time): Predicted mid-transit times.
+            sigmas (Sequence[float], optional): Window widths in standard deviations. Defaults to (1.0, 3.0).
+            num_samples (int, optional): Number of Monte Carlo samples. Defaults to 1000.
+            seed (int | None, optional): Random seed so that the windows are repeatable. Defaults to 0.
+
+        Returns:
+            Tuple[u.Quantity['time'], u.Quantity['time']]: `t1` and `t4` windows of shape `(len(mid_times), len(sigmas), 2)`
+                holding the (early, late) offsets from the nominal times.
+        """
+        rng = np.random.default_rng(seed)
+        if mid_times.isscalar:
+            mid_times = mid_times.reshape((1,))
+        epochs = np.round(((mid_times - self.ephem_mid_time) / self.period).to(u.dimensionless_unscaled).value)
+        delta_t14 = sample_transit_durations(self.RpRs, self.RpRs_e, self.period, self.aRs, self.aRs_e, self.e, self.e_e,
+                                             self.i, self.i_e, self.omega, self.omega_e, num_samples, rng)
+        t1_w, t4_w = transit_timing_windows(epochs[np.newaxis, :], self.ephem_mid_time_e, self.period_e, delta_t14, sigmas, rng)
+        return (t1_w[0] * u.day).to(u.min), (t4_w[0] * u.day).to(u.min)
+
     def __str__(self):
         s = f"Planet [{self.name} @ {self.host_star.name}"
         s += f" ephem_mid_time={self.ephem_mid_time}"
@@ -0,0 +1,10 @@
+# -*- coding: UTF-8 -*-
+"""A package with observation planning: which transits to observe and when."""
+
+from kcexo.planning.night import PRIORITY_WEIGHTS, NightSchedule, transit_scores, schedule_intervals, schedule_night, night_window
+from kcexo.planning.campaign import CampaignPlan, campaign_scores, night_numbers, plan_campaign
+
+__all__ = [
+    'PRIORITY_WEIGHTS', 'NightSchedule', 'transit_scores', 'schedule_intervals', 'schedule_night', 'night_window',
+    'CampaignPlan', 'campaign_scores', 'night_numbers', 'plan_campaign'
+]
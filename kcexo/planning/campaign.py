@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock heapq
+"""Which transits to observe over many nights, from one or more observatories.
+
+The selection is a lazy greedy: the candidate transits are taken from a heap in order of their score and a transit is
+accepted when it keeps every rule (it does not overlap the transits already chosen at its observatory, its night is
+not full and the planet is not observed again too soon). Every transit of a planet that is chosen makes its other
+transits worth less (coverage has diminishing returns) and, as scores only go down, a popped candidate whose score has
+gone stale is simply pushed back with the new score.
+"""
+import bisect
+import heapq
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import astropy.units as u
+
+from kcexo.transit_table import TransitTable, MultiSiteTransitTable
+from kcexo.planning.night import transit_scores
+
+
+class CampaignPlan(NamedTuple):
+    """Transits chosen by `plan_campaign`."""
+    tables: List[TransitTable]  #: chosen transits of each observatory, in time order
+    scores: List[np.ndarray]  #: score each chosen transit was accepted with, matching `tables`
+    score: float  #: total score
+
+
+def campaign_scores(table: TransitTable,
+                    oc_scale: u.Quantity["time"] = 10 * u.min,
+                    **kwargs) -> np.ndarray:
+    """Score of every transit for a campaign: `transit_scores` times `1 + |O-C| / oc_scale` so that the planets whose
+    transits drift from the ephemeris the most are favoured.
+
+    Args:
+        table (TransitTable): Transits.
+        oc_scale (u.Quantity['time'], optional): O-C that doubles the score. Defaults to 10 minutes.
+        **kwargs: Passed to `transit_scores`.
+
+    Returns:
+        np.ndarray: The scores.
+    """
+    scale = oc_scale.to(u.min).value
+    oc = np.array([abs(p.status.oc.to(u.min).value) if p.status is not None and p.status.oc is not None else 0.0
+                   for p in table.planets])
+    factor = 1.0 + oc / scale if len(oc) > 0 else np.ones(0)
+    return transit_scores(table, **kwargs) * (factor[table.data['planet']] if len(table) > 0 else 1.0)
+
+
+def night_numbers(table: TransitTable) -> np.ndarray:
+    """Night of every transit as the MJD of the date that the night (local noon to local noon) starts on.
+
+    The night is the one that the transit window starts in, the local noon is the mean solar noon at the observatory's
+    longitude, see `kcexo.planning.night_window`.
+    """
+    mjd = table.data['pre_ingress'] - 2400000.5
+    return np.floor(mjd + table.observatory.location.lon.to(u.deg).value / 360.0 - 0.5).astype(int)
+
+
+def plan_campaign(tables: TransitTable | MultiSiteTransitTable | Sequence[TransitTable],
+                  max_per_night: int = 2,
+                  min_days_between: float = 7.0,
+                  repeat_factor: float = 0.5,
+                  gap: u.Quantity["time"] = 0 * u.min,
+                  scores: Sequence[np.ndarray] | None = None) -> CampaignPlan:
+    """Choose the transits to observe over a season.
+
+    Args:
+        tables (TransitTable | MultiSiteTransitTable | Sequence[TransitTable]): Candidate transits (usually already
+            filtered for visibility) of each observatory, the planets are matched between the tables by name.
+        max_per_night (int, optional): Maximum number of transits per night at each observatory. Defaults to 2.
+        min_days_between (float, optional): Minimum number of days between two observations of the same planet (from any
+            observatory). Defaults to 7.
+        repeat_factor (float, optional): Every transit of a planet that is chosen multiplies the score of its other
+            transits by this. Defaults to 0.5.
+        gap (u.Quantity['time'], optional): Minimum time between two transit windows at the same observatory.
+            Defaults to 0.
+        scores (Sequence[np.ndarray] | None, optional): Score of every transit of every table. Defaults to None meaning
+            `campaign_scores`.
+
+    Returns:
+        CampaignPlan: The chosen transits.
+    """
+    if isinstance(tables, TransitTable):
+        tables = [tables]
+    elif isinstance(tables, MultiSiteTransitTable):
+        tables = tables.tables()
+    if scores is None:
+        scores = [campaign_scores(t) for t in tables]
+    gap_d = gap.to(u.day).value
+
+    # all the candidates as columns
+    planet_ids: Dict[str, int] = {}
+    obs_idx, row_idx, planet, start, end, mid, night, base = [], [], [], [], [], [], [], []
+    for n, (table, s) in enumerate(zip(tables, scores)):
+        ids = np.array([planet_ids.setdefault(name, len(planet_ids)) for name in table.names], dtype=int)
+        obs_idx.append(np.full(len(table), n))
+        row_idx.append(np.arange(len(table)))
+        planet.append(ids[table.data['planet']] if len(table) > 0 else np.empty(0, dtype=int))
+        start.append(table.data['pre_ingress'])
+        end.append(table.data['post_egress'])
+        mid.append(table.data['mid'])
+        night.append(night_numbers(table))
+        base.append(np.asarray(s, dtype=float))
+    obs_idx, row_idx, planet, start, end, mid, night, base = [
+        np.concatenate(c) if c else np.empty(0) for c in (obs_idx, row_idx, planet, start, end, mid, night, base)]
+
+    times_chosen: Dict[int, int] = {}  # planet -> number of transits chosen
+    mids_chosen: Dict[int, List[float]] = {}  # planet -> sorted mid times of the chosen transits
+    per_night: Dict[Tuple[int, int], int] = {}  # (observatory, night) -> number of transits chosen
+    windows: List[List[Tuple[float, float]]] = [[] for _ in tables]  # observatory -> chosen windows sorted by start
+    chosen: List[Tuple[int, float]] = []
+
+    heap = [(-base[k], 0, k) for k in range(len(base)) if base[k] > 0.0]
+    heapq.heapify(heap)
+    while heap:
+        neg_score, version, k = heapq.heappop(heap)
+        p = int(planet[k])
+        count = times_chosen.get(p, 0)
+        if version != count:
+            # the planet has been chosen since the score was calculated
+            heapq.heappush(heap, (-base[k] * repeat_factor**count, count, k))
+            continue
+        key = (int(obs_idx[k]), int(night[k]))
+        if per_night.get(key, 0) >= max_per_night:
+            continue
+        # the chosen windows do not overlap so only the neighbours need to be checked
+        site = windows[key[0]]
+        j = bisect.bisect_left(site, (start[k], end[k]))
+        if (j > 0 and site[j - 1][1] + gap_d > start[k]) or (j < len(site) and end[k] + gap_d > site[j][0]):
+            continue
+        mids = mids_chosen.get(p, [])
+        i = bisect.bisect_left(mids, mid[k])
+        if (i > 0 and mid[k] - mids[i - 1] < min_days_between) or (i < len(mids) and mids[i] - mid[k] < min_days_between):
+            continue
+        site.insert(j, (start[k], end[k]))
+        per_night[key] = per_night.get(key, 0) + 1
+        mids.insert(i, mid[k])
+        mids_chosen[p] = mids
+        times_chosen[p] = count + 1
+        chosen.append((k, -neg_score))
+
+    res_tables, res_scores = [], []
+    chosen_k = np.array([k for k, _ in chosen], dtype=int)
+    chosen_s = np.array([s for _, s in chosen])
+    for n, table in enumerate(tables):
+        mine = obs_idx[chosen_k] == n if len(chosen_k) > 0 else np.zeros(0, dtype=bool)
+        rows = row_idx[chosen_k[mine]].astype(int)
+        order = np.argsort(table.data['pre_ingress'][rows], kind='stable')
+        res_tables.append(table[rows[order]])
+        res_scores.append(chosen_s[mine][order])
+    return CampaignPlan(res_tables, res_scores, float(chosen_s.sum()))
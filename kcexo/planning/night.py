@@ -0,0 +1,183 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+"""Best sequence of transits to observe in one night with a single telescope.
+
+Every transit window (pre-ingress to post-egress) is an interval with a score and the best set of non-overlapping
+intervals is found with the classic weighted interval scheduling dynamic programme over the intervals sorted by their
+end times, `O(n log n)`.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+
+from kcexo.observatory import Observatory
+from kcexo.transit_table import TransitTable
+
+
+PRIORITY_WEIGHTS: Dict[str, float] = {
+    'alert': 4.0,
+    'high': 3.0,
+    'medium': 2.0,
+    'low': 1.0
+}  #: score of each ExoClock priority, unknown priorities score as 'low'
+
+
+class NightSchedule(NamedTuple):
+    """A sequence of transits that do not overlap."""
+    rows: np.ndarray  #: rows of the transit table, in time order
+    score: float  #: sum of the scores of the transits
+
+
+def transit_scores(table: TransitTable,
+                   priority_weights: Dict[str, float] | None = None,
+                   recent_weight: float = 1.0,
+                   use_altitude: bool = True) -> np.ndarray:
+    """Score of every transit of a table, higher is better.
+
+    The score is the weight of the planet's ExoClock priority divided by `1 + recent_weight * recent observations`
+    (ExoClock observations in the recent period) and, if `use_altitude`, multiplied by the mean of the sine of the
+    star's altitude at the contact times (ie roughly one over the airmass, 0 below the horizon).
+
+    Args:
+        table (TransitTable): Transits.
+        priority_weights (Dict[str, float] | None, optional): Weight of each priority. Defaults to None meaning `PRIORITY_WEIGHTS`.
+        recent_weight (float, optional): How much the recent observations count against a planet. Defaults to 1.0.
+        use_altitude (bool, optional): Should the altitude be taken in to account? Defaults to True.
+
+    Returns:
+        np.ndarray: The scores.
+    """
+    if priority_weights is None:
+        priority_weights = PRIORITY_WEIGHTS
+    low = priority_weights.get('low', 1.0)
+    planet_weights = np.array([
+        (priority_weights.get(p.status.priority, low) / (1.0 + recent_weight * p.status.ec_observations_recent))
+        if p.status is not None else low
+        for p in table.planets
+    ])
+    scores = planet_weights[table.data['planet']] if len(table.planets) > 0 else np.zeros(len(table))
+    if use_altitude and len(table) > 0:
+        ra = np.array([p.host_star.c.ra.to(u.deg).value for p in table.planets])[table.data['planet']]
+        dec = np.array([p.host_star.c.dec.to(u.deg).value for p in table.planets])[table.data['planet']]
+        alt, _ = table.observatory.altaz_tracks.contact_altaz(SkyCoord(ra=ra * u.deg, dec=dec * u.deg), table.all_times())
+        scores = scores * np.mean(np.clip(np.sin(np.deg2rad(alt)), 0.0, None), axis=1)
+    return scores
+
+
+def _previous_compatible(starts: np.ndarray, ends: np.ndarray, gap: float) -> np.ndarray:
+    """For intervals sorted by their ends, the index of the last interval that ends at least `gap` before each one starts (-1 if none)."""
+    return np.searchsorted(ends, starts - gap, side='right') - 1
+
+
+def _best_schedule(ends: np.ndarray, previous: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Weighted interval scheduling of intervals sorted by their ends, `previous` from `_previous_compatible`.
+
+    Returns:
+        Tuple[np.ndarray, float]: Indices (in the sorted order, ascending) of the chosen intervals and their total score.
+    """
+    n = len(ends)
+    best = np.zeros(n + 1)
+    take = np.zeros(n, dtype=bool)
+    for j in range(n):
+        with_j = scores[j] + best[previous[j] + 1]
+        take[j] = with_j > best[j]
+        best[j + 1] = with_j if take[j] else best[j]
+    chosen = []
+    j = n - 1
+    while j >= 0:
+        if take[j]:
+            chosen.append(j)
+            j = previous[j]
+        else:
+            j -= 1
+    return np.array(chosen[::-1], dtype=int), float(best[n])
+
+
+def schedule_intervals(starts: np.ndarray,
+                       ends: np.ndarray,
+                       scores: np.ndarray,
+                       gap: float = 0.0,
+                       num_alternatives: int = 0) -> List[Tuple[np.ndarray, float]]:
+    """Best set of non-overlapping intervals and the runner-ups.
+
+    The runner-ups are the best schedules without one of the intervals of the best schedule, so they differ from it
+    by at least one interval.
+
+    Args:
+        starts (np.ndarray): Start times of the intervals.
+        ends (np.ndarray): End times of the intervals, in the same units.
+        scores (np.ndarray): Scores of the intervals, intervals that do not score more than 0 are never chosen.
+        gap (float, optional): Minimum time between two chosen intervals. Defaults to 0.
+        num_alternatives (int, optional): Number of runner-ups. Defaults to 0.
+
+    Returns:
+        List[Tuple[np.ndarray, float]]: Indices of the chosen intervals in start order and the total score, best first.
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(ends, kind='stable')
+    sorted_ends = ends[order]
+    previous = _previous_compatible(starts[order], sorted_ends, gap)
+    sorted_scores = scores[order]
+
+    chosen, total = _best_schedule(sorted_ends, previous, sorted_scores)
+    schedules = [(chosen, total)]
+    alternatives: Dict[tuple, Tuple[np.ndarray, float]] = {}
+    for j in chosen if num_alternatives > 0 else []:
+        without = sorted_scores.copy()
+        without[j] = -np.inf
+        alt_chosen, alt_total = _best_schedule(sorted_ends, previous, without)
+        if len(alt_chosen) > 0:
+            alternatives.setdefault(tuple(alt_chosen), (alt_chosen, alt_total))
+    schedules.extend(sorted(alternatives.values(), key=lambda s: -s[1])[:num_alternatives])
+    # back to the caller's indices, in start order
+    res = []
+    for sorted_idx, total in schedules:
+        idx = order[sorted_idx]
+        res.append((idx[np.argsort(starts[idx], kind='stable')], total))
+    return res
+
+
+def schedule_night(table: TransitTable,
+                   num_alternatives: int = 3,
+                   gap: u.Quantity["time"] = 0 * u.min,
+                   scores: np.ndarray | None = None) -> List[NightSchedule]:
+    """Best sequence of transits of a night for a single telescope and the runner-ups.
+
+    Args:
+        table (TransitTable): Candidate transits, usually the filtered transits of one night.
+        num_alternatives (int, optional): Number of runner-up schedules. Defaults to 3.
+        gap (u.Quantity['time'], optional): Minimum time between the end of a window and the start of the next one, e.g. to
+            slew and focus. Defaults to 0.
+        scores (np.ndarray | None, optional): Score of every transit. Defaults to None meaning `transit_scores`.
+
+    Returns:
+        List[NightSchedule]: The best schedule followed by the runner-ups, best first. Empty if there are no transits.
+    """
+    if len(table) == 0:
+        return []
+    if scores is None:
+        scores = transit_scores(table)
+    schedules = schedule_intervals(table.data['pre_ingress'], table.data['post_egress'], scores, gap.to(u.day).value,
+                                   num_alternatives)
+    return [NightSchedule(rows, score) for rows, score in schedules if len(rows) > 0]
+
+
+def night_window(observatory: Observatory, date: Time) -> Tuple[Time, Time]:
+    """The night starting on `date`, from the local (mean solar) noon of the date to the next one.
+
+    Args:
+        observatory (Observatory): Observatory, its longitude sets the local noon.
+        date (Time): Any time on the (UTC) date.
+
+    Returns:
+        Tuple[Time, Time]: Start and end of the night.
+    """
+    midnight = np.floor(date.utc.mjd)
+    noon = midnight + 0.5 - observatory.location.lon.to(u.deg).value / 360.0
+    start = Time(noon, format='mjd', scale='utc')
+    return start, start + 1 * u.day
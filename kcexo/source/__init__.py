@@ -3,7 +3,8 @@
 """Package for all various sources of `data`"""
 
 from kcexo.source.exoclock import ExoClock, exoclock_t_t, exoclock_to_u
+from kcexo.source.derived_cache import DerivedParameterCache
 
 __all__ = [
-    'ExoClock', 'exoclock_t_t', 'exoclock_to_u'
+    'ExoClock', 'exoclock_t_t', 'exoclock_to_u', 'DerivedParameterCache'
 ]
\ No newline at end of file
@@ -0,0 +1,102 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+import hashlib
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, Tuple, Set
+
+import numpy as np
+import astropy.units as u
+
+
+class DerivedParameterCache():
+    """On-disk store of the values derived from the planet orbital parameters.
+    
+    Solving the orbits for T12/T14 is by far the most expensive part of loading the catalogue
+    while the orbital parameters hardly ever change so we keep the results in a pickle file next
+    to the catalogue cache. Entries are keyed by the hash of the orbital parameters so a changed 
+    planet will simply miss the cache and get recalculated.
+    """
+    VERSION: int = 1  #: bump this if the way derived values are calculated changes
+    
+    def __init__(self, file_root: Path, file_stem: str = "derived") -> None:
+        """Initialise the cache and load whatever is already on disk.
+
+        Args:
+            file_root (Path): Directory where the cache file is, usually the same as for the catalogue.
+            file_stem (str, optional): Cache file stem. Defaults to "derived".
+        """
+        self.log = logging.getLogger()
+        
+        self.file: Path = file_root.joinpath(file_stem+".pickle")
+        self.data: Dict[str, Tuple[float, float]] = {}
+        self.used: Set[str] = set()
+        self.dirty: bool = False
+        self.load()
+
+    @staticmethod
+    def key(rp_over_rs: float,
+            period: u.Quantity["time"],
+            sma_over_rs: float,
+            eccentricity: float,
+            inclination: u.Quantity["angle"],
+            periastron: u.Quantity["angle"]) -> str:
+        """Create the cache key from the orbital parameters."""
+        values = np.array([
+            DerivedParameterCache.VERSION,
+            rp_over_rs,
+            period.to(u.day).value,
+            sma_over_rs,
+            eccentricity,
+            inclination.to(u.deg).value,
+            periastron.to(u.deg).value
+        ], dtype=np.float64)
+        return hashlib.sha1(values.tobytes()).hexdigest()
+
+    def get(self, key: str) -> Tuple[u.Quantity["time"], u.Quantity["time"]] | None:
+        """Return (T12, T14) for the key or None if we have not seen it before."""
+        v = self.data.get(key)
+        if v is None:
+            return None
+        self.used.add(key)
+        return v[0] * u.day, v[1] * u.day
+
+    def put(self, key: str, t12: u.Quantity["time"], t14: u.Quantity["time"]) -> None:
+        """Store (T12, T14) for the key."""
+        self.data[key] = (float(t12.to(u.day).value), float(t14.to(u.day).value))
+        self.used.add(key)
+        self.dirty = True
+
+    def reset_usage(self) -> None:
+        """Forget which entries have been used, e.g. before a reloaded catalogue gets its values, so that the next
+        `save` only keeps the entries of the new catalogue."""
+        self.used = set()
+
+    def load(self) -> None:
+        """Load the cache file if there is one. Broken files are ignored as they will be rebuilt."""
+        if not self.file.is_file():
+            return
+        try:
+            with open(self.file, "rb") as f:
+                data = pickle.load(f)
+            if data.get('version') == self.VERSION:
+                self.data = data['data']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError) as err:
+            self.log.warning("Ignoring derived parameter cache %s: %s", self.file, err)
+
+    def save(self, prune: bool = True) -> None:
+        """Save the cache if anything has changed.
+
+        Args:
+            prune (bool, optional): Drop the entries that have not been used since the cache was loaded,
+                ie planets that are no longer in the catalogue or that have changed. Defaults to True.
+        """
+        if prune and self.used != self.data.keys():
+            self.data = {k: v for k, v in self.data.items() if k in self.used}
+            self.dirty = True
+        if not self.dirty:
+            return
+        with open(self.file, "wb") as f:
+            pickle.dump({'version': self.VERSION, 'data': self.data}, f, pickle.HIGHEST_PROTOCOL)
+        self.dirty = False
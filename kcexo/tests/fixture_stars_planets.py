@@ -16,6 +16,8 @@ from astropy.time import Time
 from kcexo.star import Star
 from kcexo.planet import Planet
 from kcexo.observatory import Observatory
+from kcexo.data.exoclock_data import ExoClockData
+from kcexo.source.derived_cache import DerivedParameterCache
 
 
 
@@ -23,7 +25,7 @@ from kcexo.observatory import Observatory
 def obs(shared_datadir):
     with open(shared_datadir / "observatory.yaml", "r", encoding="utf-8") as f:
         obs_js = load(f, Loader=Loader)
-    o = Observatory(obs_js, shared_datadir)
+    o = Observatory(obs_js["name"], obs_js, shared_datadir)
     # o.sources_cache_file_name = shared_datadir / o.sources_cache_file_name
     yield o
     
@@ -643,3 +645,11 @@ exoclock_json = [
 @pytest.fixture
 def all_planets():
     yield [e[0] for e in planets]
+
+@pytest.fixture
+def exoclock_data(tmp_path):
+    # the catalogue is not loaded: only the planets and the derived cache are needed to get and filter the transits
+    exd = ExoClockData.__new__(ExoClockData)
+    exd.data = {p[0].name: p[0] for p in planets}
+    exd.derived_cache = DerivedParameterCache(tmp_path)
+    yield exd
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+# pylint:disable=missing-function-docstring
+import copy
+import time
+
+import pytest
+
+import numpy as np
+
+import astropy.units as u
+
+from kcexo.planet import ExoClockStatus
+from kcexo.transit_table import TransitTable, MultiSiteTransitTable, transit_table_dtype
+from kcexo.planning import plan_campaign, campaign_scores, night_numbers
+
+from .fixture_stars_planets import obs, planets  # pylint:disable=unused-import
+
+
+@pytest.fixture
+def table(obs):  # pylint:disable=redefined-outer-name
+    transits = {}
+    planets_dict = {}
+    for n, (fixture_planet, start_time, end_time, _, _) in enumerate(planets):
+        planet = copy.copy(fixture_planet)
+        planet.status = ExoClockStatus(['high', 'medium', 'low'][n % 3], 10 * u.imperial.inch, 0, n, 0, 0, (5.0 * n) * u.min)
+        transits[planet.name] = planet.get_transits(start_time, end_time, obs, True)
+        planets_dict[planet.name] = planet
+    yield TransitTable.from_transits(transits, planets_dict, obs)
+
+
+def _check_rules(plan, max_per_night, min_days_between):
+    mids = {}
+    for chosen in plan.tables:
+        nights = night_numbers(chosen)
+        assert np.all(np.bincount(nights - nights.min()) <= max_per_night) if len(chosen) else True
+        assert np.all(chosen.data['post_egress'][:-1] <= chosen.data['pre_ingress'][1:])
+        for name, mid in zip(chosen.planet_names(), chosen.data['mid']):
+            mids.setdefault(name, []).append(mid)
+    for planet_mids in mids.values():
+        assert np.all(np.diff(np.sort(planet_mids)) >= min_days_between)
+
+
+def test_campaign_scores(table):  # pylint:disable=redefined-outer-name
+    scores = campaign_scores(table)
+    assert scores.shape == (len(table),)
+    # the O-C of the first planet is 0 so its scores are the same as for a single night
+    first = table.data['planet'] == 0
+    assert scores[first] == pytest.approx(campaign_scores(table, oc_scale=1 * u.s)[first])
+    assert np.all(scores[~first] < campaign_scores(table, oc_scale=1 * u.s)[~first])
+
+
+@pytest.mark.parametrize("max_per_night, min_days_between", [(1, 0.0), (2, 7.0), (5, 3.0)])
+def test_plan_campaign(table, max_per_night, min_days_between):  # pylint:disable=redefined-outer-name
+    plan = plan_campaign(table, max_per_night, min_days_between)
+    assert len(plan.tables) == 1 and len(plan.tables[0]) > 0
+    assert plan.score == pytest.approx(plan.scores[0].sum())
+    _check_rules(plan, max_per_night, min_days_between)
+    # every planet with a candidate is observed at least once
+    assert set(plan.tables[0].visible()) == set(table.visible())
+
+
+def test_plan_campaign_without_limits(table):  # pylint:disable=redefined-outer-name
+    # with no rules (and no repeat penalty) only overlapping transits are left out
+    plan = plan_campaign(table, 100, 0.0, 1.0)
+    chosen = plan.tables[0]
+    left_out = np.setdiff1d(table.data['mid'], chosen.data['mid'])
+    for mid in left_out:
+        row = table.data[table.data['mid'] == mid][0]
+        assert np.any((chosen.data['pre_ingress'] < row['post_egress']) & (row['pre_ingress'] < chosen.data['post_egress']))
+
+
+def test_plan_campaign_observatories(table):  # pylint:disable=redefined-outer-name
+    # the same candidates at two sites: the planet spacing applies across the sites
+    plan = plan_campaign([table, table], 1, 5.0)
+    assert len(plan.tables) == 2
+    _check_rules(plan, 1, 5.0)
+    mids = np.concatenate([t.data['mid'] for t in plan.tables])
+    assert len(np.unique(mids)) == len(mids)
+    # the same from a table of both sites
+    merged = plan_campaign(MultiSiteTransitTable.from_tables([table, table]), 1, 5.0)
+    assert merged.score == pytest.approx(plan.score)
+
+
+def test_plan_campaign_season(table):  # pylint:disable=redefined-outer-name
+    # a season of synthetic candidates: 2000 planets, ~40 transits each, over 180 nights
+    rng = np.random.default_rng(3)
+    num_planets, per_planet = 2000, 40
+    planet_list = [copy.copy(table.planets[n % len(table.planets)]) for n in range(num_planets)]
+    for n, p in enumerate(planet_list):
+        p.name = f"P{n}"
+    data = np.zeros(num_planets * per_planet, dtype=transit_table_dtype)
+    data['planet'] = np.repeat(np.arange(num_planets), per_planet)
+    data['pre_ingress'] = 2460700.0 + rng.uniform(0.0, 180.0, len(data))
+    data['post_egress'] = data['pre_ingress'] + rng.uniform(0.1, 0.3, len(data))
+    data['mid'] = (data['pre_ingress'] + data['post_egress']) / 2.0
+    season = TransitTable(planet_list, table.observatory, data, 'utc')
+    scores = rng.uniform(0.1, 5.0, len(data))
+    t0 = time.time()
+    plan = plan_campaign(season, 3, 10.0, scores=[scores])
+    assert time.time() - t0 < 20.0
+    _check_rules(plan, 3, 10.0)
+    nights = night_numbers(season)
+    assert len(plan.tables[0]) <= (nights.max() - nights.min() + 1) * 3
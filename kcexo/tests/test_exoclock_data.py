@@ -0,0 +1,177 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+# pylint:disable=missing-function-docstring
+import copy
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+from yaml import load, Loader
+
+from kcexo.data.exoclock_data import ExoClockData
+from kcexo.data.transit_cache import TransitCache
+from kcexo.planet import ExoClockStatus
+from kcexo.observatory import Observatories
+from kcexo.transit_table import TransitTable, MultiSiteTransitTable
+from kcexo.calc.ephemeris import EPHEMERIS_SCALE
+
+from .fixture_stars_planets import obs, planets, exoclock_data  # pylint:disable=unused-import
+
+
+@pytest.mark.parametrize("night_only", [False, True])
+def test_get_transits_parallel(exoclock_data, obs, night_only):  # pylint:disable=redefined-outer-name
+    start_time, end_time = planets[0][1], planets[0][2]
+    serial = exoclock_data.get_transits(start_time, end_time, obs, night_only, False)
+    parallel = exoclock_data.get_transits(start_time, end_time, obs, night_only, False, workers=2)
+    assert list(parallel.keys()) == list(serial.keys())
+    for name, transits in serial.items():
+        assert [t.mid.jd for t in parallel[name]] == pytest.approx([t.mid.jd for t in transits], abs=1e-8)
+        assert [t.problem_meridian_crossing for t in parallel[name]] == [t.problem_meridian_crossing for t in transits]
+        assert [t.problem_twilight_nautical for t in parallel[name]] == [t.problem_twilight_nautical for t in transits]
+        # the transits refer to the objects of this process
+        assert all(t.observatory is obs for t in parallel[name])
+
+
+def test_get_transits_executor(exoclock_data, obs):  # pylint:disable=redefined-outer-name
+    start_time, end_time = planets[0][1], planets[0][2]
+    serial = exoclock_data.get_transits(start_time, end_time, obs, True, False, as_table=True)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        parallel = exoclock_data.get_transits(start_time, end_time, obs, True, False, as_table=True, executor=executor)
+    assert isinstance(parallel, TransitTable)
+    assert np.array_equal(parallel.data['planet'], serial.data['planet'])
+    assert parallel.data['mid'] == pytest.approx(serial.data['mid'], abs=1e-8)
+
+
+@pytest.mark.parametrize("filter_args", [None, {'apply_twilight': 'nautical'}])
+def test_get_transits_for_observatories(exoclock_data, shared_datadir, filter_args):  # pylint:disable=redefined-outer-name
+    with open(shared_datadir / "observatories.yaml", "r", encoding="utf-8") as f:
+        observatories = Observatories(load(f, Loader=Loader), shared_datadir)
+    # the smaller telescope of the first observatory misses some of the planets
+    for n, name in enumerate(list(exoclock_data.data)):
+        exoclock_data.data[name] = copy.copy(exoclock_data.data[name])
+        exoclock_data.data[name].status = ExoClockStatus('high', [150, 300][n % 2] * u.mm, 0, 0, 0, 0, 0 * u.min)
+    start_time, end_time = planets[0][1], planets[0][2]
+    merged = exoclock_data.get_transits_for_observatories(start_time, end_time, observatories, True, True, filter_args=filter_args)
+    assert isinstance(merged, MultiSiteTransitTable)
+    assert merged.observatory_names == list(observatories.observatories.keys())
+    assert merged.names == list(exoclock_data.data.keys())
+    assert len(merged) > 0
+    # the same transits as planning every observatory on its own
+    for name, obs_n in observatories.observatories.items():
+        single = exoclock_data.get_transits(start_time, end_time, obs_n, True, True, as_table=True)
+        if filter_args is not None:
+            single, _ = exoclock_data.filter_transits(single, obs_n, **filter_args)
+        site = merged.for_observatory(name)
+        assert site.observatory is obs_n
+        assert len(site.visible()) < len(planets) if obs_n.aperture < 300 * u.mm else True
+        assert list(site.planet_names()) == list(single.planet_names())
+        assert site.data['pre_ingress'] == pytest.approx(single.data['pre_ingress'], abs=1e-8)
+        assert site.data['post_egress'] == pytest.approx(single.data['post_egress'], abs=1e-8)
+        assert np.array_equal(site.data['problem_twilight_nautical'], single.data['problem_twilight_nautical'])
+        assert np.array_equal(site.data['problem_meridian_crossing'], single.data['problem_meridian_crossing'])
+    # the sites can be planned by processes too
+    if filter_args is not None:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            by_processes = exoclock_data.get_transits_for_observatories(start_time, end_time, observatories, True, True,
+                                                                       filter_args=filter_args, executor=executor)
+        assert np.array_equal(by_processes.data['observatory'], merged.data['observatory'])
+        assert np.array_equal(by_processes.data['planet'], merged.data['planet'])
+        assert by_processes.data['mid'] == pytest.approx(merged.data['mid'], abs=1e-8)
+
+
+def test_get_transits_for_observatories_warnings(exoclock_data, obs, monkeypatch):  # pylint:disable=redefined-outer-name
+    # the worker threads must not touch the process wide warning filters
+    threads = []
+    catch_warnings = warnings.catch_warnings
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return catch_warnings(*args, **kwargs)
+    monkeypatch.setattr(warnings, "catch_warnings", spy)
+    filters = list(warnings.filters)
+    start_time, end_time = planets[0][1], planets[0][2]
+    merged = exoclock_data.get_transits_for_observatories(start_time, end_time, [obs, obs], True, False, workers=2)
+    assert len(merged.for_observatory(0)) == len(merged.for_observatory(1)) > 0
+    assert threads and all(t is threading.main_thread() for t in threads)
+    assert warnings.filters == filters
+
+
+def test_transit_cache(exoclock_data, obs, tmp_path, monkeypatch):  # pylint:disable=redefined-outer-name
+    start_time, end_time = planets[0][1], planets[0][2]
+    cache = TransitCache(tmp_path)
+    cached = cache.get_transits(exoclock_data, start_time, end_time, obs, True, False)
+    direct = exoclock_data.get_transits(start_time, end_time, obs, True, False, as_table=True)
+    assert np.array_equal(cached.data['planet'], direct.data['planet'])
+    assert cached.data['mid'] == pytest.approx(direct.data['mid'], abs=1e-8)
+    assert cached.data['post_egress'] == pytest.approx(direct.data['post_egress'], abs=1e-8)
+    cache.save()
+
+    # sliding the window by a day only searches the new days
+    calls = []
+    get_transits = ExoClockData.get_transits
+    def spy(self, start, end, *args, **kwargs):
+        calls.append((start, end))
+        return get_transits(self, start, end, *args, **kwargs)
+    monkeypatch.setattr(ExoClockData, "get_transits", spy)
+    shifted = cache.get_transits(exoclock_data, start_time + 1 * u.day, end_time + 1 * u.day, obs, True, False)
+    assert len(calls) == 1
+    assert (calls[0][1] - calls[0][0]).to(u.day).value <= 2 + TransitCache.MARGIN_DAYS
+    expected = get_transits(exoclock_data, start_time + 1 * u.day, end_time + 1 * u.day, obs, True, False, as_table=True)
+    assert shifted.data['mid'] == pytest.approx(expected.data['mid'], abs=1e-8)
+
+    # a new session gets the original window from the file
+    calls.clear()
+    again = TransitCache(tmp_path).get_transits(exoclock_data, start_time, end_time, obs, True, False)
+    assert not calls
+    assert again.data['mid'] == pytest.approx(direct.data['mid'], abs=1e-8)
+
+
+def test_transit_cache_window_end(exoclock_data, obs, tmp_path):  # pylint:disable=redefined-outer-name
+    # the window ends between the adjusted and the ephemeris post-egress times of a transit of HAT-P-20b
+    planet = exoclock_data.data['HAT-P-20b']
+    start_time, end_time = planets[0][1], planets[0][2]
+    transits = exoclock_data.get_transits(start_time, end_time, obs, False, False, as_table=True, names=[planet.name])
+    last = transits.data[-1]
+    ephemeris_post_egress = (TransitCache._ephemeris_mid(planet, last['mid']) + 0.5 * planet.duration.to(u.day).value  # pylint:disable=protected-access
+                             + obs.exo_hours_after.to(u.day).value)
+    assert last['post_egress'] < ephemeris_post_egress
+    window_end = Time(0.5 * (last['post_egress'] + ephemeris_post_egress), format='jd', scale=EPHEMERIS_SCALE).utc
+    direct = exoclock_data.get_transits(start_time, window_end, obs, False, False, as_table=True)
+    cached = TransitCache(tmp_path).get_transits(exoclock_data, start_time, window_end, obs, False, False)
+    assert len(cached) == len(direct)
+    assert cached.data['mid'] == pytest.approx(direct.data['mid'], abs=1e-8)
+
+
+def test_transit_cache_drop_days(exoclock_data, obs, tmp_path):  # pylint:disable=redefined-outer-name
+    start_time, end_time = planets[0][1], planets[0][2]
+    cache = TransitCache(tmp_path)
+    cache.get_transits(exoclock_data, start_time, end_time, obs, False, False)
+    # an observatory setting that is only used in the past
+    cache.get_transits(exoclock_data, start_time - 5 * u.day, start_time - 3 * u.day, obs, True, False)
+    cache.save()
+    assert len(cache.data) == 2
+
+    later = start_time + 2 * u.day
+    first = int(np.floor(getattr(later, EPHEMERIS_SCALE).jd))
+    cache.drop_days_before(later)
+    assert cache.dirty
+    assert len(cache.data) == 1
+    for entries in cache.data.values():
+        for searched, rows, row_days in entries.values():
+            assert min(searched) >= first
+            assert len(rows) == len(row_days) and np.all(row_days >= first)
+    cache.save()
+
+    # the days that are left give the same transits as a search from scratch without searching again
+    again = TransitCache(tmp_path)
+    assert again.data.keys() == cache.data.keys()
+    kept = again.get_transits(exoclock_data, later, end_time, obs, False, False)
+    assert not again.dirty
+    direct = exoclock_data.get_transits(later, end_time, obs, False, False, as_table=True)
+    assert np.array_equal(kept.data['planet'], direct.data['planet'])
+    assert kept.data['mid'] == pytest.approx(direct.data['mid'], abs=1e-8)
@@ -0,0 +1,52 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore altaz interp astroplan
+# pylint:disable=missing-function-docstring
+import pytest
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+from astroplan import FixedTarget
+
+from kcexo.constraint import HorizonConstraint
+
+from .fixture_stars_planets import obs  # pylint:disable=unused-import
+
+
+HORIZON = [(10.0, 25.0), (95.0, 12.5), (181.3, 40.0), (270.0, 5.0), (330.0, 18.0)]
+
+
+def test_horizon_altitude():
+    hc = HorizonConstraint(HORIZON)
+    az = np.linspace(-30.0, 400.0, 5001)
+    # the table is exact at the grid points and linear in between, so it only misses the corners of the horizon
+    max_slope = 35.0 / 86.3
+    assert hc.horizon_altitude(az) == pytest.approx(hc.az_interp(np.mod(az, 360.0)), abs=max_slope * hc.resolution)
+    assert hc.horizon_altitude(np.array([10.0, 95.0, 270.0])) == pytest.approx([25.0, 12.5, 5.0])
+    assert hc.horizon_altitude(0.0) == pytest.approx(hc.horizon_altitude(360.0))
+    assert hc.horizon_altitude(np.zeros((3, 4))).shape == (3, 4)
+
+
+@pytest.mark.parametrize("boolean_constraint", [True, False])
+def test_compute_constraint(obs, boolean_constraint):  # pylint:disable=redefined-outer-name
+    hc = HorizonConstraint(obs.horizon, boolean_constraint=boolean_constraint, az_interpolator=obs.horizon_interpolator)
+    targets = [FixedTarget(SkyCoord(ra * u.deg, dec * u.deg)) for ra, dec in [(10.0, 20.0), (200.0, 60.0), (300.0, -10.0)]]
+    times = Time("2024-03-01 18:00:00") + np.linspace(0.0, 1.0, 97) * u.day
+    res = hc(obs.observer, targets, times=times, grid_times_targets=True)
+    assert res.shape == (len(targets), len(times))
+
+    altaz = obs.observer.altaz(times, targets, grid_times_targets=True)
+    alt = altaz.alt.degree
+    horizon = hc.az_interp(altaz.az.degree.ravel()).reshape(alt.shape)
+    # away from the horizon the table gives the same results as the interpolator
+    clear = np.abs(alt - horizon) > 0.1
+    if boolean_constraint:
+        assert res.dtype == bool
+        assert np.all(res[clear] == (horizon < alt)[clear])
+        assert np.any(res) and not np.all(res)
+    else:
+        expected = np.where(alt < horizon, 0.0, (alt - hc.min_val) / (90.0 - hc.min_val))
+        assert res[clear] == pytest.approx(expected[clear])
+        assert np.all(res >= 0.0) and np.all(res <= 1.0)
@@ -0,0 +1,93 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+# pylint:disable=missing-function-docstring
+import copy
+import itertools
+
+import pytest
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+
+from kcexo.planet import ExoClockStatus
+from kcexo.transit_table import TransitTable
+from kcexo.planning import schedule_intervals, schedule_night, transit_scores, night_window
+
+from .fixture_stars_planets import obs, planets  # pylint:disable=unused-import
+
+
+def _brute_force(starts, ends, scores, gap):
+    best = 0.0
+    for k in range(1, len(starts) + 1):
+        for subset in itertools.combinations(range(len(starts)), k):
+            s = sorted(subset, key=lambda i: starts[i])
+            if all(ends[a] + gap <= starts[b] for a, b in zip(s[:-1], s[1:])):
+                best = max(best, sum(scores[i] for i in s))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("gap", [0.0, 0.5])
+def test_schedule_intervals(seed, gap):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0.0, 10.0, 10)
+    ends = starts + rng.uniform(0.5, 3.0, 10)
+    scores = rng.uniform(0.0, 5.0, 10)
+    schedules = schedule_intervals(starts, ends, scores, gap, num_alternatives=3)
+    rows, total = schedules[0]
+    assert total == pytest.approx(_brute_force(starts, ends, scores, gap))
+    assert total == pytest.approx(scores[rows].sum())
+    assert np.all(np.diff(starts[rows]) > 0)
+    assert np.all(ends[rows][:-1] + gap <= starts[rows][1:])
+    # the runner-ups are valid, different and not better
+    assert 1 < len(schedules) <= 4
+    seen = {tuple(rows)}
+    for alt_rows, alt_total in schedules[1:]:
+        assert alt_total <= total + 1e-12
+        assert alt_total == pytest.approx(scores[alt_rows].sum())
+        assert np.all(ends[alt_rows][:-1] + gap <= starts[alt_rows][1:])
+        assert tuple(alt_rows) not in seen
+        seen.add(tuple(alt_rows))
+    assert [s[1] for s in schedules[1:]] == sorted([s[1] for s in schedules[1:]], reverse=True)
+
+
+def test_schedule_intervals_no_score():
+    schedules = schedule_intervals(np.array([0.0, 1.0]), np.array([1.0, 2.0]), np.array([0.0, 0.0]))
+    assert len(schedules[0][0]) == 0
+    assert schedule_intervals(np.empty(0), np.empty(0), np.empty(0))[0][1] == 0.0
+
+
+def test_schedule_night(obs):  # pylint:disable=redefined-outer-name
+    transits = {}
+    planets_dict = {}
+    for n, (fixture_planet, start_time, end_time, _, _) in enumerate(planets):
+        planet = copy.copy(fixture_planet)
+        planet.status = ExoClockStatus(['high', 'medium', 'low'][n % 3], 10 * u.imperial.inch, 0, n, 0, 0, 0 * u.min)
+        transits[planet.name] = planet.get_transits(start_time, end_time, obs, False)
+        planets_dict[planet.name] = planet
+    table = TransitTable.from_transits(transits, planets_dict, obs)
+    # a couple of busy days
+    table = table.filter(table.data['pre_ingress'] < table.data['pre_ingress'].min() + 3.0)
+    scores = transit_scores(table)
+    assert scores.shape == (len(table),)
+    assert np.all(scores >= 0.0)
+    assert np.all(transit_scores(table, use_altitude=False) >= scores)
+
+    schedules = schedule_night(table, num_alternatives=2, gap=10 * u.min)
+    best = schedules[0]
+    assert best.score == pytest.approx(scores[best.rows].sum())
+    chosen = table[best.rows]
+    assert np.all(chosen.data['post_egress'][:-1] + 10 / 1440 <= chosen.data['pre_ingress'][1:] + 1e-9)
+    assert all(s.score <= best.score + 1e-12 for s in schedules[1:])
+    assert schedule_night(table.filter(np.zeros(len(table), dtype=bool))) == []
+
+
+def test_night_window(obs):  # pylint:disable=redefined-outer-name
+    start, end = night_window(obs, Time("2025-03-10 00:00:00"))
+    assert (end - start).to(u.hour).value == pytest.approx(24.0)
+    # local noon, give or take the equation of time
+    solar_hours = (start.utc.mjd % 1.0) * 24.0 + obs.location.lon.to(u.deg).value / 15.0
+    assert solar_hours % 24.0 == pytest.approx(12.0)
+    assert abs(start.mjd - Time("2025-03-10 12:00:00").mjd) < 0.5
@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+# pylint:disable=missing-function-docstring
+import warnings
+
+import pytest
+
+import numpy as np
+
+from yaml import load
+try:
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Loader
+
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import SkyCoord
+
+from kcexo.observatory import Observatory
+from kcexo.calc.twilight import TwilightTable
+from kcexo.calc.util import equal_times
+
+from .fixture_stars_planets import obs  # pylint:disable=unused-import
+
+
+@pytest.mark.parametrize("pre_ingress, post_egress", [
+    ("2024-01-10 19:30:00", "2024-01-11 00:30:00"),
+    ("2024-03-05 00:30:00", "2024-03-05 04:00:00"),
+    ("2024-06-21 21:00:00", "2024-06-22 01:00:00"),
+])
+def test_get_twilights(pre_ingress, post_egress, obs):  # pylint:disable=redefined-outer-name
+    t0 = Time(pre_ingress, scale='utc')
+    t5 = Time(post_egress, scale='utc')
+    twilight_e, twilight_m = obs.get_twilights(t0, t5)
+    d1 = obs.zero_time(t0, evening=True)
+    d2 = obs.zero_time(t5, evening=False)
+    observer = obs.observer
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected_e = [observer.sun_set_time(d1, which='next', n_grid_points=1000),
+                      observer.twilight_evening_civil(d1, which='next', n_grid_points=1000),
+                      observer.twilight_evening_nautical(d1, which='next', n_grid_points=1000),
+                      observer.twilight_evening_astronomical(d1, which='next', n_grid_points=1000)]
+        expected_m = [observer.twilight_morning_astronomical(d2, which='next', n_grid_points=1000),
+                      observer.twilight_morning_nautical(d2, which='next', n_grid_points=1000),
+                      observer.twilight_morning_civil(d2, which='next', n_grid_points=1000),
+                      observer.sun_rise_time(d2, which='next', n_grid_points=1000)]
+    for res, expected in zip(twilight_e + twilight_m, expected_e + expected_m):
+        if res is None:
+            assert not expected.value.all()
+        else:
+            assert equal_times(res, expected, 10 * u.s)
+    assert obs.twilight_table.covers(obs._night_mjd(t0))  # pylint:disable=protected-access
+
+
+def test_prepare_twilights(obs):  # pylint:disable=redefined-outer-name
+    obs.prepare_twilights(Time("2024-01-01"), Time("2024-03-01"))
+    table = obs.twilight_table
+    # already covered so nothing changes
+    obs.prepare_twilights(Time("2024-01-15"), Time("2024-02-15"))
+    assert obs.twilight_table is table
+    obs.prepare_twilights(Time("2024-01-15"), Time("2024-04-15"))
+    assert obs.twilight_table.mjd0 == table.mjd0
+    assert obs.twilight_table.num_nights > table.num_nights
+
+
+def test_twilight_cache(shared_datadir, tmp_path, monkeypatch):
+    with open(shared_datadir / "observatory.yaml", "r", encoding="utf-8") as f:
+        obs_js = load(f, Loader=Loader)
+    cold = Observatory(obs_js["name"], obs_js, shared_datadir, tmp_path)
+    cold.prepare_twilights(Time("2024-01-01"), Time("2024-02-01"))
+    assert cold.twilight_cache_file.is_file()
+
+    # a new session finds the table on disk and does not calculate anything
+    def fail(*args, **kwargs):
+        raise AssertionError("twilights should have come from the cache")
+    monkeypatch.setattr(TwilightTable, "compute", fail)
+    warm = Observatory(obs_js["name"], obs_js, shared_datadir, tmp_path)
+    assert warm.twilight_cache_file == cold.twilight_cache_file
+    twilight_e, twilight_m = warm.get_twilights(Time("2024-01-10 22:00:00"), Time("2024-01-11 02:00:00"))
+    expected_e, expected_m = cold.get_twilights(Time("2024-01-10 22:00:00"), Time("2024-01-11 02:00:00"))
+    assert [t.jd for t in twilight_e + twilight_m] == [t.jd for t in expected_e + expected_m]
+
+    # a different location has a different cache
+    obs_js["physical"]["lat_deg"] += 1.0
+    assert Observatory(obs_js["name"], obs_js, shared_datadir, tmp_path).twilight_cache_file != cold.twilight_cache_file
+
+
+def test_altaz_precision(shared_datadir):
+    with open(shared_datadir / "observatory.yaml", "r", encoding="utf-8") as f:
+        obs_js = load(f, Loader=Loader)
+    exact = Observatory(obs_js["name"], obs_js, shared_datadir)
+    assert exact.altaz_precision == 'exact'
+    obs_js['configuration']['altaz_precision'] = 'fast'
+    fast = Observatory(obs_js["name"], obs_js, shared_datadir)
+    assert fast != exact
+    coords = SkyCoord("07:27:39.9487 +24:20:11.518", unit=(u.hourangle, u.deg))
+    times = Time("2024-01-10 19:30:00") + np.linspace(0.0, 0.5, 10) * u.day
+    alt, az = exact.altaz(coords, times)
+    fast_alt, fast_az = fast.altaz(coords, times)
+    assert fast_alt == pytest.approx(alt, abs=0.05)
+    assert fast_az == pytest.approx(az, abs=0.1)
+    obs_js['configuration']['altaz_precision'] = 'rough'
+    with pytest.raises(ValueError):
+        Observatory(obs_js["name"], obs_js, shared_datadir)
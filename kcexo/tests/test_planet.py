@@ -4,6 +4,8 @@
 import copy
 import pytest
 
+import numpy as np
+
 import astropy.units as u
 from astropy.time import Time
 from astropy.units import imperial
@@ -11,6 +13,7 @@ from astropy.coordinates import SkyCoord
 
 from kcexo.star import Star
 from kcexo.planet import ExoClockStatus, Planet
+from kcexo.source.derived_cache import DerivedParameterCache
 
 from .fixture_stars_planets import obs, all_planets, exoclock_json  # pylint:disable=unused-import
 
@@ -175,4 +178,70 @@ def test_creation_from_json(all_planets, exo_json):  # pylint:disable=redefined-
             found = True
     assert found
 
-    
\ No newline at end of file
+    
+
+@pytest.mark.parametrize("exo_json", exoclock_json)
+def test_creation_from_json_with_derived_cache(tmp_path, exo_json):
+    p = Planet.from_exoclock_js(exo_json)
+    cache = DerivedParameterCache(tmp_path)
+    p1 = Planet.from_exoclock_js(exo_json, cache)
+    assert p1.t12 == p.t12
+    assert p1.t14 == p.t14
+    assert cache.dirty
+    cache.save()
+    assert (tmp_path / "derived.pickle").is_file()
+    
+    # new cache from the same file will have the values so no orbit solving is needed
+    cache2 = DerivedParameterCache(tmp_path)
+    key = DerivedParameterCache.key(p.RpRs, p.period, p.aRs, p.e, p.i, p.omega)
+    assert key in cache2.data
+    cache2.data[key] = (1.0, 2.0)
+    p2 = Planet.from_exoclock_js(exo_json, cache2)
+    assert p2.t12 == 1.0 * u.day
+    assert p2.t14 == 2.0 * u.day
+    assert not cache2.dirty
+
+    # a reused cache only keeps the entries of the planets loaded after the usage was reset
+    cache2.put("stale", 1.0 * u.day, 2.0 * u.day)
+    cache2.reset_usage()
+    Planet.from_exoclock_js(exo_json, cache2)
+    cache2.save()
+    assert set(cache2.data.keys()) == {key}
+    assert set(DerivedParameterCache(tmp_path).data.keys()) == {key}
+
+
+@pytest.mark.parametrize("exo_json", exoclock_json)
+def test_lazy_attributes(exo_json):
+    p = Planet.from_exoclock_js(exo_json)
+    assert p._t12 is None  # pylint:disable=protected-access
+    assert p._system_target is None  # pylint:disable=protected-access
+    t12 = p.t12
+    assert p._t12 is t12  # pylint:disable=protected-access
+    assert p.t12 is t12
+    system_target = p.system_target
+    assert p.system_target is system_target
+    assert system_target.period == p.period
+
+
+@pytest.mark.parametrize("exo_json", exoclock_json)
+def test_timing_windows(exo_json, obs):  # pylint:disable=redefined-outer-name
+    p = Planet.from_exoclock_js(exo_json)
+    mid_times = p.ephem_mid_time + [10, 200] * p.period
+    t1_w, t4_w = p.timing_windows(mid_times, (1.0, 3.0), 500)
+    assert t1_w.shape == (2, 2, 2)
+    assert np.all(t1_w[:, :, 0] <= 0 * u.min) and np.all(t1_w[:, :, 1] >= 0 * u.min)
+    assert np.all(t4_w[:, 1, 1] >= t4_w[:, 0, 1])
+    # repeatable
+    t1_w2, _ = p.timing_windows(mid_times, (1.0, 3.0), 500)
+    assert np.all(t1_w == t1_w2)
+
+    start = p.ephem_mid_time + 200 * p.period
+    nominal = p.get_transits(start, start + 10 * u.day, obs, False)
+    widened = p.get_transits(start, start + 10 * u.day, obs, False, 3.0, 500)
+    assert len(nominal) == len(widened)
+    for tn, tw in zip(nominal, widened):
+        assert tw.mid == tn.mid
+        assert tw.pre_ingress <= tn.pre_ingress
+        assert tw.post_egress >= tn.post_egress
+        assert tw.ingress_e[0] <= 0 * u.min <= tw.egress_e[1]
+        assert np.all(tn.ingress_e == 0 * u.min)
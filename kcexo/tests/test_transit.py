@@ -77,3 +77,12 @@ def test_transit_t12345_as_list(planet, start_time, end_time, expected_transits,
         assert tl[5] == t.post_egress
         assert tl[1] <= tl[2] <= tl[3]
         assert tl[2] <= tl[3] <= tl[4]
+
+
+@pytest.mark.parametrize("star, transit_times, t12, mf_time, has_problems", stars[:1])
+def test_transit_barycentric_adjustment(star, transit_times, t12, mf_time, has_problems, obs):  # pylint:disable=redefined-outer-name,unused-argument
+    tran = Transit(transit_times[0], transit_times[1], transit_times[2], transit_times[3], transit_times[4],
+                   t12, 10, star, obs)
+    for t, t_in in zip(tran.as_list(), transit_times):
+        expected = t_in - t_in.light_travel_time(star.c, kind='barycentric', location=obs.location)
+        assert equal_times(t, expected, Transit.BARYCENTRIC_TOLERANCE)
@@ -0,0 +1,131 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore exoclock
+# pylint:disable=missing-function-docstring
+import pytest
+
+import numpy as np
+
+import astropy.units as u
+from astroplan import is_event_observable, AltitudeConstraint
+
+from kcexo.transit_table import TransitTable, MultiSiteTransitTable, transit_table_dtype
+from kcexo.calc.util import equal_times
+
+from .fixture_stars_planets import obs, planets, exoclock_data  # pylint:disable=unused-import
+
+
+@pytest.fixture
+def transits(obs):  # pylint:disable=redefined-outer-name
+    res = {}
+    for planet, start_time, end_time, _, _ in planets:
+        res[planet.name] = planet.get_transits(start_time, end_time, obs, False)
+    yield res
+
+
+def test_from_transits(transits, obs):  # pylint:disable=redefined-outer-name
+    table = TransitTable.from_transits(transits, {p[0].name: p[0] for p in planets}, obs)
+    assert len(table) == sum(len(t) for t in transits.values())
+    assert table.names == list(transits.keys())
+    as_dict = table.to_dict()
+    assert list(as_dict.keys()) == list(transits.keys())
+    for name, planet_transits in transits.items():
+        assert len(as_dict[name]) == len(planet_transits)
+        for t1, t2 in zip(planet_transits, as_dict[name]):
+            for e1, e2 in zip(t1.as_list() + [t1.meridian_crossing], t2.as_list() + [t2.meridian_crossing]):
+                assert equal_times(e1, e2, 1 * u.ms)
+            assert t1.problem_meridian_crossing == t2.problem_meridian_crossing
+            assert t1.problem_twilight_civil == t2.problem_twilight_civil
+            assert t1.twilight_e == t2.twilight_e
+            assert t1.t12.to(u.day).value == pytest.approx(t2.t12.to(u.day).value)
+            assert t2.mid.scale == t1.mid.scale
+
+
+def test_sort_and_slice(transits, obs):  # pylint:disable=redefined-outer-name
+    table = TransitTable.from_transits(transits, {p[0].name: p[0] for p in planets}, obs)
+    by_time = table.sort('pre_ingress')
+    assert np.all(np.diff(by_time.data['pre_ingress']) >= 0)
+    assert isinstance(by_time[:2], TransitTable) and len(by_time[:2]) == 2
+    assert equal_times(by_time[0].pre_ingress, by_time.times('pre_ingress')[0], 1 * u.ms)
+    name = table.names[1]
+    single = table.for_planets([name])
+    assert single.visible() == [name]
+    assert len(single) == len(transits[name])
+    assert len(table.filter(np.zeros(len(table), dtype=bool))) == 0
+
+
+def test_twilight_mask(obs):  # pylint:disable=redefined-outer-name
+    # no twilight, civil, nautical and astronomical twilight
+    data = np.zeros(4, dtype=transit_table_dtype)
+    data['problem_twilight_civil'][1] = True
+    data['problem_twilight_nautical'][2] = True
+    data['problem_twilight_astronomical'][3] = True
+    table = TransitTable([], obs, data)
+    assert list(table.twilight_mask('all')) == [True, True, True, True]
+    assert list(table.twilight_mask('civil')) == [True, True, True, True]
+    assert list(table.twilight_mask('nautical')) == [True, True, False, True]
+    assert list(table.twilight_mask('astronomical')) == [True, True, True, False]
+    assert list(table.twilight_mask('none')) == [True, False, False, False]
+    with pytest.raises(ValueError):
+        table.twilight_mask('dusk')
+
+
+@pytest.mark.parametrize("apply_twilight", ['all', 'nautical', 'none'])
+@pytest.mark.parametrize("allow_flip", [False, True])
+def test_filter_transits(transits, obs, exoclock_data, apply_twilight, allow_flip):  # pylint:disable=redefined-outer-name
+    table = TransitTable.from_transits(transits, exoclock_data.data, obs)
+    expected, expected_visible = exoclock_data.filter_transits(transits, obs, False, apply_twilight, allow_flip, allow_flip)
+    filtered, visible = exoclock_data.filter_transits(table, obs, False, apply_twilight, allow_flip, allow_flip)
+    assert isinstance(filtered, TransitTable)
+    assert visible == expected_visible
+    result = filtered.to_dict()
+    for name, planet_transits in expected.items():
+        assert [t.mid.jd for t in result[name]] == pytest.approx([t.mid.jd for t in planet_transits], abs=1e-8)
+
+
+@pytest.mark.parametrize("apply_horizon", [False, True])
+def test_filter_transits_against_astroplan(transits, obs, exoclock_data, apply_horizon):  # pylint:disable=redefined-outer-name
+    constraint = obs.horizon_constraint if apply_horizon else AltitudeConstraint(20*u.deg)
+    filtered, visible = exoclock_data.filter_transits(transits, obs, apply_horizon, 'all')
+    for name, planet_transits in transits.items():
+        target = exoclock_data.data[name].host_star.target
+        expected = [t for t in planet_transits if np.all(is_event_observable(constraint, obs.observer, target, t.as_list()))]
+        # the very same transit objects, not copies
+        assert [id(t) for t in filtered[name]] == [id(t) for t in expected]
+        assert (name in visible) == bool(expected)
+
+
+def test_filter_transits_reuses_tracks(transits, obs, exoclock_data):  # pylint:disable=redefined-outer-name
+    table = TransitTable.from_transits(transits, exoclock_data.data, obs)
+    filtered, _ = exoclock_data.filter_transits(table, obs, True, 'all')
+    misses = obs.altaz_tracks.misses
+    assert misses == len(table)
+    # toggling the horizon only applies a different constraint to the same tracks
+    exoclock_data.filter_transits(table, obs, False, 'all')
+    assert obs.altaz_tracks.misses == misses
+    # and the plots of the filtered transits find their tracks too
+    for k in range(len(filtered)):
+        transit = filtered[k]
+        obs.altaz_tracks.track(transit.host_star.c, transit.as_list())
+    assert obs.altaz_tracks.misses == misses
+
+
+def test_multi_site(transits, obs):  # pylint:disable=redefined-outer-name
+    table = TransitTable.from_transits(transits, {p[0].name: p[0] for p in planets}, obs)
+    reversed_planets = table.for_planets(table.names[::-1][:2])
+    reversed_planets.planets = reversed_planets.planets[::-1]
+    reversed_planets.data = reversed_planets.data.copy()
+    reversed_planets.data['planet'] = len(reversed_planets.planets) - 1 - reversed_planets.data['planet']
+    merged = MultiSiteTransitTable.from_tables([table, reversed_planets])
+    assert len(merged) == len(table) + len(reversed_planets)
+    assert merged.names == table.names
+    assert list(merged.site_names()) == [obs.name] * len(merged)
+    # every observatory gets its own rows back, with the planets matched by name
+    for n, site_table in enumerate([table, reversed_planets]):
+        site = merged.for_observatory(n)
+        assert site.observatory is obs
+        assert list(site.planet_names()) == list(site_table.planet_names())
+        assert np.array_equal(site.data['mid'], site_table.data['mid'])
+    assert [len(t) for t in merged.tables()] == [len(table), len(reversed_planets)]
+    by_time = merged.sort()
+    assert np.all(np.diff(by_time.data['pre_ingress']) >= 0)
+    assert len(merged.filter(merged.data['observatory'] == 1)) == len(reversed_planets)
@@ -7,12 +7,15 @@ from astropy.time import Time
 
 from kcexo.star import Star
 from kcexo.observatory import Observatory
+from kcexo.calc.barycentric import transit_light_travel_times
+from kcexo.calc.meridian import meridian_transit_times, meridian_crossing_flags
 
 
 class Transit():
     """Representation of a transit"""
     
     TRANSIT_MARGIN: u.Quantity["time"] = 10 * u.min
+    BARYCENTRIC_TOLERANCE: u.Quantity["time"] | None = 1 * u.s  #: see `kcexo.calc.barycentric.transit_light_travel_times`
     
     def __init__(self,
                  pre_ingress: Time,
@@ -24,7 +27,10 @@ class Transit():
                  depth: u.Quantity,
                  host_star: Star,
                  observer: Observatory,
-                 do_not_adjust_for_barycenter: bool = False) -> None:
+                 do_not_adjust_for_barycenter: bool = False,
+                 ingress_e: u.Quantity["time"] | None = None,
+                 egress_e: u.Quantity["time"] | None = None,
+                 meridian_crossing: Time | None = None) -> None:
         """Initialisation of the transit object.
 
         Args:
@@ -38,6 +44,12 @@ class Transit():
             host_star (Star): Star which the transiting planet orbits
             observer (Observatory): Observatory/Instrument
             do_not_adjust_for_barycenter (bool, optional): Should we *not* adjust of the barycentric times? Defaults to False meaning that we will adjust.
+            ingress_e (u.Quantity['time'] | None, optional): Timing uncertainty window of `t1` as (early, late) offsets from `ingress`. 
+                Defaults to None meaning no uncertainty.
+            egress_e (u.Quantity['time'] | None, optional): Timing uncertainty window of `t4` as (early, late) offsets from `egress`.
+                Defaults to None meaning no uncertainty.
+            meridian_crossing (Time | None, optional): Meridian crossing nearest to `pre_ingress` if it has already been
+                calculated, see `kcexo.calc.meridian.meridian_transit_times`. Defaults to None meaning that it will be calculated.
         """
         self.log = logging.getLogger()
 
@@ -59,49 +71,97 @@ class Transit():
         self.t12: u.Quantity["time"] = t12
         self.depth: u.Quantity = depth
         self.observatory: Observatory = observer
+        self.ingress_e: u.Quantity["time"] = ingress_e if ingress_e is not None else [0.0, 0.0] * u.min
+        self.egress_e: u.Quantity["time"] = egress_e if egress_e is not None else [0.0, 0.0] * u.min
         
         if not do_not_adjust_for_barycenter:
             self._adjust_for_barycenter()
         
-        self._set_meridian()
+        self._set_meridian(meridian_crossing)
         self._set_twilight()      
 
+    @classmethod
+    def from_precomputed(cls,
+                         times: List[Time],
+                         t12: u.Quantity["time"],
+                         depth: u.Quantity,
+                         host_star: Star,
+                         observer: Observatory,
+                         meridian_crossing: Time,
+                         has_meridian_crossing: bool,
+                         problem_meridian_crossing: bool,
+                         problem_twilight_astronomical: bool,
+                         problem_twilight_nautical: bool,
+                         problem_twilight_civil: bool,
+                         ingress_e: u.Quantity["time"] | None = None,
+                         egress_e: u.Quantity["time"] | None = None) -> "Transit":
+        """Create a transit from already calculated values, eg. a row of a `TransitTable`, without repeating the 
+        barycentric, meridian and twilight calculations. Only the twilight times are looked up (they are cached by the observatory).
+
+        Args:
+            times (List[Time]): Pre-ingress, ingress, mid, egress and post-egress times, already adjusted for barycentric coordinates.
+            meridian_crossing (Time): Meridian crossing nearest to the pre-ingress time.
+            has_meridian_crossing (bool): See `_set_meridian`.
+            problem_meridian_crossing (bool): See `_set_meridian`.
+            problem_twilight_astronomical (bool): See `_set_twilight`.
+            problem_twilight_nautical (bool): See `_set_twilight`.
+            problem_twilight_civil (bool): See `_set_twilight`.
+            The rest are the same as for `__init__`.
+
+        Returns:
+            Transit: The transit.
+        """
+        tran = cls.__new__(cls)
+        tran.log = logging.getLogger()
+        tran.host_star = host_star
+        tran.pre_ingress, tran.ingress, tran.mid, tran.egress, tran.post_egress = times
+        tran.t12 = t12
+        tran.depth = depth
+        tran.observatory = observer
+        tran.ingress_e = ingress_e if ingress_e is not None else [0.0, 0.0] * u.min
+        tran.egress_e = egress_e if egress_e is not None else [0.0, 0.0] * u.min
+        tran.meridian_crossing = meridian_crossing
+        tran.has_meridian_crossing = bool(has_meridian_crossing)
+        tran.problem_meridian_crossing = bool(problem_meridian_crossing)
+        tran.twilight_e, tran.twilight_m = observer.get_twilights(tran.pre_ingress, tran.post_egress)
+        tran.problem_twilight_astronomical = bool(problem_twilight_astronomical)
+        tran.problem_twilight_nautical = bool(problem_twilight_nautical)
+        tran.problem_twilight_civil = bool(problem_twilight_civil)
+        return tran
+
     def _adjust_for_barycenter(self) -> None:
         """Transit times we get from `astroplan` are not adjusted for the time it takes 
         light to travel from the barycentre to the observer so this functions adjusts for that.
 
+        The correction is calculated once, at the mid time, unless that would be out by more than `BARYCENTRIC_TOLERANCE`.
         """
-        self.pre_ingress       -= self.pre_ingress.light_travel_time(self.host_star.c, kind='barycentric', location=self.observatory.location)
-        self.ingress           -= self.ingress.light_travel_time(self.host_star.c, kind='barycentric', location=self.observatory.location)
-        self.mid               -= self.mid.light_travel_time(self.host_star.c, kind='barycentric', location=self.observatory.location)
-        self.egress            -= self.egress.light_travel_time(self.host_star.c, kind='barycentric', location=self.observatory.location)
-        self.post_egress       -= self.post_egress.light_travel_time(self.host_star.c, kind='barycentric', location=self.observatory.location)
+        times = Time(self.as_list()).reshape(1, 5)
+        ltt = transit_light_travel_times(times, self.host_star.c, self.observatory.location, tolerance=self.BARYCENTRIC_TOLERANCE)[0]
+        self.pre_ingress       -= ltt[0]
+        self.ingress           -= ltt[1]
+        self.mid               -= ltt[2]
+        self.egress            -= ltt[3]
+        self.post_egress       -= ltt[4]
 
-    def _set_meridian(self) -> None:
+    def _set_meridian(self, meridian_crossing: Time | None = None) -> None:
         """If the meridian flip will take place between t1 and t2 or between t3 and t4 then we have a problem.
         
         We also need to take in to account the fact that flips take time so we cannot have a flip execution to fall between t12 or t34. We also
         can't flip at t2 or t4 so we add (arbitrary) 10min margin as we need to make sure that the transit data is there for the detections to
         be possible.
         """
-        self.meridian_crossing = self.observatory.observer.target_meridian_transit_time(self.pre_ingress, self.host_star.target, 'nearest', n_grid_points=10)
-        
-        # if meridian flip will happen get a more accurate value
-        if (self.pre_ingress - self.TRANSIT_MARGIN) <= self.meridian_crossing <= (self.post_egress + self.TRANSIT_MARGIN):
-            self.meridian_crossing = self.observatory.observer.target_meridian_transit_time(self.pre_ingress, self.host_star.target, 'nearest', n_grid_points=300)
-        
-        t1 = self.ingress
-        t2 = t1 + self.t12.to(u.hour)
-        t3 = self.egress - self.t12.to(u.hour)
-        t4 = self.egress
-        
-        t1_wm = t1 - self.observatory.meridian_crossing_duration - self.TRANSIT_MARGIN
-        t2_wm = t2 + self.TRANSIT_MARGIN
-        t3_wm = t3 - self.observatory.meridian_crossing_duration - self.TRANSIT_MARGIN
-        t4_wm = t4 + self.TRANSIT_MARGIN
+        if meridian_crossing is None:
+            meridian_crossing = meridian_transit_times(self.host_star.c, self.pre_ingress, self.observatory.location, 'nearest')
+        self.meridian_crossing = meridian_crossing
         
-        self.has_meridian_crossing = (t1_wm <= self.meridian_crossing <= t4_wm)  # pylint:disable=superfluous-parens
-        self.problem_meridian_crossing = (t1_wm <= self.meridian_crossing <= t2_wm) or (t3_wm <= self.meridian_crossing <= t4_wm)
+        has_crossing, problem = meridian_crossing_flags(self.meridian_crossing.utc.jd,
+                                                        self.ingress.utc.jd,
+                                                        self.egress.utc.jd,
+                                                        self.t12.to(u.day).value,
+                                                        self.observatory.meridian_crossing_duration.to(u.day).value,
+                                                        self.TRANSIT_MARGIN.to(u.day).value)
+        self.has_meridian_crossing = bool(has_crossing)
+        self.problem_meridian_crossing = bool(problem)
 
     def _set_twilight(self) -> None:
         """Save when twilights are and also if they are going to be a problem."""
@@ -0,0 +1,352 @@
+# -*- coding: UTF-8 -*-
+# cSpell:ignore kcexo ndarray lexsort
+import logging
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+import astropy.units as u
+from astropy.time import Time
+
+from kcexo.planet import Planet
+from kcexo.observatory import Observatory
+from kcexo.transit import Transit
+from kcexo.calc.ephemeris import EPHEMERIS_SCALE
+
+
+TIME_FIELDS: Tuple[str, ...] = ('pre_ingress', 'ingress', 'mid', 'egress', 'post_egress')  #: contact time columns, in the `Transit.as_list` order
+
+transit_table_dtype = np.dtype([
+    ('planet', 'i8'),
+    ('pre_ingress', 'f8'),
+    ('ingress', 'f8'),
+    ('mid', 'f8'),
+    ('egress', 'f8'),
+    ('post_egress', 'f8'),
+    ('t12', 'f8'),
+    ('depth', 'f8'),
+    ('meridian_crossing', 'f8'),
+    ('has_meridian_crossing', '?'),
+    ('problem_meridian_crossing', '?'),
+    ('problem_twilight_astronomical', '?'),
+    ('problem_twilight_nautical', '?'),
+    ('problem_twilight_civil', '?'),
+    ('ingress_e', 'f8', (2,)),
+    ('egress_e', 'f8', (2,)),
+])  #: columns of a `TransitTable`: times are JDs in `EPHEMERIS_SCALE`, `t12` in days, `depth` in mmag and `ingress_e`/`egress_e` in minutes
+
+multi_site_transit_table_dtype = np.dtype([('observatory', 'i8')] + transit_table_dtype.descr)  #: columns of a `MultiSiteTransitTable`
+
+
+class TransitTable():
+    """Transits of many planets for one observatory stored as NumPy columns (a structure of arrays).
+
+    Filtering, sorting and slicing are array operations and return new tables that share the planet list. `Transit`
+    objects are only created when they are asked for, e.g. for plotting, see `transit`, `__iter__` and `items`.
+    """
+
+    def __init__(self,
+                 planets: List[Planet],
+                 observatory: Observatory,
+                 data: np.ndarray | None = None,
+                 scale: str = 'utc') -> None:
+        """Initialisation of the table.
+
+        Args:
+            planets (List[Planet]): Planets, the `planet` column indexes this list.
+            observatory (Observatory): Observatory the transits are for.
+            data (np.ndarray | None, optional): Structured array with `transit_table_dtype` fields. Defaults to None meaning an empty table.
+            scale (str, optional): Time scale of the `Time` objects created from the table. Defaults to 'utc'.
+        """
+        self.log = logging.getLogger()
+        self.planets: List[Planet] = planets
+        self.observatory: Observatory = observatory
+        self.data: np.ndarray = data if data is not None else np.empty(0, dtype=transit_table_dtype)
+        self.scale: str = scale
+
+    @classmethod
+    def from_transits(cls,
+                      transits: Dict[str, List[Transit]],
+                      planets: Dict[str, Planet],
+                      observatory: Observatory) -> "TransitTable":
+        """Create a table from a map of planet name to transits, as returned by `ExoClockData.get_transits`.
+
+        Args:
+            transits (Dict[str, List[Transit]]): Transits of each planet.
+            planets (Dict[str, Planet]): All the planets, by name.
+            observatory (Observatory): Observatory the transits are for.
+
+        Returns:
+            TransitTable: The table, with the planets in the order of `transits`.
+        """
+        names = list(transits.keys())
+        flat = [(n, t) for n, name in enumerate(names) for t in transits[name]]
+        table = cls([planets[name] for name in names], observatory)
+        if not flat:
+            return table
+        data = np.empty(len(flat), dtype=transit_table_dtype)
+        data['planet'] = [n for n, _ in flat]
+        # one conversion for all the times
+        times = getattr(Time([e for _, t in flat for e in t.as_list() + [t.meridian_crossing]]), EPHEMERIS_SCALE).jd.reshape(len(flat), 6)
+        for k, field in enumerate(TIME_FIELDS + ('meridian_crossing',)):
+            data[field] = times[:, k]
+        data['t12'] = [t.t12.to(u.day).value for _, t in flat]
+        data['depth'] = [t.depth.to(u.mmag).value for _, t in flat]
+        for field in ('has_meridian_crossing', 'problem_meridian_crossing', 'problem_twilight_astronomical',
+                      'problem_twilight_nautical', 'problem_twilight_civil'):
+            data[field] = [getattr(t, field) for _, t in flat]
+        data['ingress_e'] = [t.ingress_e.to(u.min).value for _, t in flat]
+        data['egress_e'] = [t.egress_e.to(u.min).value for _, t in flat]
+        table.data = data
+        table.scale = flat[0][1].mid.scale
+        return table
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the planets, indexed by the `planet` column."""
+        return [p.name for p in self.planets]
+
+    def _view(self, data: np.ndarray) -> "TransitTable":
+        return TransitTable(self.planets, self.observatory, data, self.scale)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key):
+        """An integer gives a `Transit`, anything else NumPy can index with (slices, masks, indices) gives a `TransitTable`."""
+        if isinstance(key, (int, np.integer)):
+            return self.transit(int(key))
+        return self._view(self.data[key])
+
+    def __iter__(self) -> Iterator[Transit]:
+        for k in range(len(self)):
+            yield self.transit(k)
+
+    def times(self, field: str) -> Time:
+        """Column of times as a `Time` array, `field` is one of `TIME_FIELDS` or 'meridian_crossing'."""
+        return getattr(Time(self.data[field], format='jd', scale=EPHEMERIS_SCALE), self.scale)
+
+    def all_times(self) -> Time:
+        """All the contact times as a `(N, 5)` `Time` array, in the `Transit.as_list` order."""
+        jds = np.stack([self.data[f] for f in TIME_FIELDS], axis=1)
+        return getattr(Time(jds, format='jd', scale=EPHEMERIS_SCALE), self.scale)
+
+    def planet_names(self) -> np.ndarray:
+        """Planet name of every row."""
+        return np.array(self.names, dtype=object)[self.data['planet']]
+
+    def filter(self, mask: np.ndarray) -> "TransitTable":
+        """Rows where `mask` is True."""
+        return self._view(self.data[np.asarray(mask, dtype=bool)])
+
+    def sort(self, by: str | Sequence[str] = 'pre_ingress') -> "TransitTable":
+        """Rows sorted by one or more columns, the first column is the primary key."""
+        if isinstance(by, str):
+            by = [by]
+        order = np.lexsort([self.data[f] for f in reversed(by)])
+        return self._view(self.data[order])
+
+    def for_planets(self, names: Sequence[str]) -> "TransitTable":
+        """Rows of the named planets only."""
+        lookup = {name: n for n, name in enumerate(self.names)}
+        return self.filter(np.isin(self.data['planet'], [lookup[name] for name in names]))
+
+    def visible(self) -> List[str]:
+        """Names of the planets with at least one transit, in the planet order."""
+        present = np.unique(self.data['planet'])
+        return [self.planets[n].name for n in present]
+
+    def twilight_mask(self, apply_twilight: str) -> np.ndarray:
+        """Rows that satisfy the twilight constraint, see `ExoClockData.filter_transits`.
+
+        Args:
+            apply_twilight (str): Which twilight is acceptable, one of 'astronomical', 'nautical', 'civil', 'none' or
+                'all'. E.g. 'nautical' accepts the nautical and astronomical twilights but not the civil one, 'none'
+                accepts none of the twilights and 'all' does not care if it is day or night. 'civil' accepts every
+                transit like 'all' as the day and night are filtered elsewhere.
+
+        Returns:
+            np.ndarray: Mask of the rows.
+
+        Raises:
+            ValueError: If the twilight is not one of 'astronomical', 'nautical', 'civil', 'none' or 'all'.
+        """
+        if apply_twilight in ['all', 'civil']:
+            return np.ones(len(self), dtype=bool)
+        if apply_twilight == 'astronomical':
+            return ~self.data['problem_twilight_astronomical']
+        if apply_twilight == 'nautical':
+            return ~self.data['problem_twilight_nautical']
+        if apply_twilight == 'none':
+            return ~self.data['problem_twilight_civil'] & ~self.data['problem_twilight_nautical'] & ~self.data['problem_twilight_astronomical']
+        raise ValueError(f"Unknown twilight constraint: {apply_twilight}")
+
+    def meridian_mask(self,
+                      include_meridian_flip: bool = True,
+                      include_problem_meridian_flip: bool = True) -> np.ndarray:
+        """Rows that satisfy the meridian flip constraints, see `ExoClockData.filter_transits`."""
+        mask = np.ones(len(self), dtype=bool)
+        if not include_meridian_flip:
+            mask &= ~self.data['has_meridian_crossing']
+        if not include_problem_meridian_flip:
+            mask &= ~self.data['problem_meridian_crossing']
+        return mask
+
+    def transit(self, k: int) -> Transit:
+        """Create the `Transit` object of row `k`."""
+        row = self.data[k]
+        planet = self.planets[row['planet']]
+        jds = [row[f] for f in TIME_FIELDS] + [row['meridian_crossing']]
+        times = getattr(Time(jds, format='jd', scale=EPHEMERIS_SCALE), self.scale)
+        return Transit.from_precomputed(
+            list(times[:5]),
+            row['t12'] * u.day,
+            row['depth'] * u.mmag,
+            planet.host_star,
+            self.observatory,
+            times[5],
+            row['has_meridian_crossing'],
+            row['problem_meridian_crossing'],
+            row['problem_twilight_astronomical'],
+            row['problem_twilight_nautical'],
+            row['problem_twilight_civil'],
+            row['ingress_e'] * u.min,
+            row['egress_e'] * u.min
+        )
+
+    def items(self) -> Iterator[Tuple[str, List[Transit]]]:
+        """Planet name and its transits, only for the planets with transits, so that the table can be used
+        in place of a `Dict[str, List[Transit]]`. The transits are created one planet at a time."""
+        for n in np.unique(self.data['planet']):
+            rows = np.nonzero(self.data['planet'] == n)[0]
+            yield self.planets[n].name, [self.transit(k) for k in rows]
+
+    def to_dict(self) -> Dict[str, List[Transit]]:
+        """Map from planet name to its transits for every planet of the table, including the ones without transits."""
+        res: Dict[str, List[Transit]] = {p.name: [] for p in self.planets}
+        res.update(self.items())
+        return res
+
+    def __str__(self):
+        return f"TransitTable [{self.observatory.name} {len(self)} transits of {len(self.visible())}/{len(self.planets)} planets]"
+
+    def __repr__(self):
+        return str(self)
+
+
+class MultiSiteTransitTable():
+    """Transits of many planets for many observatories in one table, the `observatory` column indexes `observatories`
+    and the other columns are the ones of `TransitTable`.
+
+    The transits of one observatory are a `TransitTable`, see `for_observatory` and `tables`.
+    """
+
+    def __init__(self,
+                 planets: List[Planet],
+                 observatories: List[Observatory],
+                 data: np.ndarray | None = None,
+                 scale: str = 'utc') -> None:
+        """Initialisation of the table.
+
+        Args:
+            planets (List[Planet]): Planets, the `planet` column indexes this list.
+            observatories (List[Observatory]): Observatories, the `observatory` column indexes this list.
+            data (np.ndarray | None, optional): Structured array with `multi_site_transit_table_dtype` fields. Defaults to None meaning an empty table.
+            scale (str, optional): Time scale of the `Time` objects created from the table. Defaults to 'utc'.
+        """
+        self.log = logging.getLogger()
+        self.planets: List[Planet] = planets
+        self.observatories: List[Observatory] = observatories
+        self.data: np.ndarray = data if data is not None else np.empty(0, dtype=multi_site_transit_table_dtype)
+        self.scale: str = scale
+
+    @classmethod
+    def from_tables(cls,
+                    tables: Sequence[TransitTable],
+                    planets: List[Planet] | None = None) -> "MultiSiteTransitTable":
+        """Merge the tables of several observatories, the rows of every table keep their order.
+
+        Args:
+            tables (Sequence[TransitTable]): Transits of each observatory.
+            planets (List[Planet] | None, optional): Planets of the merged table, it must include all the planets of the
+                tables (matched by name). Defaults to None meaning the planets of the tables in the order they are first seen.
+
+        Returns:
+            MultiSiteTransitTable: The table.
+        """
+        if planets is None:
+            seen: Dict[str, Planet] = {}
+            for table in tables:
+                for p in table.planets:
+                    seen.setdefault(p.name, p)
+            planets = list(seen.values())
+        lookup = {p.name: n for n, p in enumerate(planets)}
+        data = np.empty(sum(len(t) for t in tables), dtype=multi_site_transit_table_dtype)
+        start = 0
+        for n, table in enumerate(tables):
+            rows = data[start:start + len(table)]
+            for field in transit_table_dtype.names:
+                rows[field] = table.data[field]
+            rows['planet'] = np.array([lookup[name] for name in table.names], dtype=int)[table.data['planet']] if len(table) > 0 else []
+            rows['observatory'] = n
+            start += len(table)
+        scales = [t.scale for t in tables if len(t) > 0]
+        return cls(planets, [t.observatory for t in tables], data, scales[0] if scales else 'utc')
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the planets, indexed by the `planet` column."""
+        return [p.name for p in self.planets]
+
+    @property
+    def observatory_names(self) -> List[str]:
+        """Names of the observatories, indexed by the `observatory` column."""
+        return [o.name for o in self.observatories]
+
+    def _view(self, data: np.ndarray) -> "MultiSiteTransitTable":
+        return MultiSiteTransitTable(self.planets, self.observatories, data, self.scale)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key) -> "MultiSiteTransitTable":
+        """Anything NumPy can index with (slices, masks, indices) gives a `MultiSiteTransitTable`."""
+        return self._view(self.data[key])
+
+    def planet_names(self) -> np.ndarray:
+        """Planet name of every row."""
+        return np.array(self.names, dtype=object)[self.data['planet']]
+
+    def site_names(self) -> np.ndarray:
+        """Observatory name of every row."""
+        return np.array(self.observatory_names, dtype=object)[self.data['observatory']]
+
+    def filter(self, mask: np.ndarray) -> "MultiSiteTransitTable":
+        """Rows where `mask` is True."""
+        return self._view(self.data[np.asarray(mask, dtype=bool)])
+
+    def sort(self, by: str | Sequence[str] = 'pre_ingress') -> "MultiSiteTransitTable":
+        """Rows sorted by one or more columns, the first column is the primary key."""
+        if isinstance(by, str):
+            by = [by]
+        order = np.lexsort([self.data[f] for f in reversed(by)])
+        return self._view(self.data[order])
+
+    def for_observatory(self, observatory: str | int) -> TransitTable:
+        """Transits of one observatory, given by its name or index, as a `TransitTable` sharing the planet list."""
+        n = self.observatory_names.index(observatory) if isinstance(observatory, str) else observatory
+        rows = self.data[self.data['observatory'] == n]
+        data = np.empty(len(rows), dtype=transit_table_dtype)
+        for field in transit_table_dtype.names:
+            data[field] = rows[field]
+        return TransitTable(self.planets, self.observatories[n], data, self.scale)
+
+    def tables(self) -> List[TransitTable]:
+        """Transits of every observatory, in the observatory order, e.g. for `kcexo.planning.plan_campaign`."""
+        return [self.for_observatory(n) for n in range(len(self.observatories))]
+
+    def __str__(self):
+        return f"MultiSiteTransitTable [{len(self.observatories)} observatories {len(self)} transits of {len(self.planets)} planets]"
+
+    def __repr__(self):
+        return str(self)
@@ -181,10 +181,14 @@ class MainFrame(wx.Frame):
         self.Close()
     
     def on_menu_refresh(self, event: wx.Event):
-        """Reload database."""
+        """Reload database.
+        
+        The already loaded derived parameter cache is reused so only new or changed planets need their orbits solved.
+        """
         with wx.BusyCursor():
             self.update_status_bar("Loading exoclock planet and star data...")
-            self.exoclock_db: ExoClockData = ExoClockData(self.observatories.root_dir)
+            derived_cache = self.exoclock_db.derived_cache if self.exoclock_db else None
+            self.exoclock_db: ExoClockData = ExoClockData(self.observatories.root_dir, derived_cache=derived_cache)
             self.tab_main_pane_mt.set_db(self.exoclock_db)
             self.tab_main_pane_st.set_db(self.exoclock_db)
             self.tab_main_pane_sd.set_db(self.exoclock_db)
@@ -3,7 +3,7 @@
 # pylint:disable=unused-argument, invalid-name
 import logging
 from functools import partial
-from typing import List, Dict, Any, Tuple
+from typing import List, Any, Tuple
 
 import numpy as np
 import matplotlib
@@ -17,12 +17,14 @@ from astropy.time import Time
 import wx
 
 from kcexo.transit import Transit
+from kcexo.transit_table import TransitTable
 from kcexo.planet import Planet
 from kcexo.observatory import Observatory
 from kcexo.data.exoclock_data import ExoClockData
+from kcexo.data.transit_cache import TransitCache
 from kcexo.viz.transit import create_sky_transit, create_transit_horizon_plot, create_transit_schematic
 from kcexo.viz.render import render_to_png, close_figure
-from kcexo.ui.widgets.sortable_grid import SortableGrid, GridData, col_fmt_str, PlotCellRenderer, col_fmt_length_as_f, col_fmt_quantity_as_f, col_fmt_datetime
+from kcexo.ui.widgets.sortable_grid import SortableGrid, GridData, col_fmt_str, PlotCellRenderer, col_fmt_length_as_f, col_fmt_quantity_as_f, col_fmt_datetime, col_fmt_float
 from kcexo.ui.planner.transit_form import TransitForm, EVT_SUB_FORM
 from kcexo.ui.planner.utils import prevent_tab_changes, update_status
 
@@ -54,8 +56,10 @@ class MultipleTargetsPanel(wx.Panel):
         self._start_date: Time = Time.now()
         self._end_date: Time = Time.now()
         self.must_refresh: bool = True
-        self.transits: Dict[str, Transit]
-        self.filtered_transits: Dict[str, Transit]
+        # only the days that have not been searched before are calculated when the dates change
+        self.transit_cache: TransitCache = TransitCache(observatory.cache_dir if observatory else None)
+        self.transits: TransitTable
+        self.filtered_transits: TransitTable
         self.visible: List[str] = []
         
         super().__init__(parent=parent, id=wid, pos=pos, size=size, name=name, *argv, **kwargs)
@@ -113,6 +117,8 @@ class MultipleTargetsPanel(wx.Panel):
             return
         
         self.obs = obs
+        if self.transit_cache.file is None and obs.cache_dir is not None:
+            self.transit_cache = TransitCache(obs.cache_dir)
         self.lbl_title.SetLabel(f"{self.TITLE} - {self.obs.name}")
         self._start_date = None
         self._end_date = None
@@ -149,11 +155,14 @@ class MultipleTargetsPanel(wx.Panel):
                 self._start_date = start_date
                 self._end_date = end_date
                 with update_status("Searching for transits..."):
-                    self.transits = self.db.get_transits(start_date, end_date, self.obs, True, True)
+                    self.transits = self.transit_cache.get_transits(self.db, start_date, end_date, self.obs, True, True)
+                    # the days before the search are not needed again, this keeps the cache file from growing every day
+                    self.transit_cache.drop_days_before(start_date)
+                    self.transit_cache.save(prune=False)
                 
             with update_status("Filtering transits..."):
                 if target_name:
-                    self.filtered_transits, self.visible = self.db.filter_transits({target_name: self.transits[target_name]}, self.obs, use_horizon, twilight.lower(), allow_flip, allow_flip)
+                    self.filtered_transits, self.visible = self.db.filter_transits(self.transits.for_planets([target_name]), self.obs, use_horizon, twilight.lower(), allow_flip, allow_flip)
                 else:
                     self.filtered_transits, self.visible = self.db.filter_transits(self.transits, self.obs, use_horizon, twilight.lower(), allow_flip, allow_flip)
                 self.update_grid()
@@ -163,11 +172,13 @@ class MultipleTargetsPanel(wx.Panel):
         self.log.debug("STP - update_grid")
         with prevent_tab_changes("Updating All Targets transit list..."):
         
-            col_names = ["Target", "Priority", "# Obs", "# Recent", 'Min Aper (")', "Mag R", "Mag V", "Depth R", "Duration (hr)", "Pre", "Start", "End", "Post", "GRAPH_Transit Profile", "GRAPH_Horizon Transit", "GRAPH_Sky Transit"]
-            col_width = [20*5, 13*5, 18*5, 18*5, 18*5, 12*5, 12*5, 12*5, 17*5, 13*5, 13*5, 13*5, 13*5, 200, 200, 200]
+            col_names = ["Target", "Priority", "# Obs", "# Recent", 'Min Aper (")', "Mag R", "Mag V", "Depth R", "Exp (s)", "Sat (s)", "Duration (hr)", "Pre", "Start", "End", "Post", "GRAPH_Transit Profile", "GRAPH_Horizon Transit", "GRAPH_Sky Transit"]
+            col_width = [20*5, 13*5, 18*5, 18*5, 18*5, 12*5, 12*5, 12*5, 12*5, 12*5, 17*5, 13*5, 13*5, 13*5, 13*5, 200, 200, 200]
             datetime_renderer = partial(col_fmt_datetime, utc_offset_hours=self.utc_offset_hours)
-            col_formatting = [col_fmt_str, col_fmt_str, col_fmt_str, col_fmt_str, partial(col_fmt_length_as_f,target_unit=u.imperial.inch), col_fmt_str, col_fmt_str, col_fmt_quantity_as_f, col_fmt_quantity_as_f, datetime_renderer, datetime_renderer, datetime_renderer, datetime_renderer, PlotCellRenderer, PlotCellRenderer, PlotCellRenderer]
+            exp_renderer = partial(col_fmt_float, precision=1)
+            col_formatting = [col_fmt_str, col_fmt_str, col_fmt_str, col_fmt_str, partial(col_fmt_length_as_f,target_unit=u.imperial.inch), col_fmt_str, col_fmt_str, col_fmt_quantity_as_f, exp_renderer, exp_renderer, col_fmt_quantity_as_f, datetime_renderer, datetime_renderer, datetime_renderer, datetime_renderer, PlotCellRenderer, PlotCellRenderer, PlotCellRenderer]
             data: List[List[Any]] = []
+            exposures = self.db.get_exposure_times(self.obs)
             
             for name, transits in self.filtered_transits.items():
                 wx.Yield() # ?
@@ -183,6 +194,8 @@ class MultipleTargetsPanel(wx.Panel):
                         planet.host_star.mag.get("R", np.nan),
                         planet.host_star.mag.get("V", np.nan),
                         planet.depth,
+                        exposures[name][0].to(u.s).value,
+                        exposures[name][1].to(u.s).value,
                         planet.duration,
                         transit.pre_ingress,
                         transit.ingress,
@@ -204,7 +217,7 @@ class MultipleTargetsPanel(wx.Panel):
         fig.set_dpi(dpi)
         fig.set_size_inches(size[0]/dpi, size[1]/dpi)
         ax = fig.add_subplot(1, 1, 1)
-        create_transit_schematic(transit, self.obs.meridian_crossing_duration, planet.name, fig=fig, ax=ax)
+        create_transit_schematic(transit, self.obs.meridian_crossing_duration, planet.name, fig=fig, ax=ax, planet=planet)
         fig.tight_layout()
         buf1 = render_to_png(fig, clear_fig=False)
         fig.clf()
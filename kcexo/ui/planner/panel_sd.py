@@ -1,16 +1,26 @@
 # -*- coding: UTF-8 -*-
+# cspell:ignore exoclock KCEXO
 # pylint:disable=unused-argument, invalid-name
+import logging
+from functools import partial
+from typing import List, Any
+
+import numpy as np
 
 import astropy.units as u
 from astropy.table import Table
+from astropy.time import Time
 
 import wx
 
 
 from kcexo.observatory import Observatory, Observatories
+from kcexo.transit_table import TransitTable
 from kcexo.data.exoclock_data import ExoClockData
-from kcexo.ui.widgets.sortable_grid import SortableGrid
+from kcexo.planning import NightSchedule, schedule_night, transit_scores, night_window
+from kcexo.ui.widgets.sortable_grid import SortableGrid, GridData, col_fmt_str, col_fmt_float, col_fmt_datetime
 from kcexo.ui.planner.transit_form import TransitForm, EVT_SUB_FORM
+from kcexo.ui.planner.utils import prevent_tab_changes, update_status
 
 
 
@@ -26,11 +36,20 @@ class SingleDayPanel(wx.Panel):
                  size=wx.DefaultSize, 
                  name='observatoryPanel',
                  **kwargs):
+        self.log = logging.getLogger("KCEXO")
         self.parent = parent
         self.obs: Observatory = observatory
         self.db: ExoClockData = exoclock_db
         self.utc_offset_hours: float = 0.0
         
+        # the night's transits are only searched for when the date changes, filter changes just re-schedule
+        self._date: Time | None = None
+        self.transits: TransitTable | None = None
+        self.filtered_transits: TransitTable | None = None
+        self.scores: np.ndarray = np.empty(0)
+        self.schedules: List[NightSchedule] = []
+        self.num_alternatives: int = 3
+        
         super().__init__(parent=parent, id=wid, pos=pos, size=size, name=name, *argv, **kwargs)
         
         ##############################
@@ -75,6 +94,7 @@ class SingleDayPanel(wx.Panel):
     def set_observatory(self, obs: Observatory) -> None:
         """Set observatory ot the new value"""
         self.obs = obs
+        self._date = None
         
     def set_utc_offset(self, utc_offset_hours: float) -> None:
         """Set utc offset"""
@@ -84,7 +104,51 @@ class SingleDayPanel(wx.Panel):
         """Change the exoclock db we are using."""
         self.db = db
         self.filter.set_db(self.db)
+        self._date = None
             
     def on_filter_form_sub(self, event) -> None:
-        print("on_filter_form_sub not implemented")
-        event.Skip()
+        """Handle filter form submission: find the night's transits, filter them and schedule the night."""
+        self.log.debug("SDP - on_filter_form_sub")
+        if not self.obs:
+            return
+        with prevent_tab_changes():
+            date, _, _, use_horizon, allow_flip, twilight = self.filter.get_values()
+            if date != self._date or self.transits is None:
+                self._date = date
+                start_time, end_time = night_window(self.obs, date)
+                with update_status("Searching for transits..."):
+                    self.transits = self.db.get_transits(start_time, end_time, self.obs, True, True, as_table=True)
+            with update_status("Scheduling the night..."):
+                self.filtered_transits, _ = self.db.filter_transits(self.transits, self.obs, use_horizon, twilight.lower(), allow_flip, allow_flip)
+                self.scores = transit_scores(self.filtered_transits)
+                self.schedules = schedule_night(self.filtered_transits, self.num_alternatives, scores=self.scores)
+                self.update_grid()
+
+    def update_grid(self) -> None:
+        """Update the grid with the best schedule followed by the runner-ups."""
+        self.log.debug("SDP - update_grid")
+        col_names = ["Option", "Option Score", "Target", "Priority", "# Recent", "Score", "Pre", "Start", "End", "Post"]
+        col_width = [13*5, 17*5, 20*5, 13*5, 18*5, 12*5, 13*5, 13*5, 13*5, 13*5]
+        datetime_renderer = partial(col_fmt_datetime, utc_offset_hours=self.utc_offset_hours)
+        score_renderer = partial(col_fmt_float, precision=2)
+        col_formatting = [col_fmt_str, score_renderer, col_fmt_str, col_fmt_str, col_fmt_str, score_renderer, datetime_renderer, datetime_renderer, datetime_renderer, datetime_renderer]
+        data: List[List[Any]] = []
+        if self.schedules:
+            for option, schedule in enumerate(self.schedules, 1):
+                for k in schedule.rows:
+                    transit = self.filtered_transits[int(k)]
+                    planet = self.filtered_transits.planets[self.filtered_transits.data['planet'][k]]
+                    data.append([
+                        option,
+                        schedule.score,
+                        planet.name,
+                        planet.status.priority if planet.status else "",
+                        planet.status.ec_observations_recent if planet.status else "",
+                        self.scores[k],
+                        transit.pre_ingress,
+                        transit.ingress,
+                        transit.egress,
+                        transit.post_egress
+                    ])
+        gd = GridData(data=data, col_widths=col_width, col_names=col_names, col_formatting=col_formatting)
+        self.grid.set_data(gd)
@@ -4,7 +4,7 @@
 import logging
 
 from functools import partial
-from typing import List, Dict, Any, Tuple
+from typing import List, Any, Tuple
 
 import numpy as np
 import matplotlib
@@ -18,6 +18,7 @@ from astropy.time import Time
 import wx
 
 from kcexo.transit import Transit
+from kcexo.transit_table import TransitTable
 from kcexo.planet import Planet
 from kcexo.observatory import Observatory
 from kcexo.data.exoclock_data import ExoClockData
@@ -56,8 +57,8 @@ class SingleTargetPanel(wx.Panel):
         self._start_date: Time = Time.now()
         self._end_date: Time = Time.now()
         self.must_refresh: bool = True
-        self.transits: Dict[str, Transit] = None
-        self.filtered_transits: Dict[str, Transit] = None
+        self.transits: TransitTable | None = None
+        self.filtered_transits: TransitTable | None = None
         self.visible: List[str] = []
         
         super().__init__(parent=parent, id=wid, pos=pos, size=size, name=name, *argv, **kwargs)
@@ -152,10 +153,10 @@ class SingleTargetPanel(wx.Panel):
                 self._end_date = end_date
                 with update_status("Searching for transits..."):
                     if target_name:
-                        self.transits = self.db.get_transits_for_single_target(target_name, start_date, end_date, self.obs, True, True)
-                        if not self.transits:
+                        self.transits = self.db.get_transits_for_single_target(target_name, start_date, end_date, self.obs, True, True, as_table=True)
+                        if len(self.transits) == 0:
                             wx.MessageBox(f"No transits for {target_name} have been found\nbetween {start_date.iso} and {end_date.iso}.", "Sorry...", wx.OK|wx.ICON_EXCLAMATION)
-            if self.transits:
+            if self.transits is not None:
                 with update_status("Filtering transits..."):
                     self.filtered_transits, self.visible = self.db.filter_transits(self.transits, self.obs, use_horizon, twilight.lower(), allow_flip, allow_flip)
                     self.update_grid()
@@ -163,7 +164,7 @@ class SingleTargetPanel(wx.Panel):
     def update_grid(self) -> None:
         """Update the grid with the transits in the `filtered transits` variable"""
         self.log.debug("STP - update_grid")
-        if not self.filtered_transits:
+        if self.filtered_transits is None:
             return
         with prevent_tab_changes("Updating Single Target transit list..."):
             col_names = ["Target", "Priority", "# Obs", "# Recent", 'Min Aper (")', "Mag R", "Mag V", "Depth R", "Duration (hr)", "Pre", "Start", "End", "Post", "GRAPH_Transit Profile", "GRAPH_Horizon Transit", "GRAPH_Sky Transit"]
@@ -207,7 +208,7 @@ class SingleTargetPanel(wx.Panel):
         fig.set_dpi(dpi)
         fig.set_size_inches(size[0]/dpi, size[1]/dpi)
         ax = fig.add_subplot(1, 1, 1)
-        create_transit_schematic(transit, self.obs.meridian_crossing_duration, planet.name, fig=fig, ax=ax)
+        create_transit_schematic(transit, self.obs.meridian_crossing_duration, planet.name, fig=fig, ax=ax, planet=planet)
         fig.tight_layout()
         buf1 = render_to_png(fig, clear_fig=False)
         fig.clf()
@@ -251,13 +251,13 @@ class TransitForm(wx.Panel):
         """Get filter values.
 
         Returns:
-            Tuple[Time, Time, str, bool, bool, str]: Start and end date, 
-                name of the target (if any), should horizon be used?, should flips be allowed? and
+            Tuple[Time, Time, str, bool, bool, str]: Start and end date (the end of the start date if the form has 
+                no end date), name of the target (if any), should horizon be used?, should flips be allowed? and
                 type of the twilight that was used
         """
         sd = self.dt_start.GetValue().GetTm()
         start = Time(f"{sd.year}-{sd.mon+1:02d}-{sd.mday:02d}T00:00:00")
-        ed = self.dt_end.GetValue().GetTm()
+        ed = self.dt_end.GetValue().GetTm() if self.dt_end else sd
         end = Time(f"{ed.year}-{ed.mon+1:02d}-{ed.mday:02d}T23:59:59")
         target = ""
         if self.txt_target:
@@ -14,9 +14,11 @@ import astropy.units as u
 from kcexo.observatory import Observatory
 from kcexo.planet import Planet
 from kcexo.transit import Transit
+from kcexo.calc.light_curve import LimbDarkeningTable, planet_light_curves
 
 
 twilight_transparency = [0.6, 0.4, 0.3, 0.15, 0.0]
+_default_limb_darkening: LimbDarkeningTable|None = None
 
 
 def _has_twin(ax):
@@ -42,7 +44,10 @@ def create_transit_schematic(transit: Transit,
                              show_grid: bool=True, 
                              style_kwargs: dict|None = None,
                              fig: matplotlib.figure.Figure|None = None,
-                             ax: matplotlib.axes.Axes|None = None
+                             ax: matplotlib.axes.Axes|None = None,
+                             planet: Planet|None = None,
+                             limb_darkening: LimbDarkeningTable|None = None,
+                             num_points: int = 200
                              ) -> Tuple[matplotlib.figure.Figure, matplotlib.axes.Axes]:
     """Create a `matplotlib` plot of the transit profile, label t1, t2, t3, t4, t5 and t6 times
           and show meridian flip time and duration and twilights if so requested.
@@ -62,6 +67,11 @@ def create_transit_schematic(transit: Transit,
             one will be created.
         ax (matplotlib.axes.Axes | None, optional): `matplotlib` axis to use. Defaults to None meaning that a new 
             one will be created.
+        planet (Planet | None, optional): If given, the limb-darkened light curve of the planet is plotted
+            instead of the trapezoid. Defaults to None.
+        limb_darkening (LimbDarkeningTable | None, optional): Limb-darkening coefficients used for the light curve.
+            Defaults to None meaning the grey atmosphere R band table.
+        num_points (int, optional): Number of points in the light curve. Defaults to 200.
             
     Returns:
         Tuple[matplotlib.figure.Figure, matplotlib.axes.Axes]: the figure and the axis
@@ -102,6 +112,10 @@ def create_transit_schematic(transit: Transit,
         ax.xaxis.set_major_locator(mticker.FixedLocator(tic_locations))
         ax.set_xticklabels(xtick_labels)
     
+    if planet is not None:
+        x, y = _model_light_curve(transit, planet, limb_darkening, num_points)
+        x = x * one_hr
+
     style_kwargs.setdefault('c', 'blue')
     ax.plot(x, y, **style_kwargs)
     
@@ -131,6 +145,28 @@ def create_transit_schematic(transit: Transit,
     return fig, ax
 
 
+def _model_light_curve(transit: Transit,
+                       planet: Planet,
+                       limb_darkening: LimbDarkeningTable|None,
+                       num_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Model light curve between pre-ingress and post-egress as (hours from pre-ingress, depth in mmag)."""
+    global _default_limb_darkening  # pylint:disable=global-statement
+    if limb_darkening is None:
+        if _default_limb_darkening is None:
+            _default_limb_darkening = LimbDarkeningTable.from_grey_atmosphere('R')
+        limb_darkening = _default_limb_darkening
+    star = planet.host_star
+    u1, u2 = limb_darkening(*[np.nan if v is None else v.value for v in (star.Teff, star.logg, star.FeH)])
+    full_duration = (transit.post_egress - transit.pre_ingress).to(u.hour).value
+    hours = np.linspace(0.0, full_duration, num_points)
+    offset = (transit.pre_ingress - transit.mid).to(u.day).value
+    flux = planet_light_curves(np.array([planet.RpRs]), np.array([planet.period.to(u.day).value])*u.day,
+                               np.array([planet.aRs]), np.array([planet.e]), np.array([planet.i.to(u.deg).value])*u.deg,
+                               np.array([planet.omega.to(u.deg).value])*u.deg, np.zeros(1),
+                               offset + hours / 24.0, u1, u2)[0]
+    return hours, -2.5 * np.log10(flux) * 1000.0
+
+
 def create_sky_transit(transit: Transit,
                        planet: Planet,
                        obs: Observatory,
@@ -188,11 +224,11 @@ def create_sky_transit(transit: Transit,
     if 'lw' not in style_kwargs:
         style_kwargs.setdefault('linewidth', 2.5)
     
-    # Grab altitude and azimuth from Astroplan objects.
-    time = transit.pre_ingress + np.linspace(0, (transit.post_egress-transit.pre_ingress).to(u.hour).value, num_points)*u.hour
-    altitude = (91 * u.deg - obs.observer.altaz(time, planet.host_star.target).alt) * (1/u.deg)
+    # Altitude and azimuth (in degrees) from the observatory's track cache.
+    _, alt_deg, az_deg = obs.altaz_tracks.track(planet.host_star.c, transit.as_list(), num_points)
+    altitude = 91 - alt_deg
     # Azimuth MUST be given to plot() in radians.
-    azimuth = obs.observer.altaz(time, planet.host_star.target).az * (1/u.deg) * (np.pi/180.0)
+    azimuth = np.deg2rad(az_deg)
 
     target_name = planet.name
     style_kwargs.setdefault('label', target_name)
@@ -326,13 +362,8 @@ def create_transit_horizon_plot(transit: Transit,
     if 'lw' not in style_kwargs:
         style_kwargs.setdefault('linewidth', 1.5)
 
-    # Populate time window if needed.
-    time = transit.pre_ingress + np.linspace(0, (transit.post_egress-transit.pre_ingress).to(u.hour).value, num_points)*u.hour
-    
-    # Calculate airmass
-    altaz = obs.observer.altaz(time, transit.host_star.target)
-    altitude = altaz.alt
-    az = altaz.az
+    # Altitude and azimuth over the transit window from the observatory's track cache.
+    time, altitude, az = obs.altaz_tracks.track(transit.host_star.c, transit.as_list(), num_points)
     # Mask out nonsense airmasses
     masked_altitude = np.ma.array(altitude, mask=altitude < 0)
 